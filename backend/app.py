@@ -4,35 +4,43 @@ from datetime import datetime
 import os
 import json
 import uuid
-import math
 import socket
-from werkzeug.security import generate_password_hash, check_password_hash
+import time
 from functools import wraps
 import base64
-import io
-try:
-    from PIL import Image
-except Exception:
-    Image = None
-
+from http_cache import install_cache_policy
+from compression import install_compression
+from render_cache import RenderCache
+from passwords import HashPoolBusy, hash_password, verify_password, rehash_if_needed
+from rate_limit import install_rate_limits
+from metrics import install_metrics, observe_image_stage
+from profiler import install_profiler
+from storage import install_uploads
+from dengue_core.avatars import avatar_size
+from dengue_core.storage import LocalStorage, atomic_write, sharded_key
+from dengue_core import (
+    ImageTooLarge, analyze_image_bytes, clinical_probability, dengue_probability, display_risk,
+    enhanced_probability, ensure_derivative, risk_level, store_avatar, store_bite_image,
+)
 app = Flask(__name__, static_folder='../frontend/public', static_url_path='/')
 app.secret_key = 'dev-secret-key'
 
-@app.after_request
-def add_no_cache_headers(response):
-    try:
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-    except Exception:
-        pass
-    return response
+install_metrics(app)
+install_rate_limits(app)
+# Order matters: after_request hooks run in reverse, so compression runs last.
+install_compression(app)
+install_cache_policy(app)
+install_profiler(app)
+uploads = install_uploads(app, on_missing=ensure_derivative)
+app.add_template_filter(avatar_size)
 
  
 BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.getenv('DATA_DIR') or os.path.join(BASE_DIR, 'data')
 DB_PATH = os.path.join(DATA_DIR, 'db.json')
 ANALYSIS_DIR = os.path.join(DATA_DIR, 'analyses')
+# Analysis records are sharded by id prefix: analyses/ab/cd/<id>.json.
+analysis_store = LocalStorage(ANALYSIS_DIR, url_prefix=None)
 
 
 def _ensure_db():
@@ -77,8 +85,19 @@ def _load_db():
 
 
 def _save_db(db):
-    with open(DB_PATH, 'w', encoding='utf-8') as f:
-        json.dump(db, f, indent=2)
+    # Temp file + rename: a crash mid-write can no longer truncate db.json.
+    atomic_write(DB_PATH, json.dumps(db, indent=2).encode('utf-8'))
+
+
+def _load_analysis(analysis_id):
+    """Stored analysis record, or None; falls back to the old flat layout."""
+    if not analysis_id or not all(c.isalnum() or c == '-' for c in analysis_id):
+        return None
+    for key in (sharded_key(f"{analysis_id}.json"), f"{analysis_id}.json"):
+        data = analysis_store.get(key)
+        if data is not None:
+            return json.loads(data)
+    return None
 
 
 def _get_user_by_email(db, email):
@@ -92,7 +111,7 @@ def _create_user(db, email, password):
     user = {
         "id": str(uuid.uuid4()),
         "email": email,
-        "password_hash": generate_password_hash(password),
+        "password_hash": hash_password(password),
         "created_at": datetime.utcnow().isoformat() + 'Z',
         "settings": {
             
@@ -126,202 +145,6 @@ def _get_last_assessment(db, user_id, require_symptoms=True):
     return latest
 
 
-def _logit(p):
-    return math.log(p / (1.0 - p))
-
-
-def _compute_dengue_probability_from_symptoms(symptoms_list, target_prevalence=None):
-    s = set(symptoms_list or [])
-
-    
-    x = {
-        'petechiae': 1 if 'petechiae' in s else 0,
-        'retro_ocular_pain': 1 if 'retro-orbital-pain' in s else 0,
-        'gingival_bleeding': 1 if 'gingival-bleeding' in s or 'bleeding-gums-nose' in s else 0,
-        'epistaxis': 1 if 'epistaxis' in s or 'bleeding-gums-nose' in s else 0,
-        'skin_paleness': 1 if 'skin-paleness' in s else 0,
-    }
-
-    coeffs = {
-        'intercept': 0.694,
-        'petechiae': 0.718,
-        'retro_ocular_pain': 0.516,
-        'gingival_bleeding': 0.316,
-        'epistaxis': -0.474,
-        'skin_paleness': -0.535,
-    }
-    y_dev = (
-        coeffs['intercept']
-        + coeffs['petechiae'] * x['petechiae']
-        + coeffs['retro_ocular_pain'] * x['retro_ocular_pain']
-        + coeffs['gingival_bleeding'] * x['gingival_bleeding']
-        + coeffs['epistaxis'] * x['epistaxis']
-        + coeffs['skin_paleness'] * x['skin_paleness']
-    )
-    p_dev = 1.0 / (1.0 + math.exp(-y_dev))
-
-    
-    
-    
-    dev_prev = 0.71
-    offset = 0.0
-    pi0 = None
-    if isinstance(target_prevalence, (int, float)):
-        
-        pi0 = max(1e-6, min(1.0 - 1e-6, float(target_prevalence)))
-        offset = _logit(pi0) - _logit(dev_prev)
-
-    y = y_dev + offset
-    p = 1.0 / (1.0 + math.exp(-y))
-
-    
-    model_info = {
-        'auc': 0.663,  
-        'auc_ci': (0.616, 0.710),
-        
-        'reported_sensitivity': 0.862,
-        'reported_specificity': 0.27,
-        'explored_threshold': 0.60,
-        'notes': (
-            'Equation and AUC from Fernández et al. (2016). The paper reports sensitivity 86.2% and '
-            'specificity 27% for the model and discusses raising the cut-point from 0.5 to 0.6 to improve '
-            'specificity while maintaining sensitivity >85%. We present these values transparently; '
-            'they are not a diagnosis.'
-        ),
-        'source_url': 'https://pmc.ncbi.nlm.nih.gov/articles/PMC5120437/',
-        'cdc_features_url': 'https://www.cdc.gov/dengue/hcp/clinical-signs/index.html',
-        'prevalence': {
-            'development_prevalence': dev_prev,
-            'target_prevalence': pi0,
-            'offset_applied': offset,
-            'target_prevalence_source_url': 'https://pmc.ncbi.nlm.nih.gov/articles/PMC2861403/'
-        }
-    }
-
-    return {
-        'y_dev': y_dev,
-        'y': y,
-        'p': p,
-        'p_dev': p_dev,
-        'inputs': x,
-        'coeffs': coeffs,
-        'model_info': model_info
-    }
-
-ENHANCED_SYMPTOMS_DATA = {
-    'fever-high': {'weight': 15, 'category': 'core', 'name': 'High fever (≥38.5°C)'},
-    'severe-headache': {'weight': 12, 'category': 'core', 'name': 'Severe headache'},
-    'retro-orbital-pain': {'weight': 14, 'category': 'core', 'name': 'Pain behind the eyes'},
-    'myalgia': {'weight': 10, 'category': 'core', 'name': 'Muscle pain'},
-    'arthralgia': {'weight': 10, 'category': 'core', 'name': 'Joint pain'},
-    'nausea-vomit': {'weight': 8, 'category': 'core', 'name': 'Nausea or vomiting'},
-    'rash': {'weight': 12, 'category': 'core', 'name': 'Skin rash'},
-    'fatigue': {'weight': 6, 'category': 'core', 'name': 'Fatigue / weakness'},
-    'loss-appetite': {'weight': 4, 'category': 'core', 'name': 'Loss of appetite'},
-    'no-cough': {'weight': 8, 'category': 'additional', 'name': 'No cough'},
-    'no-sore-throat': {'weight': 8, 'category': 'additional', 'name': 'No sore throat'},
-    'severe-abdominal-pain': {'weight': 20, 'category': 'warning', 'name': 'Severe abdominal pain'},
-    'persistent-vomiting': {'weight': 18, 'category': 'warning', 'name': 'Persistent vomiting'},
-    'gingival-bleeding': {'weight': 22, 'category': 'warning', 'name': 'Gingival bleeding'},
-    'epistaxis': {'weight': 20, 'category': 'warning', 'name': 'Nosebleed (epistaxis)'},
-    'petechiae': {'weight': 25, 'category': 'warning', 'name': 'Petechiae (small red spots)'},
-    'blood-in-vomit-stool': {'weight': 30, 'category': 'warning', 'name': 'Blood in vomit or stool'},
-    'lethargy-restlessness': {'weight': 18, 'category': 'warning', 'name': 'Extreme drowsiness / restlessness'},
-    'rapid-breathing': {'weight': 16, 'category': 'warning', 'name': 'Rapid or difficult breathing'},
-    'skin-paleness': {'weight': 15, 'category': 'warning', 'name': 'Skin paleness'},
-}
-
-def _compute_enhanced_dengue_percentage(symptoms_list):
-    if not symptoms_list:
-        return {
-            'percentage': 0,
-            'risk_level': 'none',
-            'breakdown': {
-                'core_symptoms': 0,
-                'warning_signs': 0,
-                'additional_features': 0,
-                'total_weight': 0,
-                'base_percentage': 0,
-                'multiplier': 1.0,
-                'symptom_counts': {'core': 0, 'warning': 0, 'additional': 0}
-            },
-            'selected_symptoms': []
-        }
-
-    core_weight = 0
-    warning_weight = 0
-    additional_weight = 0
-    selected_details = []
-
-    for s in symptoms_list:
-        data = ENHANCED_SYMPTOMS_DATA.get(s)
-        if not data:
-            continue
-        selected_details.append({'name': data['name'], 'weight': data['weight'], 'category': data['category']})
-        if data['category'] == 'core':
-            core_weight += data['weight']
-        elif data['category'] == 'warning':
-            warning_weight += data['weight']
-        elif data['category'] == 'additional':
-            additional_weight += data['weight']
-
-    total_weight = core_weight + warning_weight + additional_weight
-    base_percentage = min(100.0, (total_weight / 290.0) * 100.0)
-
-    multiplier = 1.0
-    sset = set(symptoms_list)
-    if 'fever-high' in sset:
-        multiplier += 0.30
-    warning_count = sum(1 for s in sset if ENHANCED_SYMPTOMS_DATA.get(s, {}).get('category') == 'warning')
-    if warning_count >= 3:
-        multiplier += 0.50
-    elif warning_count >= 2:
-        multiplier += 0.30
-    elif warning_count >= 1:
-        multiplier += 0.20
-    core_count = sum(1 for s in sset if ENHANCED_SYMPTOMS_DATA.get(s, {}).get('category') == 'core')
-    if core_count >= 6:
-        multiplier += 0.40
-    elif core_count >= 4:
-        multiplier += 0.20
-    elif core_count >= 2:
-        multiplier += 0.10
-    resp_abs = sum(1 for s in sset if s in ('no-cough', 'no-sore-throat'))
-    if resp_abs == 2:
-        multiplier += 0.20
-    elif resp_abs == 1:
-        multiplier += 0.10
-
-    final_percentage = min(100.0, base_percentage * multiplier)
-    if final_percentage >= 80:
-        level = 'very_high'
-    elif final_percentage >= 60:
-        level = 'high'
-    elif final_percentage >= 40:
-        level = 'moderate'
-    elif final_percentage >= 20:
-        level = 'low'
-    elif final_percentage >= 5:
-        level = 'very_low'
-    else:
-        level = 'minimal'
-
-    return {
-        'percentage': round(final_percentage, 1),
-        'risk_level': level,
-        'breakdown': {
-            'core_symptoms': core_weight,
-            'warning_signs': warning_weight,
-            'additional_features': additional_weight,
-            'total_weight': total_weight,
-            'base_percentage': round(base_percentage, 1),
-            'multiplier': round(multiplier, 2),
-            'symptom_counts': {'core': core_count, 'warning': warning_count, 'additional': resp_abs}
-        },
-        'selected_symptoms': selected_details
-    }
-
-
 def login_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
@@ -331,83 +154,43 @@ def login_required(f):
     return wrapper
 
 
-def _compute_display_risk(prob, symptoms):
-    s = set(symptoms or [])
-    
-    if prob >= 0.60:
-        base = 'high'
-    elif prob >= 0.30:
-        base = 'moderate'
-    else:
-        base = 'low'
-
-    warning = {
-        'severe-abdominal-pain', 'persistent-vomiting', 'gingival-bleeding', 'epistaxis',
-        'blood-in-vomit-stool', 'lethargy-restlessness', 'rapid-breathing', 'skin-paleness'
-    }
-    wcount = len(s.intersection(warning))
-    if wcount >= 2:
-        return 'high'
-    if wcount == 1 and base == 'low':
-        return 'moderate'
-    
-    core = {
-        'fever-high', 'severe-headache', 'retro-orbital-pain', 'myalgia', 'arthralgia', 'rash', 'nausea-vomit'
-    }
-    ccount = len(s.intersection(core))
-    if ccount >= 5 and base != 'high':
-        return 'high'
-    if ccount >= 3 and base == 'low':
-        return 'moderate'
-    return base
-
-
-def _compute_clinical_probability(symptoms, base_prev):
-    s = set(symptoms or [])
-    core = {
-        'fever-high', 'severe-headache', 'retro-orbital-pain', 'myalgia', 'arthralgia', 'rash', 'nausea-vomit'
-    }
-    resp_abs = {'no-cough', 'no-sore-throat'}
-    warning = {
-        'severe-abdominal-pain', 'persistent-vomiting', 'gingival-bleeding', 'epistaxis',
-        'blood-in-vomit-stool', 'lethargy-restlessness', 'rapid-breathing', 'skin-paleness'
-    }
-    ccount = len(s.intersection(core))
-    rcnt = len(s.intersection(resp_abs))
-    wcount = len(s.intersection(warning))
-
-    
-    
-    b0 = _logit(max(1e-6, min(1-1e-6, base_prev)))
-    y = b0 + 0.35 * ccount + 0.40 * rcnt + 0.90 * wcount
-    p = 1.0 / (1.0 + math.exp(-y))
-    return {
-        'p': p,
-        'y': y,
-        'counts': {'core': ccount, 'resp_abs': rcnt, 'warning': wcount}
-    }
-
-@app.context_processor
-def inject_globals():
+def _session_avatar_url():
+    """avatar_url cached in the session; looked up once per login."""
+    if not session.get('logged_in'):
+        return None
+    if 'avatar_url' in session:
+        return session['avatar_url']
     avatar_url = None
     try:
-        if session.get('logged_in'):
-            db = _load_db()
-            uid = session.get('user_id')
-            for u in db.get('users', []):
-                if u.get('id') == uid:
-                    prof = u.get('profile') or {}
-                    avatar_url = prof.get('avatar_url')
-                    break
+        db = _load_db()
+        uid = session.get('user_id')
+        for u in db.get('users', []):
+            if u.get('id') == uid:
+                prof = u.get('profile') or {}
+                avatar_url = prof.get('avatar_url')
+                break
+        session['avatar_url'] = avatar_url
     except Exception:
         avatar_url = None
+    return avatar_url
+
+
+def _template_globals():
     return {
         'logged_in': session.get('logged_in', False),
         'current_year': datetime.now().year,
-        'avatar_url': avatar_url,
+        'avatar_url': _session_avatar_url(),
     }
 
 
+@app.context_processor
+def inject_globals():
+    return _template_globals()
+
+
+render_cache = RenderCache(app, _template_globals)
+
+
 @app.route('/', methods=['GET'])
 def index():
     if session.get('logged_in'):
@@ -430,10 +213,19 @@ def login():
     db = _load_db()
     user = _get_user_by_email(db, email)
     if user:
-        if check_password_hash(user.get('password_hash', ''), password):
+        try:
+            valid = verify_password(user.get('password_hash', ''), password)
+        except HashPoolBusy:
+            return redirect(url_for('login', email=email, error='busy'))
+        if valid:
             session['logged_in'] = True
             session['user_id'] = user['id']
             session['email'] = user['email']
+            session['avatar_url'] = (user.get('profile') or {}).get('avatar_url')
+            new_hash = rehash_if_needed(user.get('password_hash', ''), password)
+            if new_hash:
+                user['password_hash'] = new_hash
+                _save_db(db)
             return redirect(url_for('dashboard'))
         else:
             return redirect(url_for('login', error='invalid'))
@@ -450,6 +242,7 @@ def logout():
         session.pop('logged_in', None)
         session.pop('user_id', None)
         session.pop('email', None)
+        session.pop('avatar_url', None)
     return redirect(url_for('login'))
 
 
@@ -471,16 +264,20 @@ def register():
     db = _load_db()
     if _get_user_by_email(db, email):
         return redirect(url_for('register', email=email, error='exists'))
-    user = _create_user(db, email, password)
+    try:
+        user = _create_user(db, email, password)
+    except HashPoolBusy:
+        return redirect(url_for('register', email=email, error='busy'))
     session['logged_in'] = True
     session['user_id'] = user['id']
     session['email'] = user['email']
+    session['avatar_url'] = None
     return redirect(url_for('dashboard'))
 
 
 @app.route('/dashboard')
 def dashboard():
-    return render_template('dashboard.html', hide_nav=False, page_id='dashboard')
+    return render_cache.render('dashboard.html', hide_nav=False, page_id='dashboard')
 
 
 @app.route('/education')
@@ -490,165 +287,22 @@ def education():
 
 @app.route('/education/what-is-dengue')
 def education_what_is_dengue():
-    return render_template('education_dengue.html', hide_nav=False)
+    return render_cache.render('education_dengue.html', hide_nav=False)
 
 
 @app.route('/education/local-services')
 def education_local_services():
-    return render_template('education_services.html', hide_nav=False)
+    return render_cache.render('education_services.html', hide_nav=False)
 
 
 @app.route('/report-bite')
 def report_bite():
-    return render_template('report_bite.html', hide_nav=False)
+    return render_cache.render('report_bite.html', hide_nav=False)
 
 
 @app.route('/bite-analysis-result')
 def bite_analysis_result():
-    return render_template('bite_analysis_result.html', hide_nav=False)
-
-
-def _rgb_to_hsv_float(r, g, b):
-    mx = max(r, g, b)
-    mn = min(r, g, b)
-    d = mx - mn
-    h = 0.0
-    if d != 0:
-        if mx == r:
-            h = ((g - b) / d) % 6.0
-        elif mx == g:
-            h = (b - r) / d + 2.0
-        else:
-            h = (r - g) / d + 4.0
-        h *= 60.0
-        if h < 0:
-            h += 360.0
-    s = 0.0 if mx == 0 else d / mx
-    v = mx
-    return h, s, v
-
-
-def _analyze_image_bytes(image_bytes, roi=None):
-    if Image is None:
-        raise RuntimeError('Pillow not installed')
-    im = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-    
-    max_w = 200
-    w0, h0 = im.size
-    if w0 > max_w:
-        ratio = max_w / float(w0)
-        im = im.resize((max_w, max(1, int(h0 * ratio))), Image.BILINEAR)
-    w, h = im.size
-
-    px = im.load()
-    
-    cx0 = int(w * 0.20); cx1 = int(w * 0.80)
-    cy0 = int(h * 0.20); cy1 = int(h * 0.80)
-    if isinstance(roi, dict) and 'cx' in roi and 'cy' in roi:
-        rc = max(8, int(min(w, h) * float(roi.get('r', 0.25))))
-        cx = int(float(roi.get('cx', 0.5)) * w)
-        cy = int(float(roi.get('cy', 0.5)) * h)
-        cx0 = max(0, cx - rc); cx1 = min(w - 1, cx + rc)
-        cy0 = max(0, cy - rc); cy1 = min(h - 1, cy + rc)
-
-    red = yellow = total = 0
-    redC = yellowC = centerTotal = 0
-    strongRed = strongRedC = 0
-
-    gx, gy = 16, 12
-    cellW = max(1, w // gx)
-    cellH = max(1, h // gy)
-    tileR = [0] * (gx * gy)
-    tileY = [0] * (gx * gy)
-    tileT = [0] * (gx * gy)
-
-    for y in range(h):
-        for x in range(w):
-            r8, g8, b8 = px[x, y]
-            r = r8 / 255.0
-            g = g8 / 255.0
-            b = b8 / 255.0
-            h_deg, s, v = _rgb_to_hsv_float(r, g, b)
-            
-            if v < 0.25 or s < 0.18:
-                continue
-
-            
-            isRedHSV = (s >= 0.24 and v >= 0.30) and (h_deg <= 15 or h_deg >= 345)
-            isYellowHSV = (s >= 0.22 and v >= 0.45) and (35 <= h_deg <= 70)
-            isRedRGB = (r >= 0.45) and ((r - max(g, b)) >= 0.15) and (r / (g + 1e-6) >= 1.25) and (r / (b + 1e-6) >= 1.30)
-            isYellowRGB = (r >= 0.42 and g >= 0.42 and b <= 0.38) and (min(r, g) / (max(r, g) + 1e-6) >= 0.78) and ((r - b) >= 0.10) and ((g - b) >= 0.10)
-            isStrongRed = (r >= 0.65 and g <= 0.35 and b <= 0.35) and ((r - max(g, b)) >= 0.18)
-
-            isRed = (isRedHSV and isRedRGB) or isStrongRed
-            isYellow = (not isRed) and (isYellowHSV and isYellowRGB)
-
-            if isRed:
-                red += 1
-            elif isYellow:
-                yellow += 1
-            total += 1
-
-            in_center = (cx0 <= x <= cx1 and cy0 <= y <= cy1)
-            if in_center:
-                centerTotal += 1
-                if isRed:
-                    redC += 1
-                    if isStrongRed:
-                        strongRedC += 1
-                elif isYellow:
-                    yellowC += 1
-
-            tx = min(gx - 1, x // cellW)
-            ty = min(gy - 1, y // cellH)
-            ti = ty * gx + tx
-            tileT[ti] += 1
-            if isRed:
-                tileR[ti] += 1
-            elif isYellow:
-                tileY[ti] += 1
-            if isStrongRed:
-                strongRed += 1
-
-    tileMaxRedDensity = 0.0
-    tileMaxYellowDensity = 0.0
-    for i in range(len(tileT)):
-        t = tileT[i]
-        if not t:
-            continue
-        tileMaxRedDensity = max(tileMaxRedDensity, tileR[i] / t)
-        tileMaxYellowDensity = max(tileMaxYellowDensity, tileY[i] / t)
-
-    stats = {
-        'red': red, 'yellow': yellow, 'total': total,
-        'redC': redC, 'yellowC': yellowC, 'centerTotal': centerTotal,
-        'tileMaxRedDensity': tileMaxRedDensity,
-        'tileMaxYellowDensity': tileMaxYellowDensity,
-        'strongRed': strongRed, 'strongRedC': strongRedC,
-    }
-
-    
-    roiPresent = isinstance(roi, dict) and 'cx' in roi
-    rFrac = (red / total) if total else 0.0
-    yFrac = (yellow / total) if total else 0.0
-    rFracC = (redC / centerTotal) if centerTotal else 0.0
-    yFracC = (yellowC / centerTotal) if centerTotal else 0.0
-    minFracGlobal = 0.008 if roiPresent else 0.02
-    minFracROI = 0.015 if roiPresent else 0.05
-    minTileDensity = 0.05 if roiPresent else 0.10
-    strongRedOK = roiPresent and (strongRedC >= max(8, centerTotal * 0.005))
-    strongRedGlobalOK = (not roiPresent) and (strongRed >= max(20, total * 0.0025)) and (tileMaxRedDensity >= 0.06)
-    redOK = strongRedOK or strongRedGlobalOK or (((rFrac >= minFracGlobal) or (rFracC >= minFracROI)) and (tileMaxRedDensity >= minTileDensity) and (rFrac >= yFrac * 1.05))
-    yellowOK = (not redOK) and (((yFrac >= minFracGlobal) or (yFracC >= minFracROI)) and (tileMaxYellowDensity >= minTileDensity))
-
-    if redOK:
-        res = {'text': 'Detected: red/pink area', 'cls': 'red'}
-    elif yellowOK:
-        res = {'text': 'Detected: yellowish area', 'cls': 'yellow'}
-    else:
-        res = {'text': 'No clear red/yellow detected', 'cls': 'muted'}
-
-    return stats, res
+    return render_cache.render('bite_analysis_result.html', hide_nav=False)
 
 
 @app.route('/api/analyze-bite', methods=['POST'])
@@ -676,24 +330,15 @@ def api_analyze_bite():
         if not image_bytes:
             return {'ok': False, 'error': 'No image provided'}, 400
 
-        stats, res = _analyze_image_bytes(image_bytes, roi=roi)
+        stats, res = analyze_image_bytes(image_bytes, roi=roi, on_stage=observe_image_stage)
 
-        up_dir = os.path.join(BASE_DIR, 'public', 'uploads', 'bites')
-        os.makedirs(up_dir, exist_ok=True)
-        fname = f"{uuid.uuid4().hex}.jpg"
+        persist_started = time.perf_counter()
         try:
-            if Image is None:
-                raise RuntimeError('Pillow not installed')
-            im = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-            im.save(os.path.join(up_dir, fname), format='JPEG', quality=92)
-            image_url = f"/uploads/bites/{fname}"
-        except Exception:
-            image_url = None
+            image = store_bite_image(uploads, image_bytes)
+        except Exception as e:
+            print(f"Error storing bite image: {e}")
+            image = {}
 
-        try:
-            os.makedirs(ANALYSIS_DIR, exist_ok=True)
-        except Exception:
-            pass
         analysis_id = uuid.uuid4().hex
         record = {
             'id': analysis_id,
@@ -702,13 +347,13 @@ def api_analyze_bite():
             'labelCls': res.get('cls'),
             'stats': stats,
             'roi': roi,
-            'image_url': image_url,
+            **image,
         }
         try:
-            with open(os.path.join(ANALYSIS_DIR, f"{analysis_id}.json"), 'w', encoding='utf-8') as f:
-                json.dump(record, f, indent=2)
+            analysis_store.put_at(sharded_key(f"{analysis_id}.json"), json.dumps(record, indent=2).encode('utf-8'))
         except Exception:
             pass
+        observe_image_stage('persist', time.perf_counter() - persist_started)
 
         return {
             'ok': True,
@@ -716,9 +361,12 @@ def api_analyze_bite():
             'labelCls': record['labelCls'],
             'stats': record['stats'],
             'roi': record['roi'],
-            'image_url': record['image_url'],
+            'image_url': record.get('image_url'),
+            'thumbnail_url': record.get('thumbnail_url'),
             'analysis_id': analysis_id,
         }
+    except ImageTooLarge as e:
+        return {'ok': False, 'error': 'image_too_large', 'detail': str(e)}, 413
     except Exception as e:
         return {'ok': False, 'error': str(e)}, 500
 
@@ -726,11 +374,9 @@ def api_analyze_bite():
 @app.route('/api/analysis/<analysis_id>', methods=['GET'])
 def api_get_analysis(analysis_id):
     try:
-        path = os.path.join(ANALYSIS_DIR, f"{analysis_id}.json")
-        if not os.path.exists(path):
+        data = _load_analysis(analysis_id)
+        if data is None:
             return {'ok': False, 'error': 'not_found'}, 404
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
         return {'ok': True, **data}
     except Exception as e:
         return {'ok': False, 'error': str(e)}, 500
@@ -757,24 +403,22 @@ def risk_assessment():
     default_prev = db.get('meta', {}).get('defaults', {}).get('pretest_prevalence', 0.055)
     target_prev = user_prev if isinstance(user_prev, (int, float)) else default_prev
 
-    calc = _compute_dengue_probability_from_symptoms(symptoms, target_prevalence=target_prev)
+    calc = dengue_probability(symptoms, target_prevalence=target_prev)
     prob = calc['p']
     prob_pct = round(prob * 100)
-    enhanced = _compute_enhanced_dengue_percentage(symptoms)
-    clinical = _compute_clinical_probability(symptoms, target_prev)
+    enhanced = enhanced_probability(symptoms)
+    clinical = clinical_probability(symptoms, target_prev)
     p_clinical = clinical['p']
     p_clinical_pct = round(p_clinical * 100)
 
-    current_risk = _compute_display_risk(prob, symptoms)
+    current_risk = display_risk(prob, symptoms)
 
     bite_label = (request.args.get('bite') or '').strip().lower() or None
     analysis_id = (request.args.get('aid') or '').strip() or None
     if (not bite_label) and analysis_id:
         try:
-            path = os.path.join(ANALYSIS_DIR, f"{analysis_id}.json")
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
-                    _adata = json.load(f)
+            _adata = _load_analysis(analysis_id)
+            if _adata:
                 _lbl = (_adata.get('labelCls') or '').strip().lower()
                 if _lbl in ('red', 'yellow'):
                     bite_label = _lbl
@@ -789,18 +433,7 @@ def risk_assessment():
 
     enhanced_percentage_val = float(enhanced.get('percentage', prob_pct))
     enhanced_percentage_val = min(100.0, round(enhanced_percentage_val + bite_adjustment, 1))
-    if enhanced_percentage_val >= 80:
-        enhanced_risk_level_val = 'very_high'
-    elif enhanced_percentage_val >= 60:
-        enhanced_risk_level_val = 'high'
-    elif enhanced_percentage_val >= 40:
-        enhanced_risk_level_val = 'moderate'
-    elif enhanced_percentage_val >= 20:
-        enhanced_risk_level_val = 'low'
-    elif enhanced_percentage_val >= 5:
-        enhanced_risk_level_val = 'very_low'
-    else:
-        enhanced_risk_level_val = 'minimal'
+    enhanced_risk_level_val = risk_level(enhanced_percentage_val)
 
     if from_form:
         try:
@@ -849,6 +482,7 @@ def risk_assessment():
         enhanced_risk_level=enhanced_risk_level_val,
         calc={**calc, **{'breakdown': enhanced['breakdown']}},
         p_dev_pct=round(calc['p_dev'] * 100),
+        offset_applied=calc['model_info']['prevalence']['logit_offset_applied'],
         p_clinical_pct=p_clinical_pct,
         clinical_counts=clinical['counts'],
         selected_symptoms=symptoms,
@@ -893,21 +527,12 @@ def profile():
             except Exception:
                 file = None
             if file and getattr(file, 'filename', ''):
-                ext = os.path.splitext(file.filename)[1].lower()
-                if ext in ('.jpg', '.jpeg', '.png', '.gif', '.webp'):
-                    up_dir = os.path.join(BASE_DIR, 'public', 'uploads', 'avatars')
-                    try:
-                        os.makedirs(up_dir, exist_ok=True)
-                    except Exception:
-                        pass
-                    filename = f"{uid}{ext}"
-                    save_path = os.path.join(up_dir, filename)
-                    try:
-                        file.save(save_path)
-                        prof['avatar_url'] = f"/uploads/avatars/{filename}"
-                    except Exception:
-                        pass
+                try:
+                    prof['avatar_url'] = store_avatar(uploads, file) or prof.get('avatar_url')
+                except Exception as e:
+                    print(f"Error saving avatar: {e}")
             _save_db(db)
+            session['avatar_url'] = prof.get('avatar_url')
         return redirect(url_for('profile'))
     
     email = session.get('email') or (user.get('email') if user else '')
@@ -0,0 +1,339 @@
+"""ASGI entry point with async handlers for the I/O-bound API routes.
+
+    pip install -r requirements-asgi.txt
+    gunicorn -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT asgi_app:app
+
+The upload, analysis fetch and history endpoints run on the event loop with an
+async SQLAlchemy engine (asyncpg, or aiosqlite for local SQLite files). The
+pixel scoring runs in an executor, and the upload is handed to
+dengue_core.bite_images from a worker thread. Every other route is the
+unchanged Flask app mounted as WSGI, so pages, login and the session cookie
+behave exactly as under the sync server.
+
+Async routes read the Flask session cookie but never write it, and always
+query the primary, so read-your-writes holds without the replica bookkeeping
+get_read_db() does.
+"""
+
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import database
+import rate_limit
+import session_store
+from database import Assessment, BiteAnalysis
+from compression import COMPRESS_LEVEL, COMPRESS_MIN_SIZE
+from http_cache import NO_STORE
+from dengue_core import ImageTooLarge, analyze_image_bytes
+from metrics import ASGIRouteMetrics, observe_image_stage
+from app_supabase import (
+    app as flask_app,
+    ASSESSMENT_HISTORY_COLUMNS, BITE_HISTORY_COLUMNS,
+    HISTORY_EXPORT_BATCH, HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE,
+    _analysis_json, _bite_analysis_fields, _bite_analysis_result,
+    _decode_cursor, _decode_data_url, _encode_cursor, _history_row, _parse_roi, _store_bite_image,
+)
+
+# The bite scorer is a pure-Python pixel loop that holds the GIL, so it gets
+# processes by default; 'thread' is enough when uploads are rare.
+ASGI_IMAGE_EXECUTOR = (os.getenv('ASGI_IMAGE_EXECUTOR', 'process') or 'process').lower()
+ASGI_IMAGE_WORKERS = database._env_int('ASGI_IMAGE_WORKERS', max(1, min(4, os.cpu_count() or 1)))
+WSGI_THREADS = database._env_int('ASGI_WSGI_THREADS', 10)
+
+
+def _async_url(url):
+    """Map the sync DATABASE_URL onto the matching async driver."""
+    scheme, _, rest = url.partition('://')
+    if scheme.startswith('sqlite'):
+        return f"sqlite+aiosqlite://{rest}"
+    # asyncpg takes ssl=, not libpq's sslmode=
+    return f"postgresql+asyncpg://{rest}".replace('sslmode=', 'ssl=')
+
+
+def _build_async_engine(url):
+    kwargs = {'echo': False}
+    if not url.startswith('sqlite'):
+        kwargs.update(
+            pool_size=database.DB_POOL_SIZE,
+            max_overflow=database.DB_MAX_OVERFLOW,
+            pool_recycle=database.DB_POOL_RECYCLE,
+            pool_timeout=database.DB_POOL_TIMEOUT,
+            pool_pre_ping=(database.DB_POOL_PRE_PING != 'never'),
+        )
+    return create_async_engine(_async_url(url), **kwargs)
+
+
+# Built on first use, like database.get_engine(): importing this module (the
+# gunicorn master with preload, a benchmark) loads no async driver.
+_async_engine = None
+_async_sessionmaker = None
+_async_engine_lock = threading.Lock()
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                _async_engine = _build_async_engine(database._db_url)
+                _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+def __getattr__(name):
+    # `asgi_app.async_engine` still works, building on first access.
+    if name == 'async_engine':
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_image_executor = None
+
+
+def _get_image_executor():
+    global _image_executor
+    if _image_executor is None:
+        if ASGI_IMAGE_EXECUTOR == 'thread':
+            _image_executor = ThreadPoolExecutor(max_workers=ASGI_IMAGE_WORKERS, thread_name_prefix='bite-image')
+        else:
+            _image_executor = ProcessPoolExecutor(max_workers=ASGI_IMAGE_WORKERS)
+    return _image_executor
+
+
+async def _run_image_job(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_image_executor(), functools.partial(fn, *args, **kwargs))
+
+
+_session_interface = SecureCookieSessionInterface()
+
+
+async def _flask_session(request):
+    """Decode the Flask session cookie; {} when missing, tampered with or revoked.
+
+    Logged-in cookies are checked against user_sessions the same way
+    session_store.UserSessionInterface does; a cache hit stays on the loop.
+    """
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = _session_interface.get_signing_serializer(flask_app)
+    try:
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        data = serializer.loads(cookie, max_age=max_age)
+    except BadSignature:
+        return {}
+    if not data.get('logged_in'):
+        return data
+    token = data.get(session_store.SID_KEY)
+    if not token:
+        return {}
+    hit, user_id = session_store.peek_session(token)
+    if not hit:
+        try:
+            user_id = await run_in_threadpool(session_store.validate_session, token)
+        except Exception as e:
+            print(f"Session validation failed: {e}")
+            user_id = str(data.get('user_id'))
+    return data if user_id is not None and user_id == str(data.get('user_id')) else {}
+
+
+# Same headers the Flask cache policy gives these (unlisted) endpoints.
+_API_HEADERS = {'Cache-Control': NO_STORE, 'Pragma': 'no-cache', 'Expires': '0'}
+
+
+def _json(payload, status=200):
+    return JSONResponse(payload, status_code=status, headers=_API_HEADERS)
+
+
+def _error(error, status):
+    return _json({'ok': False, 'error': error}, status)
+
+
+async def _rate_limited(request, endpoint):
+    """429 response when the Flask app's budget for endpoint is spent, else None."""
+    limiter = flask_app.extensions['rate_limit']
+    limit = limiter.limit_for(endpoint, request.method)
+    if limit is None:
+        return None
+    user_id = (await _flask_session(request)).get('user_id') if limit.key == 'user' else None
+    key = rate_limit.client_key(limit.key, request.client.host if request.client else None,
+                                request.headers.get('x-forwarded-for'), user_id)
+    retry_after = limiter.check(endpoint, limit, key)
+    if retry_after is None:
+        return None
+    return JSONResponse({'ok': False, 'error': 'rate_limited', 'retry_after': retry_after}, status_code=429,
+                        headers={**_API_HEADERS, 'Retry-After': str(retry_after)})
+
+
+async def api_analyze_bite(request):
+    limited = await _rate_limited(request, 'api_analyze_bite')
+    if limited is not None:
+        return limited
+    try:
+        if 'application/json' in (request.headers.get('content-type') or ''):
+            try:
+                body = await request.json()
+            except Exception:
+                body = {}
+            body = body if isinstance(body, dict) else {}
+            roi = body.get('roi')
+            image_bytes = _decode_data_url(body.get('imageDataUrl') or '')
+        else:
+            form = await request.form()
+            roi = _parse_roi(form.get('roi') or None)
+            image = form.get('image')
+            image_bytes = await image.read() if image is not None and hasattr(image, 'read') else None
+
+        if not image_bytes:
+            return _error('No image provided', 400)
+
+        stats, res = await _run_image_job(analyze_image_bytes, image_bytes, roi=roi, on_stage=observe_image_stage)
+
+        persist_started = time.perf_counter()
+        image = await run_in_threadpool(_store_bite_image, image_bytes)
+
+        user_id = (await _flask_session(request)).get('user_id')
+        try:
+            async with AsyncSessionLocal() as db:
+                analysis = BiteAnalysis(**_bite_analysis_fields(stats, res, roi, image, user_id))
+                db.add(analysis)
+                await db.commit()
+                analysis_id = str(analysis.id)
+        except Exception as e:
+            print(f"Error saving analysis to database: {e}")
+            analysis_id = str(uuid.uuid4())
+        observe_image_stage('persist', time.perf_counter() - persist_started)
+
+        return _json(_bite_analysis_result(stats, res, roi, image, analysis_id))
+    except ImageTooLarge as e:
+        return _json({'ok': False, 'error': 'image_too_large', 'detail': str(e)}, 413)
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+async def api_get_analysis(request):
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(BiteAnalysis).where(BiteAnalysis.id == request.path_params['analysis_id']))
+            analysis = result.scalars().first()
+            if not analysis:
+                return _error('not_found', 404)
+            return _json(_analysis_json(analysis))
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+def _history_select(model, columns, user_id):
+    return (select(*columns)
+              .where(model.user_id == user_id)
+              .order_by(model.created_at.desc(), model.id.desc()))
+
+
+def _history_page(model, columns):
+    async def endpoint(request):
+        user = await _flask_session(request)
+        if not user.get('logged_in'):
+            return _error('unauthorized', 401)
+        try:
+            limit = int(request.query_params.get('limit', HISTORY_PAGE_SIZE))
+        except ValueError:
+            return _error('invalid_limit', 400)
+        limit = max(1, min(HISTORY_MAX_PAGE_SIZE, limit))
+
+        stmt = _history_select(model, columns, user.get('user_id'))
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                created_at, row_id = _decode_cursor(cursor)
+            except Exception:
+                return _error('invalid_cursor', 400)
+            stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+        return _json({
+            'ok': True,
+            'items': [_history_row(r) for r in rows],
+            'next_cursor': next_cursor,
+        })
+    return endpoint
+
+
+def _history_export(model, columns, filename):
+    async def endpoint(request):
+        user = await _flask_session(request)
+        if not user.get('logged_in'):
+            return _error('unauthorized', 401)
+        stmt = _history_select(model, columns, user.get('user_id'))
+
+        async def generate():
+            async with AsyncSessionLocal() as db:
+                result = await db.stream(stmt.execution_options(yield_per=HISTORY_EXPORT_BATCH))
+                async for row in result:
+                    yield json.dumps(_history_row(row)) + '\n'
+
+        return StreamingResponse(
+            generate(),
+            media_type='application/x-ndjson',
+            headers={**_API_HEADERS, 'Content-Disposition': f'attachment; filename="{filename}"'},
+        )
+    return endpoint
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    yield
+    if _image_executor is not None:
+        await run_in_threadpool(_image_executor.shutdown)
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+_gzip = [Middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE, compresslevel=COMPRESS_LEVEL)]
+
+
+def _api(endpoint):
+    """Route middleware; metrics wraps gzip so timings match the Flask hook's."""
+    return [Middleware(ASGIRouteMetrics, endpoint=endpoint)] + _gzip
+
+
+routes = [
+    Route('/api/analyze-bite', api_analyze_bite, methods=['POST'], middleware=_api('api_analyze_bite')),
+    Route('/api/analysis/{analysis_id}', api_get_analysis, methods=['GET'], middleware=_api('api_get_analysis')),
+    Route('/api/assessments', _history_page(Assessment, ASSESSMENT_HISTORY_COLUMNS), methods=['GET'], middleware=_api('api_assessments')),
+    Route('/api/assessments/export', _history_export(Assessment, ASSESSMENT_HISTORY_COLUMNS, 'assessments.ndjson'), methods=['GET'], middleware=_api('api_assessments_export')),
+    Route('/api/bite-analyses', _history_page(BiteAnalysis, BITE_HISTORY_COLUMNS), methods=['GET'], middleware=_api('api_bite_analyses')),
+    Route('/api/bite-analyses/export', _history_export(BiteAnalysis, BITE_HISTORY_COLUMNS, 'bite-analyses.ndjson'), methods=['GET'], middleware=_api('api_bite_analyses_export')),
+    # Everything else, including the pages and static files, stays on Flask.
+    Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
@@ -0,0 +1,7 @@
+"""Moved to dengue_core.avatars; this module keeps `import avatars` working."""
+
+import sys
+
+from dengue_core import avatars
+
+sys.modules[__name__] = avatars
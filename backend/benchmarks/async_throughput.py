@@ -0,0 +1,190 @@
+"""Sync vs ASGI throughput at a fixed gunicorn worker count.
+
+Starts `gunicorn app_supabase:app` (sync workers) and then
+`gunicorn -k uvicorn.workers.UvicornWorker asgi_app:app` with the same number
+of workers, drives both with the same concurrent keep-alive clients against
+the analysis fetch, history page and bite upload endpoints, and prints
+requests/s and latency percentiles per mode.
+
+    cd backend && DATABASE_URL=postgresql://... python benchmarks/async_throughput.py \\
+        [--workers 2] [--concurrency 32] [--duration 15] [--json results.json]
+
+Point DATABASE_URL at a database that is as far away as production (e.g. the
+Supabase pooler); with a local socket the DB round trip is too short for the
+event loop to win anything.
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DB_CHECK_CONNECTION_BUDGET', 'false')
+
+import database
+import session_store
+from app_supabase import app as flask_app
+from flask.sessions import SecureCookieSessionInterface
+
+MODES = {
+    'sync': ['app_supabase:app'],
+    'asgi': ['-k', 'uvicorn.workers.UvicornWorker', 'asgi_app:app'],
+}
+
+
+def _seed(rows):
+    database.create_tables()
+    db = database.SessionLocal()
+    try:
+        user = database.User(email=f'bench-{uuid.uuid4().hex[:8]}@example.com', password_hash='x')
+        db.add(user)
+        db.flush()
+        analysis = None
+        for _ in range(rows):
+            analysis = database.BiteAnalysis(user_id=user.id, label_text='Detected: red/pink area', label_class='red')
+            db.add(analysis)
+        db.commit()
+        return str(user.id), str(analysis.id)
+    finally:
+        db.close()
+
+
+def _session_cookie(user_id):
+    """Signed session cookie for user_id, registered in user_sessions."""
+    token = session_store.create_session(user_id, flask_app.permanent_session_lifetime)
+    data = {'logged_in': True, 'user_id': user_id, session_store.SID_KEY: token}
+    return SecureCookieSessionInterface().get_signing_serializer(flask_app).dumps(data)
+
+
+def _upload_body():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new('RGB', (640, 480), (210, 40, 50)).save(buf, format='JPEG')
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="bite.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode() + buf.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def _drive(port, requests, concurrency, duration, cookie):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(i):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        n = i
+        while time.perf_counter() < stop_at:
+            method, path, body, content_type = requests[n % len(requests)]
+            n += 1
+            headers = {'Cookie': f'session={cookie}'}
+            if content_type:
+                headers['Content-Type'] = content_type
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status < 400
+            except Exception:
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }
+
+
+def run(workers, concurrency, duration, rows, upload_share):
+    user_id, analysis_id = _seed(rows)
+    cookie = _session_cookie(user_id)
+    upload, upload_type = _upload_body()
+    reads = [
+        ('GET', f'/api/analysis/{analysis_id}', None, None),
+        ('GET', '/api/bite-analyses?limit=20', None, None),
+    ]
+    requests = list(reads)
+    if upload_share:
+        requests = reads * upload_share + [('POST', '/api/analyze-bite', upload, upload_type)]
+
+    results = {}
+    for mode, target in MODES.items():
+        port = _free_port()
+        cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--timeout', '120', '--log-level', 'warning'] + target
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=os.environ.copy())
+        try:
+            _wait_for(port)
+            _drive(port, reads, concurrency, 2, cookie)  # warm up pools and imports
+            results[mode] = _drive(port, requests, concurrency, duration, cookie)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+        print(f"{mode:<5} {json.dumps(results[mode])}")
+    return {'workers': workers, 'concurrency': concurrency, 'duration': duration, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--upload-share', type=int, default=10,
+                        help='one upload per this many read pairs; 0 for reads only')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    out = run(args.workers, args.concurrency, args.duration, args.rows, args.upload_share)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(out, f, indent=2)
@@ -0,0 +1,155 @@
+"""Cache-Control, ETag and 304 checks for every http_cache policy, in both apps.
+
+    cd backend && python benchmarks/cache_headers.py [--apps app,app_supabase]
+
+Each app runs in its own process on scratch storage (a JSON data dir for
+app.py, a SQLite file for app_supabase.py) and is driven through the Flask
+test client, logged in where the page needs it. For every row of the matrix
+below it checks the status and Cache-Control of a plain GET. For cacheable
+rows it also checks that an ETag is sent and that repeating the request with
+If-None-Match gets a 304 with the same Cache-Control. Non-200 responses and
+endpoints without a policy must be no-store. Exits 1 on any mismatch.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ('app', 'app_supabase')
+
+
+def _matrix(module, upload_key):
+    from http_cache import CACHE_POLICIES, IMMUTABLE, NO_STORE, PRIVATE_REVALIDATE, REVALIDATE
+
+    def policy(endpoint):
+        return CACHE_POLICIES[endpoint][0]
+
+    # (name, path, logged in, expected status, expected Cache-Control)
+    rows = [
+        ('static', '/placeholder.svg', False, 200, REVALIDATE),
+        ('uploaded_file', f'/uploads/{upload_key}', False, 200, IMMUTABLE),
+        ('login', '/login', False, 200, PRIVATE_REVALIDATE),
+        ('register', '/register', False, 200, PRIVATE_REVALIDATE),
+        ('dashboard', '/dashboard', True, 200, PRIVATE_REVALIDATE),
+        ('education_what_is_dengue', '/education/what-is-dengue', True, 200, PRIVATE_REVALIDATE),
+        ('education_local_services', '/education/local-services', True, 200, PRIVATE_REVALIDATE),
+        ('report_bite', '/report-bite', True, 200, PRIVATE_REVALIDATE),
+        ('bite_analysis_result', '/bite-analysis-result', True, 200, PRIVATE_REVALIDATE),
+        # Not in CACHE_POLICIES: user-specific.
+        ('symptom_checker (no policy)', '/symptom-checker', True, 200, NO_STORE),
+        # Non-200 responses from endpoints that do have a policy.
+        ('uploaded_file 404', '/uploads/checks/missing.jpg', False, 404, NO_STORE),
+        ('login redirect', '/login', True, 302, NO_STORE),
+    ]
+    if module == 'app':
+        rows.append(('index', '/', False, 200, policy('index')))
+    else:
+        rows += [
+            ('landing_page', '/', False, 200, policy('landing_page')),
+            ('landing_assets', '/assets/index-3f2a9c.js', False, 200, IMMUTABLE),
+            ('landing_assets 404', '/assets/missing.js', False, 404, NO_STORE),
+            ('api_symptom_combinations', '/api/symptom-combinations', False, 200, REVALIDATE),
+        ]
+    return rows, NO_STORE
+
+
+def _check_app(module, scratch):
+    """Run the matrix inside this process; returns the list of failures."""
+    sys.path.insert(0, BACKEND_DIR)
+    if module == 'app_supabase':
+        import database
+        database.create_tables()
+    app_module = __import__(module)
+    if module == 'app_supabase':
+        # A built landing page: index.html plus one content-hashed asset.
+        dist = os.path.join(scratch, 'dist')
+        os.makedirs(os.path.join(dist, 'assets'))
+        with open(os.path.join(dist, 'index.html'), 'w') as f:
+            f.write('<!doctype html><script src="/assets/index-3f2a9c.js"></script>')
+        with open(os.path.join(dist, 'assets', 'index-3f2a9c.js'), 'w') as f:
+            f.write('console.log("landing");\n' * 64)
+        app_module.dist_dir = dist
+    from storage import get_storage
+    upload_key = get_storage().put(b'\xff\xd8\xff\xe0cache-headers-check', 'checks', '.jpg')
+
+    flask_app = app_module.app
+    anonymous = flask_app.test_client()
+    member = flask_app.test_client()
+    password = 'cache-headers-password'
+    member.post('/register', data={'email': 'cache-headers@example.com', 'password': password, 'confirm': password})
+
+    rows, no_store = _matrix(module, upload_key)
+    failures = []
+    for name, path, logged_in, status, expected in rows:
+        client = member if logged_in else anonymous
+        resp = client.get(path)
+        got = resp.headers.get('Cache-Control')
+        problems = []
+        if resp.status_code != status:
+            problems.append(f'status {resp.status_code}, expected {status}')
+        if got != expected:
+            problems.append(f'Cache-Control {got!r}, expected {expected!r}')
+        etag = resp.headers.get('ETag')
+        if expected == no_store:
+            if resp.headers.get('Pragma') != 'no-cache':
+                problems.append('no-store without Pragma: no-cache')
+        elif resp.status_code == 200:
+            if not etag:
+                problems.append('no ETag')
+            else:
+                again = client.get(path, headers={'If-None-Match': etag})
+                if again.status_code != 304:
+                    problems.append(f'If-None-Match gave {again.status_code}, expected 304')
+                elif again.headers.get('Cache-Control') != expected:
+                    problems.append(f"304 Cache-Control {again.headers.get('Cache-Control')!r}")
+        shown = path if len(path) <= 34 else path[:31] + '...'
+        print(f"  {'FAIL' if problems else 'ok':<5}{name:<30}{shown:<36}{got}")
+        for problem in problems:
+            print(f"       {problem}")
+        failures.extend(f'{module} {name}: {p}' for p in problems)
+    return failures
+
+
+def _app_env(module, scratch):
+    env = os.environ.copy()
+    env.update({
+        'STORAGE_LOCAL_ROOT': os.path.join(scratch, 'uploads'),
+        'RATE_LIMIT_SHM_PATH': os.path.join(scratch, 'ratelimit.shm'),
+        'RATE_LIMIT_SQLITE_PATH': os.path.join(scratch, 'ratelimit.db'),
+        'RATE_LIMIT_ENABLED': 'false',
+        'DATA_DIR': os.path.join(scratch, 'data'),
+        'DATABASE_URL': 'sqlite:///' + os.path.join(scratch, 'cache-headers.db'),
+    })
+    env.pop('STORAGE_BACKEND', None)
+    return env
+
+
+def run(apps):
+    failed = False
+    for module in apps:
+        scratch = tempfile.mkdtemp(prefix=f'cache-headers-{module}-')
+        print(module)
+        try:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', module, scratch],
+                                  cwd=BACKEND_DIR, env=_app_env(module, scratch))
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        failed = failed or proc.returncode != 0
+    return not failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', default=','.join(APPS), help='comma list of app, app_supabase')
+    parser.add_argument('--run-one', nargs=2, metavar=('MODULE', 'SCRATCH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_one:
+        failures = _check_app(*args.run_one)
+        sys.exit(1 if failures else 0)
+    ok = run([a.strip() for a in args.apps.split(',') if a.strip()])
+    print('all cache headers as expected' if ok else 'cache header mismatches above')
+    sys.exit(0 if ok else 1)
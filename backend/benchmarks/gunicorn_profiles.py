@@ -0,0 +1,95 @@
+"""Load-test gunicorn.conf.py across worker/thread layouts.
+
+Each profile runs `gunicorn -c gunicorn.conf.py app_supabase:app` with
+WEB_CONCURRENCY / GUNICORN_THREADS (and optionally GUNICORN_PRELOAD) set, then
+drives the same mix of page, API and upload requests as async_throughput.py.
+It reports requests/s, latency percentiles and the memory (PSS) of the
+master and workers.
+
+    cd backend && DATABASE_URL=postgresql://... python benchmarks/gunicorn_profiles.py \\
+        [--profiles 1x1,2x1,2x4,3x4] [--no-preload] [--duration 15] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+
+from async_throughput import BACKEND_DIR, _drive, _free_port, _seed, _session_cookie, _upload_body, _wait_for
+
+
+def _tree_pss_mb(pid):
+    """Proportional set size of pid and its direct children in MB.
+
+    PSS splits shared pages between the processes sharing them, so unlike RSS
+    it shows what preload_app saves.
+    """
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024, 1)
+
+
+def run(profiles, concurrency, duration, preload, upload_share):
+    user_id, analysis_id = _seed(100)
+    cookie = _session_cookie(user_id)
+    upload, upload_type = _upload_body()
+    reads = [
+        ('GET', '/dashboard', None, None),
+        ('GET', f'/api/analysis/{analysis_id}', None, None),
+        ('GET', '/api/bite-analyses?limit=20', None, None),
+    ]
+    requests = list(reads)
+    if upload_share:
+        requests = reads * upload_share + [('POST', '/api/analyze-bite', upload, upload_type)]
+
+    results = {}
+    for profile in profiles:
+        workers, threads = profile.split('x')
+        env = dict(os.environ, WEB_CONCURRENCY=workers, GUNICORN_THREADS=threads,
+                   GUNICORN_PRELOAD='true' if preload else 'false')
+        port = _free_port()
+        env['PORT'] = str(port)
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+               '--log-level', 'warning', 'app_supabase:app']
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+        try:
+            _wait_for(port)
+            _drive(port, reads, concurrency, 2, cookie)
+            result = _drive(port, requests, concurrency, duration, cookie)
+            result['pss_mb'] = _tree_pss_mb(proc.pid)
+            results[profile] = result
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+        print(f"{profile:<6} {json.dumps(results[profile])}")
+    return {'concurrency': concurrency, 'duration': duration, 'preload': preload, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='1x1,2x1,2x4,3x4', help='comma list of WORKERSxTHREADS')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--no-preload', action='store_true')
+    parser.add_argument('--upload-share', type=int, default=10)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    out = run(args.profiles.split(','), args.concurrency, args.duration, not args.no_preload, args.upload_share)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(out, f, indent=2)
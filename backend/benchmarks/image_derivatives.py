@@ -0,0 +1,62 @@
+"""Bytes stored and served per bite photo: full-size JPEG q92 vs bite_images derivatives.
+
+    cd backend && python benchmarks/image_derivatives.py [--corpus ../frontend/public/uploads/bites]
+
+"result page" is what bite_analysis_result.html downloads (the stored
+original); "list" is what a history thumbnail costs.
+"""
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from dengue_core.bite_images import derivative_format, render_derivatives
+
+
+def _legacy_jpeg(image_bytes):
+    im = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    buf = io.BytesIO()
+    im.save(buf, format='JPEG', quality=92)
+    return buf.getvalue()
+
+
+def run(corpus):
+    paths = sorted(glob.glob(os.path.join(corpus, '*.jpg')) + glob.glob(os.path.join(corpus, '*.png')))
+    if not paths:
+        sys.exit(f"no images in {corpus}")
+    legacy = original = thumbnail = 0
+    legacy_secs = derivative_secs = 0.0
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        started = time.perf_counter()
+        legacy += len(_legacy_jpeg(data))
+        legacy_secs += time.perf_counter() - started
+        started = time.perf_counter()
+        o, t = render_derivatives(data)
+        derivative_secs += time.perf_counter() - started
+        original += len(o)
+        thumbnail += len(t)
+    n = len(paths)
+    print(f"{n} photos, derivatives as {derivative_format()}")
+    print(f"{'':<22}{'total KB':>10}{'KB/photo':>10}{'ms/photo':>10}")
+    print(f"{'JPEG q92 full size':<22}{legacy / 1024:10.0f}{legacy / n / 1024:10.1f}{legacy_secs / n * 1000:10.1f}")
+    print(f"{'original + thumbnail':<22}{(original + thumbnail) / 1024:10.0f}"
+          f"{(original + thumbnail) / n / 1024:10.1f}{derivative_secs / n * 1000:10.1f}")
+    print(f"storage saved: {1 - (original + thumbnail) / legacy:.1%}")
+    print(f"result page bytes saved: {1 - original / legacy:.1%}")
+    print(f"list bytes saved (thumbnail vs full image): {1 - thumbnail / legacy:.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'frontend', 'public', 'uploads', 'bites'))
+    args = parser.parse_args()
+    run(args.corpus)
@@ -0,0 +1,95 @@
+"""Synthetic oversized uploads against the analysis decode guard.
+
+    cd backend && python benchmarks/image_guard.py
+
+Each case is built in memory, then run through decode_scaled() in a fresh
+process. That process's address space is capped at 1.25x the decode budget
+above its size at start, so a decode the guard misjudges fails with
+MemoryError instead of swapping. Exits 1 if any case gets the wrong outcome.
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from dengue_core import images
+
+
+def _encode(mode, size, fmt, **kw):
+    buf = io.BytesIO()
+    Image.new(mode, size).save(buf, format=fmt, **kw)
+    return buf.getvalue()
+
+
+def _png_header_only(width, height):
+    """A tiny PNG whose header claims width x height (the classic bomb shape)."""
+    data = bytearray(_encode('L', (1, 1), 'PNG'))
+    data[16:24] = width.to_bytes(4, 'big') + height.to_bytes(4, 'big')
+    data[29:33] = zlib.crc32(bytes(data[12:29])).to_bytes(4, 'big')
+    return bytes(data)
+
+
+CASES = [
+    # name, builder, expected to be accepted
+    ('12 MP JPEG photo', lambda: _encode('RGB', (4000, 3000), 'JPEG', quality=85), True),
+    ('48 MP JPEG photo', lambda: _encode('RGB', (8000, 6000), 'JPEG', quality=85), True),
+    ('8k x 8k PNG (64 MP)', lambda: _encode('L', (8000, 8000), 'PNG'), False),
+    ('5k x 5k RGBA PNG', lambda: _encode('RGBA', (5000, 5000), 'PNG'), False),
+    ('3k x 2k RGB PNG', lambda: _encode('RGB', (3000, 2000), 'PNG'), True),
+    ('4.8k x 4.8k RGB PNG', lambda: _encode('RGB', (4800, 4800), 'PNG'), True),
+    ('20k x 20k header bomb', lambda: _png_header_only(20000, 20000), False),
+    ('65k x 65k header bomb', lambda: _png_header_only(65000, 65000), False),
+    ('16 MB of bytes', lambda: b'\xff' * (16 * 1024 * 1024), False),
+]
+
+
+def _address_space():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[0]) * resource.getpagesize()
+
+
+def _run_case(data, queue):
+    cap = _address_space() + int(1.25 * images.IMAGE_TASK_MEMORY_MB * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+    started = time.perf_counter()
+    try:
+        im = images.decode_scaled(data, 200)
+        outcome = f"decoded {im.size[0]}x{im.size[1]}"
+        accepted = True
+    except images.ImageTooLarge as e:
+        outcome = f"413: {e}"
+        accepted = False
+    except Exception as e:
+        outcome = f"error: {e!r}"
+        accepted = None
+    queue.put((len(data), accepted, outcome, time.perf_counter() - started))
+
+
+def run():
+    failures = 0
+    ctx = multiprocessing.get_context('spawn')
+    print(f"budget {images.IMAGE_TASK_MEMORY_MB:.0f} MB, {images.IMAGE_MAX_PIXELS} px, {images.IMAGE_MAX_BYTES} bytes")
+    for name, build, expected in CASES:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_case, args=(build(), queue))
+        proc.start()
+        size, accepted, outcome, elapsed = queue.get()
+        proc.join()
+        ok = accepted == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24}{size / 1024:9.0f} KB {elapsed * 1000:8.1f} ms  {outcome}")
+    return failures
+
+
+if __name__ == '__main__':
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    sys.exit(1 if run() else 0)
@@ -0,0 +1,122 @@
+"""Cold-start cost: how long importing the app takes, and what it spends it on.
+
+    cd backend && python benchmarks/import_time.py [--module app_supabase] [--runs 7]
+        [--top 15] [--json out.json]
+
+Each run is a fresh interpreter under `python -X importtime`, against a
+scratch SQLite database, so nothing is warm but the OS file cache. Reported:
+  import_ms         median wall time of `import <module>`, from -X importtime
+  first_request_ms  median time from interpreter start to the first response
+                    of GET /api/symptom-combinations through the test client
+                    (the scoring table comes from its cached artifact)
+  packages          median cumulative import time per top-level package,
+                    largest first, so a dependency that sneaks back into the
+                    import path shows up by name
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FIRST_REQUEST = """
+import time
+started = time.perf_counter()
+import {module}
+app = getattr({module}, 'app')
+client = app.test_client()
+client.get('/api/symptom-combinations')
+print('FIRST_REQUEST_MS', (time.perf_counter() - started) * 1000)
+"""
+
+
+def _env(scratch):
+    env = os.environ.copy()
+    env.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(scratch, 'import.db'),
+        'STORAGE_LOCAL_ROOT': os.path.join(scratch, 'uploads'),
+        'RATE_LIMIT_SHM_PATH': os.path.join(scratch, 'ratelimit.shm'),
+        'DB_CHECK_CONNECTION_BUDGET': 'false',
+    })
+    return env
+
+
+def _parse_importtime(stderr, module):
+    """(total us for module, {top-level package: cumulative us}) for what module imports."""
+    total, packages, pending = None, {}, []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue  # the header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        # Children print before their parent, so direct imports are collected
+        # until the depth-0 line that owns them. Interpreter startup (site and
+        # its .pth hooks) owns its own and is dropped.
+        if depth == 1:
+            pending.append((name, cumulative))
+        elif depth == 0:
+            if name == module:
+                total = cumulative
+                for child, us in pending:
+                    top = child.split('.')[0]
+                    packages[top] = packages.get(top, 0) + us
+            pending = []
+    return total, packages
+
+
+def run(module, runs, top):
+    scratch = tempfile.mkdtemp(prefix='import-time-')
+    env = _env(scratch)
+    # Compile once, so the runs measure imports rather than writing .pyc files.
+    subprocess.run([sys.executable, '-c', f'import {module}'], cwd=BACKEND_DIR, env=env, check=True,
+                   capture_output=True)
+    subprocess.run([sys.executable, '-c', 'import database; database.create_tables()'],
+                   cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+    totals, first, packages = [], [], {}
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+        total, pkgs = _parse_importtime(proc.stderr, module)
+        totals.append(total / 1000)
+        for name, us in pkgs.items():
+            packages.setdefault(name, []).append(us / 1000)
+        proc = subprocess.run([sys.executable, '-c', _FIRST_REQUEST.format(module=module)],
+                              cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+        first.append(float(proc.stdout.rsplit('FIRST_REQUEST_MS', 1)[1]))
+    ranked = sorted(((statistics.median(v), name) for name, v in packages.items()), reverse=True)[:top]
+    return {
+        'module': module,
+        'runs': runs,
+        'python': sys.version.split()[0],
+        'import_ms': round(statistics.median(totals), 1),
+        'first_request_ms': round(statistics.median(first), 1),
+        'packages': {name: round(ms, 1) for ms, name in ranked},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app_supabase')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    out = run(args.module, args.runs, args.top)
+    print(f"import {out['module']}: {out['import_ms']:.1f} ms, first request {out['first_request_ms']:.1f} ms "
+          f"(median of {out['runs']}, Python {out['python']})")
+    for name, ms in out['packages'].items():
+        print(f"  {name:<28}{ms:>9.1f} ms")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(out, f, indent=2)
@@ -0,0 +1,262 @@
+"""Mixed-traffic HTTP load test, per route and per backend.
+
+Starts gunicorn once per backend, each on scratch storage:
+  json      app:app           JSON-file DB (DATA_DIR) and local uploads
+  sqlite    app_supabase:app  SQLite file
+  postgres  app_supabase:app  --database-url, e.g. a throwaway container:
+              docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=pw postgres:16
+              --database-url postgresql://postgres:pw@127.0.0.1:5432/postgres
+
+Each virtual user follows the path a visitor takes: register, log out, log
+in, then repeatedly opens the symptom checker, submits a risk assessment,
+uploads a bite photo and polls its result. Latency percentiles, throughput
+and error rate are reported per route, plus a total for each backend. A
+register or login that does not land on /dashboard counts as an error.
+
+    cd backend && python benchmarks/load_test.py [--backends json,sqlite]
+        [--database-url postgresql://...] [--users 16] [--duration 30]
+        [--workers 2] [--threads 4] [--json results.json]
+
+Rate limits are switched off in the servers (the whole load comes from one
+IP); pass --rate-limits to keep them.
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from dengue_core import ENHANCED_SYMPTOMS_DATA  # noqa: E402
+
+# The scorer's own ids; an unknown id is silently dropped and scores nothing.
+SYMPTOMS = sorted(ENHANCED_SYMPTOMS_DATA)
+POLLS_PER_UPLOAD = 2
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def _bite_uploads(count, seed=7):
+    """Multipart bodies of small seeded bite-like JPEGs."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        im = Image.new('RGB', (960, 720), (222 + rng.randint(-20, 20), 174, 142))
+        r = rng.randint(40, 120)
+        cx, cy = rng.randint(300, 660), rng.randint(200, 520)
+        ImageDraw.Draw(im).ellipse((cx - r, cy - r, cx + r, cy + r), fill=(206, 50, 50))
+        buf = io.BytesIO()
+        im.save(buf, format='JPEG', quality=85)
+        boundary = uuid.uuid4().hex
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="bite.jpg"\r\n'
+                f'Content-Type: image/jpeg\r\n\r\n').encode() + buf.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+        bodies.append((body, f'multipart/form-data; boundary={boundary}'))
+    return bodies
+
+
+class _Client:
+    """Keep-alive connection with a session cookie jar of one."""
+
+    def __init__(self, port, record):
+        self.port = port
+        self.record = record
+        self.cookie = None
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, route, method, path, body=None, content_type=None, ok=None):
+        headers = {}
+        if self.cookie:
+            headers['Cookie'] = f'session={self.cookie}'
+        if content_type:
+            headers['Content-Type'] = content_type
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            data = resp.read()
+        except Exception:
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            self.record(route, time.perf_counter() - started, False)
+            return None, None
+        for header in resp.msg.get_all('Set-Cookie') or []:
+            if header.startswith('session='):
+                self.cookie = header.split(';', 1)[0].split('=', 1)[1] or None
+        good = ok(resp, data) if ok else resp.status < 400
+        self.record(route, time.perf_counter() - started, good)
+        return resp, data
+
+    def close(self):
+        self.conn.close()
+
+
+def _lands_on_dashboard(resp, data):
+    return resp.status in (302, 303) and (resp.getheader('Location') or '').endswith('/dashboard')
+
+
+def _virtual_user(port, stop_at, uploads, record, seed):
+    rng = random.Random(seed)
+    client = _Client(port, record)
+    email = f'load-{uuid.uuid4().hex[:12]}@example.com'
+    password = 'load-test-password'
+    form = 'application/x-www-form-urlencoded'
+    credentials = f'email={email}&password={password}'
+    client.request('GET /register', 'GET', '/register')
+    client.request('POST /register', 'POST', '/register', f'{credentials}&confirm={password}', form, _lands_on_dashboard)
+    client.request('GET /logout', 'GET', '/logout', ok=lambda resp, data: resp.status in (302, 303))
+    client.request('POST /login', 'POST', '/login', credentials, form, _lands_on_dashboard)
+    while time.perf_counter() < stop_at:
+        client.request('GET /symptom-checker', 'GET', '/symptom-checker')
+        picked = rng.sample(SYMPTOMS, rng.randint(1, 5))
+        client.request('GET /risk-assessment', 'GET', '/risk-assessment?' + '&'.join(f'symptoms={s}' for s in picked))
+        body, content_type = rng.choice(uploads)
+        resp, data = client.request('POST /api/analyze-bite', 'POST', '/api/analyze-bite', body, content_type)
+        try:
+            analysis_id = json.loads(data)['analysis_id'] if resp is not None and resp.status == 200 else None
+        except Exception:
+            analysis_id = None
+        if analysis_id:
+            client.request('GET /bite-analysis-result', 'GET', f'/bite-analysis-result?aid={analysis_id}')
+            for _ in range(POLLS_PER_UPLOAD):
+                client.request('GET /api/analysis/:id', 'GET', f'/api/analysis/{analysis_id}')
+    client.close()
+
+
+def _summary(latencies, errors, duration):
+    latencies = sorted(latencies)
+    count = len(latencies) + errors
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'rps': round(count / duration, 2),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }
+
+
+def _drive(port, users, duration, uploads):
+    latencies, errors, lock = {}, {}, threading.Lock()
+
+    def record(route, elapsed, good):
+        with lock:
+            if good:
+                latencies.setdefault(route, []).append(elapsed)
+            else:
+                errors[route] = errors.get(route, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_virtual_user, args=(port, started + duration, uploads, record, i))
+               for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    routes = sorted(set(latencies) | set(errors))
+    out = {route: _summary(latencies.get(route, []), errors.get(route, 0), elapsed) for route in routes}
+    out['total'] = _summary([x for v in latencies.values() for x in v], sum(errors.values()), elapsed)
+    return out
+
+
+def _backend_env(name, scratch, database_url, rate_limits):
+    env = os.environ.copy()
+    env.update({
+        'STORAGE_LOCAL_ROOT': os.path.join(scratch, 'uploads'),
+        'RATE_LIMIT_SHM_PATH': os.path.join(scratch, 'ratelimit.shm'),
+        'RATE_LIMIT_SQLITE_PATH': os.path.join(scratch, 'ratelimit.db'),
+    })
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    if not rate_limits:
+        env['RATE_LIMIT_ENABLED'] = 'false'
+    if name == 'json':
+        env['DATA_DIR'] = os.path.join(scratch, 'data')
+        return 'app:app', env
+    env['DATABASE_URL'] = database_url if name == 'postgres' else 'sqlite:///' + os.path.join(scratch, 'load.db')
+    env['DB_CHECK_CONNECTION_BUDGET'] = 'false'
+    # Tables are created by a one-off process, so workers never race on DDL.
+    subprocess.run([sys.executable, '-c', 'import database; database.create_tables()'],
+                   cwd=BACKEND_DIR, env=env, check=True)
+    return 'app_supabase:app', env
+
+
+def run(backends, database_url, users, duration, workers, threads, rate_limits):
+    uploads = _bite_uploads(8)
+    results = {}
+    for name in backends:
+        scratch = tempfile.mkdtemp(prefix=f'load-{name}-')
+        target, env = _backend_env(name, scratch, database_url, rate_limits)
+        port = _free_port()
+        cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--threads', str(threads), '--timeout', '120', '--log-level', 'warning', target]
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+        try:
+            _wait_for(port)
+            results[name] = _drive(port, users, duration, uploads)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+            shutil.rmtree(scratch, ignore_errors=True)
+        print(f"\n{name} ({target}, {workers} workers x {threads} threads, {users} users, {duration:.0f}s)")
+        print(f"{'route':<28}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for route, s in results[name].items():
+            print(f"{route:<28}{s['requests']:>7}{s['rps']:>8.1f}{s['error_rate'] * 100:>7.1f}"
+                  f"{s['p50_ms'] or 0:>9.1f}{s['p95_ms'] or 0:>9.1f}{s['p99_ms'] or 0:>9.1f}")
+    return {'users': users, 'duration': duration, 'workers': workers, 'threads': threads, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='json,sqlite',
+                        help='comma list of json, sqlite, postgres; postgres is added when --database-url is given')
+    parser.add_argument('--database-url')
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--rate-limits', action='store_true')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    if args.database_url and 'postgres' not in backends:
+        backends.append('postgres')
+    if 'postgres' in backends and not args.database_url:
+        parser.error('postgres needs --database-url')
+    out = run(backends, args.database_url, args.users, args.duration, args.workers, args.threads, args.rate_limits)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(out, f, indent=2)
@@ -0,0 +1,36 @@
+"""Per-check cost of each rate limiter backend.
+
+    cd backend && python benchmarks/rate_limit_check.py [--checks 50000] [--keys 1000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import MemoryBackend, SharedMemoryBackend, SQLiteBackend
+
+
+def run(checks, keys):
+    tmp = tempfile.mkdtemp()
+    backends = {
+        'memory': MemoryBackend(),
+        'shm': SharedMemoryBackend(os.path.join(tmp, 'ratelimit.shm')),
+        'sqlite': SQLiteBackend(os.path.join(tmp, 'ratelimit.db')),
+    }
+    for name, backend in backends.items():
+        started = time.perf_counter()
+        for i in range(checks):
+            backend.hit(f"api_analyze_bite|ip:10.0.{i % keys // 256}.{i % 256}", 1e9, 1e9)
+        print(f"{name:<7} {(time.perf_counter() - started) / checks * 1e6:6.2f} us/check")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', type=int, default=50000)
+    parser.add_argument('--keys', type=int, default=1000)
+    args = parser.parse_args()
+    run(args.checks, args.keys)
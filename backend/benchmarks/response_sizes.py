@@ -0,0 +1,96 @@
+"""Bytes-on-the-wire benchmark for response compression.
+
+Requests representative pages and JSON endpoints through the Flask test client
+with Accept-Encoding identity / gzip / br and reports the transferred size and
+the time spent per request. Uses a scratch SQLite database unless
+DATABASE_URL is already set.
+
+    cd backend && python benchmarks/response_sizes.py [--rows 500] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if not os.getenv('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ.setdefault('DB_CHECK_CONNECTION_BUDGET', 'false')
+
+import compression
+import database
+from app_supabase import app
+
+PATHS = [
+    '/dashboard',
+    '/education/what-is-dengue',
+    '/education/local-services',
+    '/risk-assessment?symptoms=fever-high&symptoms=severe-headache&symptoms=rash',
+    '/api/symptom-combinations',
+    '/api/assessments?limit=100',
+    '/api/assessments/export',
+]
+ENCODINGS = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+
+
+def _seed(rows):
+    database.create_tables()
+    db = database.SessionLocal()
+    try:
+        user = database.User(email=f'bench-{uuid.uuid4().hex[:8]}@example.com', password_hash='x', username='bench')
+        db.add(user)
+        db.flush()
+        now = datetime.utcnow()
+        for i in range(rows):
+            db.add(database.Assessment(
+                user_id=user.id,
+                created_at=now - timedelta(minutes=i),
+                symptoms=['fever-high', 'severe-headache', 'rash'],
+                probability=0.42,
+                risk_level='moderate',
+            ))
+        db.commit()
+        return str(user.id), user.email
+    finally:
+        db.close()
+
+
+def run(rows, repeat):
+    user_id, email = _seed(rows)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['user_id'] = user_id
+        sess['email'] = email
+
+    print(f"{'path':<58} {'status':>6} " + ' '.join(f"{e:>16}" for e in ENCODINGS))
+    totals = dict.fromkeys(ENCODINGS, 0)
+    for path in PATHS:
+        cells, status = [], None
+        for encoding in ENCODINGS:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                resp = client.get(path, headers={'Accept-Encoding': encoding})
+                body = resp.get_data()
+            elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+            status = resp.status_code
+            totals[encoding] += len(body)
+            cells.append(f"{len(body):>8}B {elapsed_ms:>5.1f}ms")
+        print(f"{path[:58]:<58} {status:>6} " + ' '.join(cells))
+
+    print()
+    base = totals['identity'] or 1
+    for encoding in ENCODINGS:
+        print(f"{encoding:<9} {totals[encoding]:>10} bytes  {100 * totals[encoding] / base:5.1f}% of identity")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500, help='assessments seeded for the history endpoints')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
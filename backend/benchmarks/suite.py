@@ -0,0 +1,246 @@
+"""Reproducible benchmark suite for bite analysis, risk scoring and the main routes.
+
+    cd backend && python benchmarks/suite.py [--repeat 5] [--json out.json]
+        [--compare benchmarks/results/<older>.json] [--threshold 0.15]
+
+Measures, in one process with a scratch SQLite database:
+  analyze.<WxH>.*     analyze_image_bytes latency and images/s on a synthetic
+                      corpus (seeded, so every run decodes the same JPEGs),
+                      plus the photos behind the data/analyses samples
+  scoring.calls_per_s enhanced_probability over fixed symptom sets
+  route.<name>.*      Flask test-client latency for the main pages and APIs,
+                      /api/symptom-combinations included
+
+Results go to benchmarks/results/<commit>.json unless --json says otherwise.
+With --compare, every shared metric is checked against the older file. The
+run exits 1 when one is worse by more than --threshold; each metric records
+whether lower or higher is better.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+_scratch = tempfile.mkdtemp()
+if not os.getenv('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_scratch, 'bench.db')
+os.environ.setdefault('STORAGE_LOCAL_ROOT', os.path.join(_scratch, 'uploads'))
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('DB_CHECK_CONNECTION_BUDGET', 'false')
+
+import PIL
+from PIL import Image, ImageDraw, ImageFilter
+
+import database
+from app_supabase import app
+from dengue_core import ENHANCED_SYMPTOMS_DATA, analyze_image_bytes, enhanced_probability
+from async_throughput import _seed, _session_cookie
+
+SEED = 20240611
+RESOLUTIONS = [(640, 480), (1600, 1200), (4000, 3000)]
+IMAGES_PER_RESOLUTION = 4
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+SAMPLES_DIR = os.path.join(BACKEND_DIR, 'data', 'analyses')
+STATIC_DIR = os.path.join(BACKEND_DIR, '..', 'frontend', 'public')
+
+
+def synthetic_bite(rng, size):
+    """Skin-toned JPEG with a blurred red bite and sometimes a yellow halo, drawn from rng."""
+    w, h = size
+    tone = tuple(max(0, min(255, c + rng.randint(-25, 25))) for c in (222, 174, 142))
+    # Low-frequency mottling from a seeded 32x24 grid, so it doesn't depend on PIL's noise RNG.
+    grid = Image.frombytes('L', (32, 24), bytes(rng.randint(96, 160) for _ in range(32 * 24)))
+    shade = grid.resize(size, Image.BICUBIC)
+    im = Image.composite(Image.new('RGB', size, tone), Image.new('RGB', size, tuple(c - 30 for c in tone)), shade)
+    draw = ImageDraw.Draw(im)
+    cx, cy = rng.uniform(0.3, 0.7) * w, rng.uniform(0.3, 0.7) * h
+    r = rng.uniform(0.04, 0.12) * min(w, h)
+    if rng.random() < 0.5:
+        draw.ellipse((cx - 2.2 * r, cy - 2.2 * r, cx + 2.2 * r, cy + 2.2 * r), fill=(214, 196, 74))
+    draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=(206, rng.randint(30, 70), rng.randint(30, 70)))
+    im = im.filter(ImageFilter.GaussianBlur(max(1, r / 6)))
+    buf = io.BytesIO()
+    im.save(buf, format='JPEG', quality=88)
+    return buf.getvalue(), {'cx': cx / w, 'cy': cy / h, 'r': 0.25}
+
+
+def corpus(seed=SEED):
+    """{label: [(jpeg bytes, roi), ...]}; identical for a given seed."""
+    rng = random.Random(seed)
+    out = {}
+    for size in RESOLUTIONS:
+        out[f"{size[0]}x{size[1]}"] = [synthetic_bite(rng, size) for _ in range(IMAGES_PER_RESOLUTION)]
+    samples = []
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(SAMPLES_DIR, name), encoding='utf-8') as f:
+            record = json.load(f)
+        path = os.path.join(STATIC_DIR, *(record.get('image_url') or '').strip('/').split('/'))
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                samples.append((f.read(), record.get('roi')))
+    if samples:
+        out['samples'] = samples
+    return out
+
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return pct(0.50), pct(0.95)
+
+
+def _metric(results, name, value, unit, better):
+    results[name] = {'value': round(value, 3), 'unit': unit, 'better': better}
+
+
+def bench_analysis(results, repeat):
+    for label, images in corpus().items():
+        for data, roi in images:
+            analyze_image_bytes(data, roi=roi)
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for data, roi in images:
+                t0 = time.perf_counter()
+                analyze_image_bytes(data, roi=roi)
+                latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        p50, p95 = _percentiles(latencies)
+        _metric(results, f"analyze.{label}.p50_ms", p50, 'ms', 'lower')
+        _metric(results, f"analyze.{label}.p95_ms", p95, 'ms', 'lower')
+        _metric(results, f"analyze.{label}.images_per_s", len(latencies) / elapsed, 'images/s', 'higher')
+
+
+def bench_scoring(results, seconds=2.0):
+    rng = random.Random(SEED)
+    names = sorted(ENHANCED_SYMPTOMS_DATA)
+    cases = [rng.sample(names, rng.randint(1, len(names))) for _ in range(256)]
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for symptoms in cases:
+            enhanced_probability(symptoms)
+        calls += len(cases)
+    _metric(results, 'scoring.calls_per_s', calls / (time.perf_counter() - started), 'calls/s', 'higher')
+
+
+def bench_routes(results, repeat):
+    user_id, analysis_id = _seed(50)
+    client = app.test_client()
+    client.set_cookie('session', _session_cookie(user_id))
+    upload, _ = synthetic_bite(random.Random(SEED), (1600, 1200))
+    routes = [
+        ('landing', 'GET', '/', None),
+        ('dashboard', 'GET', '/dashboard', None),
+        ('symptom_checker', 'GET', '/symptom-checker', None),
+        ('risk_assessment', 'GET', '/risk-assessment?symptoms=fever-high&symptoms=severe-headache&symptoms=rash', None),
+        ('symptom_combinations', 'GET', '/api/symptom-combinations', None),
+        ('analysis', 'GET', f'/api/analysis/{analysis_id}', None),
+        ('bite_history', 'GET', '/api/bite-analyses?limit=20', None),
+        ('analyze_bite', 'POST', '/api/analyze-bite', upload),
+    ]
+    for name, method, path, body in routes:
+        latencies = []
+        status = None
+        for i in range(repeat + 1):
+            t0 = time.perf_counter()
+            if body is not None:
+                resp = client.post(path, data={'image': (io.BytesIO(body), 'bite.jpg')}, content_type='multipart/form-data')
+            else:
+                resp = client.open(path, method=method)
+            resp.get_data()
+            if i:  # the first call warms templates and caches
+                latencies.append(time.perf_counter() - t0)
+            status = resp.status_code
+        if status >= 400:
+            print(f"warning: {method} {path} returned {status}")
+        p50, p95 = _percentiles(latencies)
+        _metric(results, f"route.{name}.p50_ms", p50, 'ms', 'lower')
+        _metric(results, f"route.{name}.p95_ms", p95, 'ms', 'lower')
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def compare(current, baseline, threshold):
+    """Regressed metric names, printing a line per shared metric."""
+    regressions = []
+    for name, cur in sorted(current.items()):
+        old = baseline.get(name)
+        if not old or not old['value']:
+            continue
+        change = cur['value'] / old['value'] - 1
+        worse = change > threshold if cur['better'] == 'lower' else change < -threshold
+        if worse:
+            regressions.append(name)
+        print(f"{'REGRESSED' if worse else '':<10}{name:<40}{old['value']:>12.3f}{cur['value']:>12.3f}{change:>+9.1%}")
+    return regressions
+
+
+def run(repeat, out_path, baseline_path, threshold):
+    database.create_tables()
+    results = {}
+    bench_analysis(results, repeat)
+    bench_scoring(results)
+    bench_routes(results, repeat * 4)
+    commit = _commit()
+    report = {
+        'commit': commit,
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'database': database.engine.dialect.name,
+        'seed': SEED,
+        'repeat': repeat,
+        'results': results,
+    }
+    out_path = out_path or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    for name, m in results.items():
+        print(f"{name:<40}{m['value']:>12.3f} {m['unit']}")
+    print(f"wrote {out_path}")
+
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nvs {baseline.get('commit')} (threshold {threshold:.0%})")
+        regressions = compare(results, baseline.get('results', {}), threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', dest='out_path')
+    parser.add_argument('--compare', dest='baseline_path')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    args = parser.parse_args()
+    sys.exit(run(args.repeat, args.out_path, args.baseline_path, args.threshold))
@@ -0,0 +1,91 @@
+-- Summary view benchmark
+-- Seeds a schema-loaded database with 10k users and 1M+ assessments, then
+-- compares the old aggregate/unbounded queries with the rollup table,
+-- materialized snapshots and "latest N" functions.
+--
+-- Run against a scratch database that already has denguetect_supabase_schema.sql:
+--   psql "$BENCH_DATABASE_URL" -v rows=1000000 -f backend/benchmarks/summary_views.sql
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+\set rows 1000000
+\endif
+\timing on
+
+-- ============================================================================
+-- SEED
+-- ============================================================================
+
+INSERT INTO users (id, email, password_hash, username, region)
+SELECT gen_random_uuid(), 'bench' || g || '@example.com', 'x', 'bench' || g,
+       (ARRAY['NCR', 'CALABARZON', 'Central Luzon', 'Western Visayas', 'Davao'])[1 + g % 5]
+FROM generate_series(1, 10000) g;
+
+-- Bulk load without the per-row trigger, then backfill the rollup once.
+ALTER TABLE assessments DISABLE TRIGGER assessments_maintain_user_stats;
+
+WITH ids AS (SELECT array_agg(id) AS arr FROM users WHERE email LIKE 'bench%')
+INSERT INTO assessments (user_id, created_at, symptoms, probability, risk_level)
+SELECT ids.arr[1 + g % 10000],
+       NOW() - (random() * INTERVAL '365 days'),
+       '["fever-high", "severe-headache"]'::jsonb,
+       random(),
+       (ARRAY['low', 'moderate', 'high'])[1 + (random() * 2)::int]
+FROM generate_series(1, :rows) g, ids;
+
+ALTER TABLE assessments ENABLE TRIGGER assessments_maintain_user_stats;
+
+TRUNCATE user_assessment_stats;
+INSERT INTO user_assessment_stats (user_id, total_assessments, last_assessment, highest_probability, current_risk_level)
+SELECT DISTINCT ON (user_id)
+       user_id,
+       COUNT(*) OVER w,
+       MAX(created_at) OVER w,
+       MAX(probability) OVER w,
+       risk_level
+FROM assessments
+WINDOW w AS (PARTITION BY user_id)
+ORDER BY user_id, created_at DESC;
+
+INSERT INTO bite_analyses (user_id, created_at, label_text, label_class)
+SELECT user_id, created_at, 'Detected: red/pink area', 'red'
+FROM assessments TABLESAMPLE SYSTEM (20);
+
+ANALYZE;
+
+-- ============================================================================
+-- PER-USER SUMMARY
+-- ============================================================================
+
+-- Before: full users x assessments aggregate
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT u.id, COUNT(a.id), MAX(a.created_at), MAX(a.probability), a.risk_level
+FROM users u
+LEFT JOIN assessments a ON u.id = a.user_id
+GROUP BY u.id, u.email, u.username, a.risk_level;
+
+-- After: rollup-backed view
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY)
+SELECT * FROM user_assessment_summary;
+
+-- Cost of the trigger on the write path
+EXPLAIN (ANALYZE, SUMMARY)
+INSERT INTO assessments (user_id, symptoms, probability, risk_level)
+SELECT id, '[]'::jsonb, 0.5, 'moderate' FROM users WHERE email LIKE 'bench%' LIMIT 1000;
+
+-- ============================================================================
+-- LATEST N
+-- ============================================================================
+
+-- Before: dashboard reads the unbounded, sorted views
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY) SELECT * FROM recent_assessments;
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY) SELECT * FROM bite_analysis_summary;
+
+-- After: index-driven latest N, and the materialized snapshots
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY) SELECT * FROM latest_assessments(50);
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY) SELECT * FROM latest_bite_analyses(50);
+
+SELECT refresh_summary_views();
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY) SELECT * FROM recent_assessments_mv ORDER BY created_at DESC LIMIT 50;
+EXPLAIN (ANALYZE, BUFFERS, SUMMARY) SELECT * FROM bite_analysis_summary_mv ORDER BY created_at DESC LIMIT 50;
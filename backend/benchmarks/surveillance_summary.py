@@ -0,0 +1,132 @@
+"""Surveillance summary latency: rollup versus aggregating the raw rows.
+
+    cd backend && python benchmarks/surveillance_summary.py [--rows 200000,1000000]
+        [--days 365] [--regions 17] [--repeat 20] [--json out.json]
+
+For each raw table size, seeds assessments spread over --days days and
+--regions user regions into a scratch SQLite database (or DATABASE_URL),
+rebuilds surveillance_daily from them, then times the same 28-day summary
+two ways: surveillance.summary() on the rollup, and the equivalent GROUP BY
+over assessments joined with users. Reports median and p95 in ms; the
+rollup column should stay flat as --rows grows.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+_scratch = tempfile.mkdtemp(prefix='surveillance-')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_scratch, 'surveillance.db'))
+os.environ.setdefault('DB_CHECK_CONNECTION_BUDGET', 'false')
+
+import database  # noqa: E402
+import surveillance  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+RISK_LEVELS = ('low', 'moderate', 'high')
+WINDOW_DAYS = 28
+
+
+def _seed(total, days, regions, rng, have):
+    """Top the assessments table up to total rows."""
+    db = database.SessionLocal()
+    try:
+        users = [r[0] for r in db.execute(select(database.User.id))]
+        if not users:
+            for i in range(regions * 20):
+                user = database.User(email=f'sv-{uuid.uuid4().hex[:10]}@example.com', password_hash='x',
+                                     region=f'region-{i % regions:02d}')
+                db.add(user)
+            db.commit()
+            users = [r[0] for r in db.execute(select(database.User.id))]
+        today = datetime.combine(date.today(), datetime.min.time())
+        batch = []
+        for _ in range(total - have):
+            batch.append({
+                'id': uuid.uuid4(),
+                'user_id': rng.choice(users),
+                'created_at': today - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400)),
+                'symptoms': [],
+                'probability': rng.random(),
+                'risk_level': rng.choice(RISK_LEVELS),
+            })
+            if len(batch) == 10000:
+                db.execute(insert(database.Assessment), batch)
+                batch = []
+        if batch:
+            db.execute(insert(database.Assessment), batch)
+        db.commit()
+        surveillance.rebuild(db, date.today() - timedelta(days=days), date.today())
+    finally:
+        db.close()
+
+
+def _raw_summary(db, start, end):
+    region = surveillance._assessment_region()
+    day = func.date(database.Assessment.created_at)
+    return db.execute(
+        select(region, day, database.Assessment.risk_level, func.count(), func.avg(database.Assessment.probability))
+        .select_from(database.Assessment)
+        .outerjoin(database.User, database.User.id == database.Assessment.user_id)
+        .where(database.Assessment.created_at >= datetime.combine(start, datetime.min.time()),
+               database.Assessment.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        .group_by(region, day, database.Assessment.risk_level)
+    ).all()
+
+
+def _time(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        db = database.ReadSessionLocal()
+        try:
+            started = time.perf_counter()
+            fn(db)
+            latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    latencies.sort()
+    return {'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)}
+
+
+def run(sizes, days, regions, repeat):
+    database.create_tables()
+    rng = random.Random(7)
+    end = date.today()
+    start = end - timedelta(days=WINDOW_DAYS - 1)
+    results, have = [], 0
+    for total in sorted(sizes):
+        _seed(total, days, regions, rng, have)
+        have = total
+        results.append({
+            'rows': total,
+            'rollup': _time(lambda db: surveillance.summary(db, start, end), repeat),
+            'raw': _time(lambda db: _raw_summary(db, start, end), max(3, repeat // 4)),
+        })
+        r = results[-1]
+        print(f"{total:>10} rows  rollup p50 {r['rollup']['p50_ms']:>8.2f} ms  p95 {r['rollup']['p95_ms']:>8.2f} ms"
+              f"  |  raw p50 {r['raw']['p50_ms']:>9.2f} ms")
+    return {'days': days, 'regions': regions, 'window_days': WINDOW_DAYS, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='200000,1000000', help='comma list of raw table sizes')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--regions', type=int, default=17)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    out = run([int(n) for n in args.rows.split(',')], args.days, args.regions, args.repeat)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(out, f, indent=2)
@@ -0,0 +1,7 @@
+"""Moved to dengue_core.bite_images; this module keeps `import bite_images` working."""
+
+import sys
+
+from dengue_core import bite_images
+
+sys.modules[__name__] = bite_images
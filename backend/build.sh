@@ -1,9 +1,12 @@
 set -o errexit
 
 pip install -r backend/requirements.txt
+(cd backend && python -m dengue_core)
 
 
 cd landing_page
 npm install
 npm run build
 cd ..
+
+python backend/compression.py precompress landing_page/dist
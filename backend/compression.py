@@ -0,0 +1,197 @@
+"""gzip / brotli response compression for HTML and JSON, plus precompressed
+static files.
+
+Install with install_compression(app) *before* install_cache_policy(app):
+Flask runs after_request hooks in reverse order, so compression then sees the
+final body and the ETag already computed on the uncompressed content. The ETag
+is weakened when the body is re-encoded, which still matches If-None-Match.
+
+    python compression.py precompress <dir> [<dir> ...]
+
+writes .gz (and .br when brotli is installed) next to compressible files so
+send_precompressed() can serve them without compressing per request.
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+import zlib
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+# Dynamic responses favour speed; offline precompression uses the max quality.
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'application/xml', 'image/svg+xml',
+}
+_PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _accepted_encodings():
+    """Encodings the client accepts with q > 0, e.g. {'gzip', 'br'}."""
+    accepted = set()
+    for part in (request.headers.get('Accept-Encoding') or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding():
+    accepted = _accepted_encodings()
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    """Streaming compressor with one interface for gzip and brotli."""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._flush = self._obj.process, self._obj.finish
+        else:
+            self._obj = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._flush = self._obj.compress, self._obj.flush
+
+    def compress(self, data):
+        return self._compress(data)
+
+    def flush(self):
+        return self._flush()
+
+
+def _compress_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _weaken_etag(response):
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response.headers['ETag'] = f'W/{etag}'
+
+
+def compress_response(response):
+    if response.status_code != 200 or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if 'no-transform' in (response.headers.get('Cache-Control') or ''):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        compressor = _Compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.flush())
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def send_precompressed(directory, filename, **kwargs):
+    """send_from_directory that prefers a sibling .br / .gz the client accepts."""
+    mimetype = mimetypes.guess_type(filename)[0]
+    if mimetype in COMPRESSIBLE_MIMETYPES or (mimetype or '').startswith('text/'):
+        accepted = _accepted_encodings()
+        for encoding, ext in _PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            if os.path.isfile(os.path.join(directory, filename + ext)):
+                response = send_from_directory(directory, filename + ext, mimetype=mimetype, **kwargs)
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+    return send_from_directory(directory, filename, **kwargs)
+
+
+def install_compression(app):
+    if app.static_folder and 'static' in app.view_functions:
+        def static_with_precompressed(filename):
+            max_age = app.get_send_file_max_age(filename)
+            return send_precompressed(app.static_folder, filename, max_age=max_age)
+        app.view_functions['static'] = static_with_precompressed
+
+    @app.after_request
+    def compress_after_request(response):
+        try:
+            return compress_response(response)
+        except Exception as e:
+            print(f"Response compression failed, sending uncompressed: {e}")
+            return response
+    return compress_after_request
+
+
+def precompress_directory(root):
+    """Write .gz/.br variants for compressible files under root; returns count."""
+    written = 0
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            if name.endswith(('.gz', '.br')):
+                continue
+            mimetype = mimetypes.guess_type(name)[0]
+            if mimetype not in COMPRESSIBLE_MIMETYPES and not (mimetype or '').startswith('text/'):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < COMPRESS_MIN_SIZE:
+                continue
+            variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for ext, blob in variants:
+                if len(blob) < len(data):
+                    with open(path + ext, 'wb') as f:
+                        f.write(blob)
+                    written += 1
+    return written
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'precompress':
+        print('usage: python compression.py precompress <dir> [<dir> ...]')
+        sys.exit(2)
+    for root in sys.argv[2:]:
+        print(f"{root}: wrote {precompress_directory(root)} precompressed files")
@@ -1,18 +1,26 @@
  
 
 import os
+import re
+import time
+import threading
+from contextvars import ContextVar
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, DECIMAL, ForeignKey, JSON
+from sqlalchemy import create_engine, event, exc, text, DDL, Index, Column, Integer, String, Text, Date, DateTime, Boolean, DECIMAL, Float, ForeignKey, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB as PG_JSONB
+from sqlalchemy.types import TypeDecorator
 import uuid
 
-try:
-    from dotenv import load_dotenv
-    load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
-except ImportError:
-    pass
+_DOTENV_PATH = os.path.join(os.path.dirname(__file__), '..', '.env')
+if os.path.exists(_DOTENV_PATH):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(_DOTENV_PATH)
+    except ImportError:
+        pass
 
 DATABASE_URL = os.getenv('DATABASE_URL') or os.getenv('SUPABASE_DB')
 if not DATABASE_URL:
@@ -20,18 +28,340 @@ if not DATABASE_URL:
     SUPABASE_PASSWORD = os.getenv('SUPABASE_PASSWORD', 'your-supabase-password')
     DATABASE_URL = f"postgresql://postgres:{SUPABASE_PASSWORD}@{SUPABASE_URL}/postgres"
 
-_db_url = DATABASE_URL
-try:
-    if _db_url and 'supabase' in _db_url and 'sslmode=' not in _db_url:
-        sep = '&' if '?' in _db_url else '?'
-        _db_url = f"{_db_url}{sep}sslmode=require"
-except Exception:
-    _db_url = DATABASE_URL
+def _with_sslmode(url):
+    try:
+        if url and 'supabase' in url and 'sslmode=' not in url:
+            sep = '&' if '?' in url else '?'
+            return f"{url}{sep}sslmode=require"
+    except Exception:
+        pass
+    return url
+
+_db_url = _with_sslmode(DATABASE_URL)
+
+# Comma-separated read replicas. Read-only sessions are spread across them and
+# fall back to the primary when a replica is unreachable or lagging.
+DATABASE_REPLICA_URLS = [u.strip() for u in (os.getenv('DATABASE_REPLICA_URLS') or '').split(',') if u.strip()]
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# Pool sizing. Each gunicorn worker gets its own pool, so a worker needs at
+# least as many connections as it has threads; WEB_CONCURRENCY * (size +
+# overflow) must stay below the server's max_connections.
+DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 5)
+DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 10)
+# 'always' pings on every checkout, 'idle' only when the connection sat in the
+# pool longer than DB_POOL_PING_IDLE_SECONDS, 'never' relies on pool_recycle.
+DB_POOL_PRE_PING = (os.getenv('DB_POOL_PRE_PING', 'idle') or 'idle').lower()
+DB_POOL_PING_IDLE_SECONDS = _env_int('DB_POOL_PING_IDLE_SECONDS', 30)
+DB_LOG_REQUEST_STATS = (os.getenv('DB_LOG_REQUEST_STATS', 'false').lower() == 'true')
+DB_REPLICA_MAX_LAG_SECONDS = _env_int('DB_REPLICA_MAX_LAG_SECONDS', 5)
+DB_REPLICA_CHECK_INTERVAL = _env_int('DB_REPLICA_CHECK_INTERVAL', 5)
+
+_stats_lock = threading.Lock()
+_pool_stats = {
+    'checkouts': 0,
+    'checkout_wait_total': 0.0,
+    'checkout_wait_max': 0.0,
+    'in_use': 0,
+    'in_use_peak': 0,
+    'pings': 0,
+    'ping_failures': 0,
+}
+_request_stats = ContextVar('db_request_stats', default=None)
+TRACE_STATEMENTS_LIMIT = 500
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def connect(self):
+        started = time.perf_counter()
+        conn = super().connect()
+        waited = time.perf_counter() - started
+        with _stats_lock:
+            _pool_stats['checkout_wait_total'] += waited
+            if waited > _pool_stats['checkout_wait_max']:
+                _pool_stats['checkout_wait_max'] = waited
+        stats = _request_stats.get()
+        if stats is not None:
+            stats['checkout_wait'] += waited
+        return conn
+
+
+def _build_engine(url):
+    kwargs = {'echo': False}
+    if not url.startswith('sqlite'):
+        kwargs.update(
+            poolclass=_TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=(DB_POOL_PRE_PING == 'always'),
+        )
+    eng = create_engine(url, **kwargs)
+    _instrument_engine(eng)
+    return eng
+
+
+def _instrument_engine(eng):
+    @event.listens_for(eng, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if DB_POOL_PRE_PING == 'idle':
+            checked_in_at = connection_record.info.get('checked_in_at')
+            if checked_in_at is not None and time.monotonic() - checked_in_at > DB_POOL_PING_IDLE_SECONDS:
+                with _stats_lock:
+                    _pool_stats['pings'] += 1
+                cursor = dbapi_connection.cursor()
+                try:
+                    cursor.execute('SELECT 1')
+                except Exception:
+                    with _stats_lock:
+                        _pool_stats['ping_failures'] += 1
+                    # The pool discards this connection and retries with a fresh one.
+                    raise exc.DisconnectionError()
+                finally:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        pass
+        with _stats_lock:
+            _pool_stats['checkouts'] += 1
+            _pool_stats['in_use'] += 1
+            if _pool_stats['in_use'] > _pool_stats['in_use_peak']:
+                _pool_stats['in_use_peak'] = _pool_stats['in_use']
+
+    @event.listens_for(eng, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info['checked_in_at'] = time.monotonic()
+        with _stats_lock:
+            _pool_stats['in_use'] = max(0, _pool_stats['in_use'] - 1)
+
+    @event.listens_for(eng, 'before_cursor_execute')
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+    @event.listens_for(eng, 'after_cursor_execute')
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started_at')
+        elapsed = time.perf_counter() - started.pop() if started else 0.0
+        stats = _request_stats.get()
+        if stats is not None:
+            stats['queries'] += 1
+            stats['query_time'] += elapsed
+            statements = stats.get('statements')
+            if statements is not None and len(statements) < TRACE_STATEMENTS_LIMIT:
+                statements.append((statement, elapsed))
+
+
+def begin_request_stats():
+    """Start collecting per-request DB stats for the current context."""
+    return _request_stats.set({'queries': 0, 'query_time': 0.0, 'checkout_wait': 0.0})
+
+
+def trace_request_statements():
+    """Also keep (sql, seconds) per statement of the current request.
+
+    Returns the list being filled, or None when request stats are not being collected.
+    """
+    stats = _request_stats.get()
+    if stats is None:
+        return None
+    stats['statements'] = []
+    return stats['statements']
+
+
+def end_request_stats(token=None):
+    """Stop collecting and return the stats gathered since begin_request_stats()."""
+    stats = _request_stats.get()
+    if token is not None:
+        _request_stats.reset(token)
+    else:
+        _request_stats.set(None)
+    return stats
+
+
+def pool_status():
+    """Snapshot of pool configuration, usage and checkout timings."""
+    with _stats_lock:
+        snapshot = dict(_pool_stats)
+    pool = _engine.pool if _engine is not None else None
+    snapshot.update({
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pre_ping': DB_POOL_PRE_PING,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else snapshot['in_use'],
+    })
+    if snapshot['checkouts']:
+        snapshot['checkout_wait_avg'] = snapshot['checkout_wait_total'] / snapshot['checkouts']
+    return snapshot
+
+
+def check_connection_budget(workers, threads=1):
+    """Warn when the configured worker/thread count cannot be served by the pool
+    or would exceed the database server's connection limit."""
+    per_worker = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    needed = max(1, workers) * per_worker
+    warnings = []
+    if threads > per_worker:
+        warnings.append(
+            f"{threads} threads per worker but only {per_worker} pooled connections "
+            f"(DB_POOL_SIZE + DB_MAX_OVERFLOW); requests will queue for up to {DB_POOL_TIMEOUT}s"
+        )
+    limit = _env_int('DB_MAX_CONNECTIONS', 0) or None
+    if limit is None and not _db_url.startswith('sqlite'):
+        try:
+            with get_engine().connect() as conn:
+                max_conn = int(conn.execute(text('SHOW max_connections')).scalar())
+                reserved = int(conn.execute(text('SHOW superuser_reserved_connections')).scalar())
+                limit = max_conn - reserved
+        except Exception as e:
+            print(f"Could not read database connection limit: {e}")
+    if limit is not None and needed > limit:
+        warnings.append(
+            f"{workers} workers x {per_worker} connections = {needed} exceeds the database limit of {limit}"
+        )
+    for msg in warnings:
+        print(f"WARNING: {msg}")
+    return warnings
+
+
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def _replica_lag(eng):
+    """Replication lag in seconds; non-Postgres stand-ins are never behind."""
+    with eng.connect() as conn:
+        if eng.dialect.name != 'postgresql':
+            conn.execute(text('SELECT 1'))
+            return 0.0
+        return float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0.0)
+
+
+_replica_lock = threading.Lock()
+_replica_state = {'next': 0, 'health': {}}
+
+
+def _replica_healthy(index, eng):
+    now = time.monotonic()
+    checked = _replica_state['health'].get(index)
+    if checked and now - checked[0] < DB_REPLICA_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        healthy = _replica_lag(eng) <= DB_REPLICA_MAX_LAG_SECONDS
+    except Exception as e:
+        print(f"Replica {index} unavailable, reading from primary: {e}")
+        healthy = False
+    _replica_state['health'][index] = (now, healthy)
+    return healthy
+
+
+def pick_replica():
+    """Round-robin over healthy replicas; None means use the primary."""
+    replica_engines = get_replica_engines()
+    if not replica_engines:
+        return None
+    with _replica_lock:
+        start = _replica_state['next']
+        _replica_state['next'] = (start + 1) % len(replica_engines)
+    for i in range(len(replica_engines)):
+        index = (start + i) % len(replica_engines)
+        if _replica_healthy(index, replica_engines[index]):
+            return replica_engines[index]
+    return None
+
+
+class RoutingSession(Session):
+    """Session that sends read-only work to a replica.
+
+    Sessions created with info={'read_only': True} read from a replica picked
+    once per session, unless info['force_primary'] is set (read-your-writes)
+    or the session starts flushing changes.
+    """
+
+    def __init__(self, bind=None, **kw):
+        super().__init__(bind=bind if bind is not None else get_engine(), **kw)
 
-engine = create_engine(_db_url, echo=False, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get('read_only') and not self.info.get('force_primary') and not self._flushing:
+            if 'replica' not in self.info:
+                self.info['replica'] = pick_replica()
+            if self.info['replica'] is not None:
+                return self.info['replica']
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+# Engines are built on first use, not at import: creating one loads the DB
+# driver, and a process that never queries (the gunicorn master, a CLI, a
+# cold start answering a static asset) shouldn't pay for that.
+_engine = None
+_replica_engines = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _build_engine(_db_url)
+    return _engine
+
+
+def get_replica_engines():
+    global _replica_engines
+    if _replica_engines is None:
+        with _engine_lock:
+            if _replica_engines is None:
+                _replica_engines = [_build_engine(_with_sslmode(u)) for u in DATABASE_REPLICA_URLS]
+    return _replica_engines
+
+
+def dispose_engines(close=True):
+    """Dispose the engines built so far; engines never built are left unbuilt."""
+    for eng in ([_engine] if _engine is not None else []) + (_replica_engines or []):
+        eng.dispose(close=close)
+
+
+def __getattr__(name):
+    # `database.engine` and `from database import engine` still work, building on first access.
+    if name == 'engine':
+        return get_engine()
+    if name == 'replica_engines':
+        return get_replica_engines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, info={'read_only': True})
 Base = declarative_base()
 
+# JSONB on Postgres, plain JSON on the SQLite files used as local stand-ins.
+JSONB = PG_JSONB().with_variant(JSON(), 'sqlite')
+
+
+class UUID(TypeDecorator):
+    """Postgres UUID that also accepts the string ids kept in the Flask session."""
+
+    impl = PG_UUID
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value
+
 class User(Base):
     __tablename__ = "users"
     
@@ -79,7 +409,7 @@ class Assessment(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     
     
     symptoms = Column(JSONB, nullable=False, default=list)
@@ -97,6 +427,10 @@ class Assessment(Base):
     
     
     risk_level = Column(String(20), nullable=False)  
+    # The user's region when the assessment was written, so the surveillance
+    # rollup decrements the bucket it incremented, even after the user moves
+    # or is deleted.
+    region = Column(String(50))
     
     
     pretest_prevalence = Column(DECIMAL(5, 4))
@@ -105,16 +439,22 @@ class Assessment(Base):
     
     
     user = relationship("User", back_populates="assessments")
+    
+    __table_args__ = (
+        Index('idx_assessments_user_created_at', 'user_id', created_at.desc(), id.desc()),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
 class BiteAnalysis(Base):
     __tablename__ = "bite_analyses"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     
     
     image_url = Column(Text)
+    thumbnail_url = Column(Text)
     image_filename = Column(String(255))
     image_size_bytes = Column(Integer)
     image_width = Column(Integer)
@@ -146,6 +486,116 @@ class BiteAnalysis(Base):
     
     
     user = relationship("User", back_populates="bite_analyses")
+    
+    __table_args__ = (
+        Index('idx_bite_analyses_user_created_at', 'user_id', created_at.desc(), id.desc()),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
+# Assessments and bite analyses are partitioned by month on created_at.
+# create_all() only makes the parents, so give them a catch-all partition,
+# the same partition functions as denguetect_supabase_schema.sql, and the
+# monthly partitions for the next few months (partitions.py maintain adds more).
+for _partitioned in (Assessment.__table__, BiteAnalysis.__table__):
+    event.listen(
+        _partitioned,
+        'after_create',
+        DDL(f"CREATE TABLE IF NOT EXISTS {_partitioned.name}_default PARTITION OF {_partitioned.name} DEFAULT").execute_if(dialect='postgresql'),
+    )
+
+def _after_create_on_postgres(sql):
+    """Run statements after create_all() on Postgres; each starts at column 0 after a blank line."""
+    for statement in re.split(r'\n\n(?=\S)', sql):
+        # DDL() %-formats its text, and format() in plpgsql uses %s/%I/%L.
+        ddl = DDL(statement.strip().replace('%', '%%'))
+        event.listen(Base.metadata, 'after_create', ddl.execute_if(dialect='postgresql'))
+
+PARTITION_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    parent TEXT,
+    start_month DATE,
+    end_month DATE
+) RETURNS INTEGER AS $$
+DECLARE
+    m DATE := date_trunc('month', start_month)::DATE;
+    next_m DATE;
+    part TEXT;
+    default_part TEXT := parent || '_default';
+    stray BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    WHILE m <= end_month LOOP
+        part := format('%s_p%s', parent, to_char(m, 'YYYY_MM'));
+        next_m := (m + INTERVAL '1 month')::DATE;
+        IF to_regclass(part) IS NULL THEN
+            stray := FALSE;
+            IF to_regclass(default_part) IS NOT NULL THEN
+                EXECUTE format(
+                    'SELECT EXISTS (SELECT 1 FROM %I WHERE created_at >= %L AND created_at < %L)',
+                    default_part, m, next_m
+                ) INTO stray;
+            END IF;
+            IF stray THEN
+                -- Maintenance fell behind and the month's rows are in the default
+                -- partition, which would make a plain CREATE ... PARTITION OF fail.
+                -- Move them into a standalone table and attach that: neither step
+                -- fires the row triggers, so the rollups are not counted twice.
+                EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, default_part);
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    default_part, m, next_m, part
+                );
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    parent, part, m, next_m
+                );
+                EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I DEFAULT', parent, default_part);
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    part, parent, m, next_m
+                );
+            END IF;
+            created := created + 1;
+        END IF;
+        m := next_m;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    this_month DATE := date_trunc('month', NOW())::DATE;
+    last_month DATE := (date_trunc('month', NOW()) + make_interval(months => months_ahead))::DATE;
+    parent TEXT;
+    first_month DATE;
+    created INTEGER := 0;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['assessments', 'bite_analyses'] LOOP
+        first_month := NULL;
+        IF to_regclass(parent || '_default') IS NOT NULL THEN
+            EXECUTE format('SELECT date_trunc(''month'', MIN(created_at))::DATE FROM %I', parent || '_default')
+                INTO first_month;
+        END IF;
+        created := created + ensure_monthly_partitions(
+            parent, LEAST(this_month, COALESCE(first_month, this_month)), last_month
+        );
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT maintain_partitions()
+"""
+_after_create_on_postgres(PARTITION_FUNCTIONS_SQL)
+
+# How far back reads that only need recent rows look first, so they are
+# answered from the newest partitions before falling back to the full history.
+HOT_PARTITION_DAYS = _env_int('HOT_PARTITION_DAYS', 90)
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
@@ -159,6 +609,152 @@ class UserSession(Base):
     user_agent = Column(Text)
     is_active = Column(Boolean, default=True)
 
+class UserAssessmentStats(Base):
+    """Per-user rollup kept current by the assessments trigger (Postgres only)."""
+    __tablename__ = "user_assessment_stats"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_assessments = Column(Integer, nullable=False, default=0)
+    last_assessment = Column(DateTime)
+    highest_probability = Column(DECIMAL(10, 8))
+    current_risk_level = Column(String(20))
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# Same functions and trigger as denguetect_supabase_schema.sql, so create_all()
+# on Postgres maintains user_assessment_stats too.
+USER_STATS_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION recompute_user_assessment_stats(target_user UUID)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM user_assessment_stats WHERE user_id = target_user;
+    INSERT INTO user_assessment_stats (user_id, total_assessments, last_assessment, highest_probability, current_risk_level)
+    SELECT
+        a.user_id,
+        COUNT(*),
+        MAX(a.created_at),
+        MAX(a.probability),
+        (SELECT l.risk_level FROM assessments l
+          WHERE l.user_id = target_user
+          ORDER BY l.created_at DESC LIMIT 1)
+    FROM assessments a
+    WHERE a.user_id = target_user
+    GROUP BY a.user_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_assessment_to_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO user_assessment_stats AS s (user_id, total_assessments, last_assessment, highest_probability, current_risk_level)
+        VALUES (NEW.user_id, 1, NEW.created_at, NEW.probability, NEW.risk_level)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_assessments = s.total_assessments + 1,
+            last_assessment = GREATEST(s.last_assessment, EXCLUDED.last_assessment),
+            highest_probability = GREATEST(s.highest_probability, EXCLUDED.highest_probability),
+            current_risk_level = CASE
+                WHEN s.last_assessment IS NULL OR EXCLUDED.last_assessment >= s.last_assessment
+                THEN EXCLUDED.current_risk_level
+                ELSE s.current_risk_level
+            END,
+            updated_at = NOW();
+        RETURN NEW;
+    END IF;
+
+    PERFORM recompute_user_assessment_stats(OLD.user_id);
+    IF TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id THEN
+        PERFORM recompute_user_assessment_stats(NEW.user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS assessments_maintain_user_stats ON assessments;
+
+CREATE TRIGGER assessments_maintain_user_stats
+    AFTER INSERT OR UPDATE OF user_id, created_at, probability, risk_level OR DELETE ON assessments
+    FOR EACH ROW EXECUTE FUNCTION apply_assessment_to_stats();
+"""
+_after_create_on_postgres(USER_STATS_TRIGGER_SQL)
+
+class SurveillanceDaily(Base):
+    """Assessments per region, day and risk level (see surveillance.py).
+
+    probability_sum rather than a mean, so an insert is one increment. On
+    Postgres the assessments trigger below keeps it current; elsewhere the
+    app records each insert.
+    """
+    __tablename__ = "surveillance_daily"
+
+    region = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    risk_level = Column(String(20), primary_key=True)
+    assessments = Column(Integer, nullable=False, default=0)
+    probability_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_surveillance_daily_day', 'day'),
+    )
+
+# Same functions and triggers as denguetect_supabase_schema.sql, so create_all()
+# on Postgres maintains the rollup too.
+SURVEILLANCE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION fill_assessment_region()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Moved to another user: take that user's region unless one was given.
+    IF TG_OP = 'UPDATE' AND NEW.region IS NOT DISTINCT FROM OLD.region THEN
+        NEW.region := NULL;
+    END IF;
+    IF NEW.region IS NULL OR NEW.region = '' THEN
+        NEW.region := COALESCE((SELECT NULLIF(region, '') FROM users WHERE id = NEW.user_id), 'unknown');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_assessment_to_surveillance()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE surveillance_daily SET
+            assessments = assessments - 1,
+            probability_sum = probability_sum - OLD.probability,
+            updated_at = NOW()
+        WHERE region = COALESCE(
+                NULLIF(OLD.region, ''),
+                (SELECT NULLIF(region, '') FROM users WHERE id = OLD.user_id),
+                'unknown')
+          AND day = OLD.created_at::date
+          AND risk_level = OLD.risk_level;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO surveillance_daily AS s (region, day, risk_level, assessments, probability_sum, updated_at)
+        VALUES (COALESCE(NULLIF(NEW.region, ''), 'unknown'), NEW.created_at::date, NEW.risk_level, 1, NEW.probability, NOW())
+        ON CONFLICT (region, day, risk_level) DO UPDATE SET
+            assessments = s.assessments + 1,
+            probability_sum = s.probability_sum + EXCLUDED.probability_sum,
+            updated_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS assessments_fill_region ON assessments;
+
+CREATE TRIGGER assessments_fill_region
+    BEFORE INSERT OR UPDATE OF user_id ON assessments
+    FOR EACH ROW EXECUTE FUNCTION fill_assessment_region();
+
+DROP TRIGGER IF EXISTS assessments_maintain_surveillance ON assessments;
+
+CREATE TRIGGER assessments_maintain_surveillance
+    AFTER INSERT OR UPDATE OF user_id, created_at, probability, risk_level, region OR DELETE ON assessments
+    FOR EACH ROW EXECUTE FUNCTION apply_assessment_to_surveillance();
+"""
+_after_create_on_postgres(SURVEILLANCE_TRIGGER_SQL)
+
 class EducationCategory(Base):
     __tablename__ = "education_categories"
     
@@ -209,15 +805,40 @@ def get_db():
     finally:
         db.close()
 
+def refresh_summary_views(db):
+    """Concurrently refresh the dashboard snapshot materialized views; False where there are none.
+
+    The views come from denguetect_supabase_schema.sql, not create_all().
+    Run `python database.py refresh-views` from cron (or pg_cron) every minute.
+    """
+    if db.get_bind().dialect.name != 'postgresql':
+        return False
+    if db.execute(text("SELECT to_regprocedure('refresh_summary_views()')")).scalar() is None:
+        return False
+    db.execute(text("SELECT refresh_summary_views()"))
+    db.commit()
+    return True
+
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 def drop_tables():
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=get_engine())
 
 def init_db():
     create_tables()
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
-    init_db()
+    import sys
+    if sys.argv[1:] == ['refresh-views']:
+        session = SessionLocal()
+        try:
+            print("Refreshed summary views" if refresh_summary_views(session)
+                  else "No summary views here; they come from denguetect_supabase_schema.sql")
+        finally:
+            session.close()
+    elif sys.argv[1:] in ([], ['init']):
+        init_db()
+    else:
+        sys.exit("usage: python database.py [init | refresh-views]")
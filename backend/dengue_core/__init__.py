@@ -0,0 +1,53 @@
+"""Scoring and image engine shared by app.py and app_supabase.py.
+
+This is the API both apps (and the ASGI app, benchmarks and jobs) call. The
+names below are stable, so the engine can be optimised behind them once.
+
+Scoring (dengue_core.scoring), pure functions of the symptom ids:
+    enhanced_probability(symptoms)           checklist percentage, band, breakdown
+    dengue_probability(symptoms, prevalence) Fernández (2016) logistic model
+    clinical_probability(symptoms, prev)     count-based logistic model
+    display_risk(p, symptoms)                low / moderate / high label
+    risk_level(percentage)                   minimal ... very_high band
+    logit(p)
+    ENHANCED_SYMPTOMS_DATA, CORE_SYMPTOMS, WARNING_SYMPTOMS
+
+Cached tables (dengue_core.tables):
+    symptom_combinations()                   the /api/symptom-combinations payload
+
+Images (dengue_core.analysis, .images, .bite_images, .avatars):
+    analyze_image_bytes(data, roi, on_stage) (stats, label) for a bite photo
+    store_bite_image(storage, data)          stored derivatives and image fields
+    ensure_derivative(storage, key)          on_missing hook for /uploads
+    store_avatar(storage, file)              stored avatar renditions
+    ImageTooLarge                            over a size limit; answer 413
+
+Storage (dengue_core.storage) is pluggable: anything with the LocalStorage
+methods works. get_storage() returns the configured one; register_backend()
+adds a STORAGE_BACKEND name and set_storage() replaces the instance.
+
+The package imports neither Flask nor anything outside it, so it can be
+copied out of backend/ and used on its own. The top-level images,
+bite_images and avatars modules are aliases for the ones here, and
+storage.py re-exports dengue_core.storage next to the Flask /uploads route.
+"""
+
+from dengue_core.analysis import analyze_image_bytes, rgb_to_hsv_float
+from dengue_core.avatars import store_avatar
+from dengue_core.bite_images import ensure_derivative, store_bite_image
+from dengue_core.images import ImageTooLarge
+from dengue_core.scoring import (
+    CORE_SYMPTOMS, ENHANCED_SYMPTOMS_DATA, WARNING_SYMPTOMS,
+    clinical_probability, dengue_probability, display_risk, enhanced_probability, logit, risk_level,
+)
+from dengue_core.storage import get_storage, register_backend, set_storage
+from dengue_core.tables import symptom_combinations
+
+__all__ = [
+    'CORE_SYMPTOMS', 'ENHANCED_SYMPTOMS_DATA', 'WARNING_SYMPTOMS',
+    'clinical_probability', 'dengue_probability', 'display_risk', 'enhanced_probability', 'logit', 'risk_level',
+    'symptom_combinations',
+    'analyze_image_bytes', 'rgb_to_hsv_float', 'ImageTooLarge',
+    'store_avatar', 'store_bite_image', 'ensure_derivative',
+    'get_storage', 'register_backend', 'set_storage',
+]
@@ -0,0 +1,6 @@
+"""Prebuild the cached scoring tables: cd backend && python -m dengue_core"""
+
+from dengue_core.tables import SCORING_CACHE_DIR, symptom_combinations
+
+symptom_combinations()
+print(f"scoring tables written to {SCORING_CACHE_DIR}")
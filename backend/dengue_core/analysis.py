@@ -0,0 +1,156 @@
+"""Bite-photo colour analysis.
+
+analyze_image_bytes() decodes the upload at most 200 px wide (images.py
+enforces the size and memory limits) and classifies each pixel as red, yellow
+or neither, in HSV and RGB at once. Counts are kept for the whole image, for
+the centre (or the ROI the user marked) and for a 16x12 grid of tiles, whose
+densest tile guards against scattered noise. The result is the label shown
+to the user: red/pink, yellowish, or nothing clear.
+
+Both apps call this, and so does the ASGI app's process pool. They pass
+on_stage(stage, seconds) to time the decode and classify stages; this module
+itself records nothing.
+"""
+
+import time
+
+from dengue_core.images import decode_scaled
+
+
+def rgb_to_hsv_float(r, g, b):
+    """r,g,b in [0,1]; return h in [0,360), s,v in [0,1]."""
+    mx = max(r, g, b)
+    mn = min(r, g, b)
+    d = mx - mn
+    h = 0.0
+    if d != 0:
+        if mx == r:
+            h = ((g - b) / d) % 6.0
+        elif mx == g:
+            h = (b - r) / d + 2.0
+        else:
+            h = (r - g) / d + 4.0
+        h *= 60.0
+        if h < 0:
+            h += 360.0
+    s = 0.0 if mx == 0 else d / mx
+    v = mx
+    return h, s, v
+
+
+def analyze_image_bytes(image_bytes, roi=None, on_stage=None):
+    """(stats, result) for an upload: red/yellow pixel counts and the detected label."""
+    started = time.perf_counter()
+    im = decode_scaled(image_bytes, 200)
+    w, h = im.size
+    decoded = time.perf_counter()
+    if on_stage is not None:
+        on_stage('decode', decoded - started)
+
+    px = im.load()
+    cx0 = int(w * 0.20); cx1 = int(w * 0.80)
+    cy0 = int(h * 0.20); cy1 = int(h * 0.80)
+    if isinstance(roi, dict) and 'cx' in roi and 'cy' in roi:
+        rc = max(8, int(min(w, h) * float(roi.get('r', 0.25))))
+        cx = int(float(roi.get('cx', 0.5)) * w)
+        cy = int(float(roi.get('cy', 0.5)) * h)
+        cx0 = max(0, cx - rc); cx1 = min(w - 1, cx + rc)
+        cy0 = max(0, cy - rc); cy1 = min(h - 1, cy + rc)
+
+    red = yellow = total = 0
+    redC = yellowC = centerTotal = 0
+    strongRed = strongRedC = 0
+
+    gx, gy = 16, 12
+    cellW = max(1, w // gx)
+    cellH = max(1, h // gy)
+    tileR = [0] * (gx * gy)
+    tileY = [0] * (gx * gy)
+    tileT = [0] * (gx * gy)
+
+    for y in range(h):
+        for x in range(w):
+            r8, g8, b8 = px[x, y]
+            r = r8 / 255.0
+            g = g8 / 255.0
+            b = b8 / 255.0
+            h_deg, s, v = rgb_to_hsv_float(r, g, b)
+            if v < 0.25 or s < 0.18:
+                continue
+
+            isRedHSV = (s >= 0.24 and v >= 0.30) and (h_deg <= 15 or h_deg >= 345)
+            isYellowHSV = (s >= 0.22 and v >= 0.45) and (35 <= h_deg <= 70)
+            isRedRGB = (r >= 0.45) and ((r - max(g, b)) >= 0.15) and (r / (g + 1e-6) >= 1.25) and (r / (b + 1e-6) >= 1.30)
+            isYellowRGB = (r >= 0.42 and g >= 0.42 and b <= 0.38) and (min(r, g) / (max(r, g) + 1e-6) >= 0.78) and ((r - b) >= 0.10) and ((g - b) >= 0.10)
+            isStrongRed = (r >= 0.65 and g <= 0.35 and b <= 0.35) and ((r - max(g, b)) >= 0.18)
+
+            isRed = (isRedHSV and isRedRGB) or isStrongRed
+            isYellow = (not isRed) and (isYellowHSV and isYellowRGB)
+
+            if isRed:
+                red += 1
+            elif isYellow:
+                yellow += 1
+            total += 1
+
+            in_center = (cx0 <= x <= cx1 and cy0 <= y <= cy1)
+            if in_center:
+                centerTotal += 1
+                if isRed:
+                    redC += 1
+                    if isStrongRed:
+                        strongRedC += 1
+                elif isYellow:
+                    yellowC += 1
+
+            tx = min(gx - 1, x // cellW)
+            ty = min(gy - 1, y // cellH)
+            ti = ty * gx + tx
+            tileT[ti] += 1
+            if isRed:
+                tileR[ti] += 1
+            elif isYellow:
+                tileY[ti] += 1
+            if isStrongRed:
+                strongRed += 1
+
+    tileMaxRedDensity = 0.0
+    tileMaxYellowDensity = 0.0
+    for i in range(len(tileT)):
+        t = tileT[i]
+        if not t:
+            continue
+        tileMaxRedDensity = max(tileMaxRedDensity, tileR[i] / t)
+        tileMaxYellowDensity = max(tileMaxYellowDensity, tileY[i] / t)
+
+    stats = {
+        'red': red, 'yellow': yellow, 'total': total,
+        'redC': redC, 'yellowC': yellowC, 'centerTotal': centerTotal,
+        'tileMaxRedDensity': tileMaxRedDensity,
+        'tileMaxYellowDensity': tileMaxYellowDensity,
+        'strongRed': strongRed, 'strongRedC': strongRedC,
+    }
+
+    roiPresent = isinstance(roi, dict) and 'cx' in roi
+    rFrac = (red / total) if total else 0.0
+    yFrac = (yellow / total) if total else 0.0
+    rFracC = (redC / centerTotal) if centerTotal else 0.0
+    yFracC = (yellowC / centerTotal) if centerTotal else 0.0
+    minFracGlobal = 0.008 if roiPresent else 0.02
+    minFracROI = 0.015 if roiPresent else 0.05
+    minTileDensity = 0.05 if roiPresent else 0.10
+    strongRedOK = roiPresent and (strongRedC >= max(8, centerTotal * 0.005))
+    strongRedGlobalOK = (not roiPresent) and (strongRed >= max(20, total * 0.0025)) and (tileMaxRedDensity >= 0.06)
+    redOK = strongRedOK or strongRedGlobalOK or (((rFrac >= minFracGlobal) or (rFracC >= minFracROI)) and (tileMaxRedDensity >= minTileDensity) and (rFrac >= yFrac * 1.05))
+    yellowOK = (not redOK) and (((yFrac >= minFracGlobal) or (yFracC >= minFracROI)) and (tileMaxYellowDensity >= minTileDensity))
+
+    if redOK:
+        res = {'text': 'Detected: red/pink area', 'cls': 'red'}
+    elif yellowOK:
+        res = {'text': 'Detected: yellowish area', 'cls': 'yellow'}
+    else:
+        res = {'text': 'No clear red/yellow detected', 'cls': 'muted'}
+
+    if on_stage is not None:
+        on_stage('classify', time.perf_counter() - decoded)
+    return stats, res
@@ -0,0 +1,81 @@
+"""Profile pictures, stored as small square renditions.
+
+An upload is decoded under AVATAR_MAX_BYTES and AVATAR_MAX_PIXELS on the
+shared image pool. It is cropped to a centred square and saved at each of
+AVATAR_SIZES:
+
+    avatars/ab/cd/<sha256 of upload>-256.webp
+    avatars/ab/cd/<sha256 of upload>-128.webp
+    avatars/ab/cd/<sha256 of upload>-64.webp
+
+The URL carries the upload's hash, so a new picture gets a new URL and
+/uploads can serve these as immutable. users.avatar_url holds the largest
+rendition. Templates pick a smaller one with the avatar_size filter, which
+passes older, unprocessed avatar URLs through unchanged.
+"""
+
+import hashlib
+import io
+import os
+import re
+
+from dengue_core import images
+from dengue_core.storage import sharded_key
+
+AVATAR_SIZES = (256, 128, 64)
+AVATAR_QUALITY = int(os.getenv('AVATAR_QUALITY', '80'))
+AVATAR_MAX_BYTES = int(os.getenv('AVATAR_MAX_BYTES', str(10 * 1024 * 1024)))
+AVATAR_MAX_PIXELS = int(os.getenv('AVATAR_MAX_PIXELS', '25000000'))
+AVATAR_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+NAMESPACE = 'avatars'
+_SIZED_URL_RE = re.compile(r'^(.*/%s/.+-)(\d+)(\.webp|\.png)$' % NAMESPACE)
+
+
+def _key(digest, size):
+    return sharded_key(f"{digest}-{size}{'.webp' if images.webp_supported() else '.png'}", NAMESPACE)
+
+
+def render_avatars(data):
+    """{size: encoded bytes} for an upload."""
+    from PIL import Image, ImageOps
+    im = images.open_image(data, AVATAR_MAX_BYTES, AVATAR_MAX_PIXELS)
+    largest = AVATAR_SIZES[0]
+    im.draft('RGB', (largest, largest))
+    im = ImageOps.exif_transpose(im)
+    has_alpha = im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info
+    im = ImageOps.fit(im.convert('RGBA' if has_alpha else 'RGB'), (largest, largest), Image.LANCZOS)
+    out = {}
+    for size in AVATAR_SIZES:
+        resized = im if size == largest else im.resize((size, size), Image.LANCZOS)
+        buf = io.BytesIO()
+        if images.webp_supported():
+            resized.save(buf, format='WEBP', quality=AVATAR_QUALITY, method=4)
+        else:
+            resized.save(buf, format='PNG', optimize=True)
+        out[size] = buf.getvalue()
+    return out
+
+
+def store_avatar(storage, file):
+    """Process an uploaded FileStorage and return the URL to save, or None for an unsupported type."""
+    ext = os.path.splitext(file.filename or '')[1].lower()
+    if ext not in AVATAR_EXTENSIONS:
+        return None
+    data = file.read(AVATAR_MAX_BYTES + 1)
+    digest = hashlib.sha256(data).hexdigest()
+    if not storage.exists(_key(digest, AVATAR_SIZES[-1])):
+        renditions = images.run(render_avatars, data)
+        # Smallest is written last, so its presence means the set is complete.
+        for size in AVATAR_SIZES:
+            storage.put_at(_key(digest, size), renditions[size])
+    return storage.url(_key(digest, AVATAR_SIZES[0]))
+
+
+def avatar_size(url, size):
+    """URL of the rendition closest to size (at least as large) for a stored avatar URL."""
+    match = _SIZED_URL_RE.match(url or '')
+    if not match:
+        return url
+    fitting = [s for s in AVATAR_SIZES if s >= size]
+    return f"{match.group(1)}{min(fitting) if fitting else AVATAR_SIZES[0]}{match.group(3)}"
@@ -0,0 +1,143 @@
+"""Stored derivatives of uploaded bite photos.
+
+The photo is stored twice, and never at full resolution:
+
+    bites/ab/cd/<sha256 of upload>.webp        longest side <= BITE_IMAGE_MAX_SIDE
+    bites/ab/cd/<sha256 of upload>.thumb.webp  longest side <= BITE_THUMB_MAX_SIDE
+
+The files are WebP when this Pillow build can write it, JPEG otherwise.
+Both keys derive from the upload's hash, so the URLs are known before
+any encoding happens. The request path therefore only stores the raw
+upload, next to the derivatives as .<sha>.upload. It then queues the
+encode on the shared image pool (images.py) and returns at once. The job
+writes both files and deletes the .upload. Re-encoding also drops EXIF, GPS included.
+
+If a derivative is requested before its job has run (another worker got
+the GET, or the pool was busy), ensure_derivative() builds it from the
+.upload on the spot. Uploads of the same photo share one set of files.
+"""
+
+import hashlib
+import io
+import os
+import threading
+
+from dengue_core import images
+from dengue_core.storage import sharded_key
+
+BITE_IMAGE_MAX_SIDE = int(os.getenv('BITE_IMAGE_MAX_SIDE', '1600'))
+BITE_THUMB_MAX_SIDE = int(os.getenv('BITE_THUMB_MAX_SIDE', '320'))
+BITE_IMAGE_QUALITY = int(os.getenv('BITE_IMAGE_QUALITY', '80'))
+BITE_THUMB_QUALITY = int(os.getenv('BITE_THUMB_QUALITY', '70'))
+
+NAMESPACE = 'bites'
+
+_build_locks = {}
+_build_locks_lock = threading.Lock()
+
+
+def derivative_format():
+    return 'WEBP' if images.webp_supported() else 'JPEG'
+
+
+def _ext():
+    return '.webp' if images.webp_supported() else '.jpg'
+
+
+def _keys(digest):
+    original = sharded_key(f"{digest}{_ext()}", NAMESPACE)
+    return {
+        'original': original,
+        'thumbnail': sharded_key(f"{digest}.thumb{_ext()}", NAMESPACE),
+        # Dot-prefixed, so /uploads never serves the raw photo (and its EXIF).
+        'upload': f"{original.rsplit('/', 1)[0]}/.{digest}.upload",
+    }
+
+
+def _encode(im, max_side, quality):
+    im = im.copy()
+    im.thumbnail((max_side, max_side), images.pil().LANCZOS)
+    buf = io.BytesIO()
+    if derivative_format() == 'WEBP':
+        im.save(buf, format='WEBP', quality=quality, method=4)
+    else:
+        im.save(buf, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def render_derivatives(image_bytes):
+    """(original, thumbnail) bytes for an upload."""
+    from PIL import ImageOps
+    im = images.open_image(image_bytes)
+    # JPEG can decode straight to a reduced scale, which is far cheaper than
+    # decoding 12 MP and shrinking afterwards.
+    im.draft('RGB', (BITE_IMAGE_MAX_SIDE, BITE_IMAGE_MAX_SIDE))
+    im = ImageOps.exif_transpose(im).convert('RGB')
+    original = _encode(im, BITE_IMAGE_MAX_SIDE, BITE_IMAGE_QUALITY)
+    thumbnail = _encode(im, BITE_THUMB_MAX_SIDE, BITE_THUMB_QUALITY)
+    return original, thumbnail
+
+
+def probe(image_bytes):
+    """(width, height) from the image header, without decoding pixels."""
+    with images.open_image(image_bytes) as im:
+        return im.size
+
+
+def _build(storage, keys):
+    with _build_locks_lock:
+        lock = _build_locks.setdefault(keys['upload'], threading.Lock())
+    try:
+        with lock:
+            if storage.exists(keys['original']) and storage.exists(keys['thumbnail']):
+                return True
+            image_bytes = storage.get(keys['upload'])
+            if image_bytes is None:
+                return False
+            original, thumbnail = render_derivatives(image_bytes)
+            storage.put_at(keys['thumbnail'], thumbnail)
+            storage.put_at(keys['original'], original)
+            storage.delete(keys['upload'])
+            return True
+    finally:
+        with _build_locks_lock:
+            _build_locks.pop(keys['upload'], None)
+
+
+def _build_in_background(storage, keys):
+    try:
+        _build(storage, keys)
+    except Exception as e:
+        print(f"Error building bite image derivatives: {e}")
+
+
+def store_bite_image(storage, image_bytes):
+    """Store an upload for derivative processing and return its BiteAnalysis image fields."""
+    width, height = probe(image_bytes)
+    keys = _keys(hashlib.sha256(image_bytes).hexdigest())
+    if not (storage.exists(keys['original']) and storage.exists(keys['thumbnail'])):
+        storage.put_at(keys['upload'], image_bytes)
+        images.submit(_build_in_background, storage, keys)
+    return {
+        'image_url': storage.url(keys['original']),
+        'thumbnail_url': storage.url(keys['thumbnail']),
+        'image_width': width,
+        'image_height': height,
+        'image_size_bytes': len(image_bytes),
+    }
+
+
+def ensure_derivative(storage, key):
+    """Build a not-yet-written derivative from its pending upload; True if key now exists."""
+    name = key.rsplit('/', 1)[-1]
+    if not key.startswith(NAMESPACE + '/') or not name.endswith(_ext()):
+        return False
+    digest = name.split('.', 1)[0]
+    keys = _keys(digest)
+    if key not in (keys['original'], keys['thumbnail']):
+        return False
+    try:
+        return _build(storage, keys) and storage.exists(key)
+    except Exception as e:
+        print(f"Error building bite image derivatives: {e}")
+        return False
@@ -0,0 +1,121 @@
+"""Shared worker pool and decode limits for user-supplied images.
+
+Avatar processing and bite-photo derivatives run on one bounded thread pool
+(IMAGE_WORKERS), so a burst of uploads can't decode dozens of large photos
+at once in a single worker process. Pillow releases the GIL while decoding
+and resizing, so threads run in parallel.
+
+open_image() reads only the header and checks it against IMAGE_MAX_BYTES and
+IMAGE_MAX_PIXELS before any pixels are decoded. An image that is over either
+limit raises ImageTooLarge.
+
+decode_scaled() is how analysis decodes. JPEGs are decoded straight at 1/2,
+1/4 or 1/8 scale when the target is that much smaller. Before decoding, the
+memory Pillow will need is estimated from the header, and the image is
+refused if that exceeds IMAGE_TASK_MEMORY_MB. A 20k x 20k PNG that compresses
+to a few hundred KB gets a 413 instead of allocating 1.6 GB.
+
+Pillow is imported on first use rather than at startup.
+"""
+
+import io
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+IMAGE_JOB_TIMEOUT = float(os.getenv('IMAGE_JOB_TIMEOUT', '30'))
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(15 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', '50000000'))
+IMAGE_TASK_MEMORY_MB = float(os.getenv('IMAGE_TASK_MEMORY_MB', '96'))
+
+
+class ImageTooLarge(ValueError):
+    """The upload is over a byte, pixel or decode-memory limit; API routes answer 413."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image')
+        return _executor
+
+
+def pil():
+    """The PIL.Image module; RuntimeError if Pillow isn't installed."""
+    try:
+        from PIL import Image
+    except Exception:
+        raise RuntimeError('Pillow not installed')
+    return Image
+
+
+@lru_cache(maxsize=None)
+def webp_supported():
+    try:
+        from PIL import features
+        return features.check('webp')
+    except Exception:
+        return False
+
+
+def submit(fn, *args):
+    """Queue fn on the image pool; returns the Future."""
+    return _get_executor().submit(fn, *args)
+
+
+def run(fn, *args, timeout=IMAGE_JOB_TIMEOUT):
+    """Run fn on the image pool and wait for its result."""
+    return submit(fn, *args).result(timeout=timeout)
+
+
+def open_image(data, max_bytes=IMAGE_MAX_BYTES, max_pixels=IMAGE_MAX_PIXELS):
+    """Image.open() with the size limits enforced before decoding."""
+    Image = pil()
+    if len(data) > max_bytes:
+        raise ImageTooLarge(f"image is {len(data)} bytes, limit {max_bytes}")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            im = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    width, height = im.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"image is {width}x{height}, limit {max_pixels} pixels")
+    return im
+
+
+def decode_bytes(im):
+    """Bytes Pillow allocates to decode im at its current size, plus the RGB copy unless it is already RGB."""
+    width, height = im.size
+    # Pillow stores 3- and 4-band pixels (RGB included) in 4 bytes.
+    pixel = 1 if im.mode in ('1', 'L', 'P') else 2 if im.mode.startswith('I;16') else 4
+    return width * height * (pixel + (4 if im.mode != 'RGB' else 0))
+
+
+def decode_scaled(data, max_width, memory_budget_mb=IMAGE_TASK_MEMORY_MB):
+    """RGB image no wider than max_width, decoded within the size and memory limits."""
+    Image = pil()
+    im = open_image(data)
+    width, height = im.size
+    if width > max_width:
+        im.draft('RGB', (max_width, max(1, height * max_width // width)))
+    needed = decode_bytes(im)
+    if needed > memory_budget_mb * 1024 * 1024:
+        raise ImageTooLarge(f"decoding {width}x{height} needs {needed / 2**20:.0f} MB, budget {memory_budget_mb:.0f} MB")
+    # convert() on an RGB image returns a full copy; load in place instead.
+    if im.mode == 'RGB':
+        im.load()
+    else:
+        im = im.convert('RGB')
+    if im.width > max_width:
+        im = im.resize((max_width, max(1, int(height * max_width / float(width)))), Image.BILINEAR)
+    return im
@@ -0,0 +1,263 @@
+"""Symptom scoring: the weighted checklist and the two logistic models.
+
+enhanced_probability() is the weighted checklist behind the percentage the
+symptom checker shows. dengue_probability() is the Fernández et al. (2016)
+logistic model, recalibrated to a target prevalence. clinical_probability()
+is the simpler count-based model. display_risk() turns a model probability
+and the warning signs into the low/moderate/high label.
+
+Everything here is pure: no Flask, no database, no I/O.
+"""
+
+import math
+
+ENHANCED_SYMPTOMS_DATA = {
+    'fever-high': {'weight': 15, 'category': 'core', 'name': 'High fever (≥38.5°C)'},
+    'severe-headache': {'weight': 12, 'category': 'core', 'name': 'Severe headache'},
+    'retro-orbital-pain': {'weight': 14, 'category': 'core', 'name': 'Pain behind the eyes'},
+    'myalgia': {'weight': 10, 'category': 'core', 'name': 'Muscle pain'},
+    'arthralgia': {'weight': 10, 'category': 'core', 'name': 'Joint pain'},
+    'nausea-vomit': {'weight': 8, 'category': 'core', 'name': 'Nausea or vomiting'},
+    'rash': {'weight': 12, 'category': 'core', 'name': 'Skin rash'},
+    'fatigue': {'weight': 6, 'category': 'core', 'name': 'Fatigue / weakness'},
+    'loss-appetite': {'weight': 4, 'category': 'core', 'name': 'Loss of appetite'},
+    'no-cough': {'weight': 8, 'category': 'additional', 'name': 'No cough'},
+    'no-sore-throat': {'weight': 8, 'category': 'additional', 'name': 'No sore throat'},
+    'severe-abdominal-pain': {'weight': 20, 'category': 'warning', 'name': 'Severe abdominal pain'},
+    'persistent-vomiting': {'weight': 18, 'category': 'warning', 'name': 'Persistent vomiting'},
+    'gingival-bleeding': {'weight': 22, 'category': 'warning', 'name': 'Gingival bleeding'},
+    'epistaxis': {'weight': 20, 'category': 'warning', 'name': 'Nosebleed (epistaxis)'},
+    'petechiae': {'weight': 25, 'category': 'warning', 'name': 'Petechiae (small red spots)'},
+    'blood-in-vomit-stool': {'weight': 30, 'category': 'warning', 'name': 'Blood in vomit or stool'},
+    'lethargy-restlessness': {'weight': 18, 'category': 'warning', 'name': 'Extreme drowsiness / restlessness'},
+    'rapid-breathing': {'weight': 16, 'category': 'warning', 'name': 'Rapid or difficult breathing'},
+    'skin-paleness': {'weight': 15, 'category': 'warning', 'name': 'Skin paleness'},
+}
+
+# The clinical model and display_risk count these, not the checklist categories.
+CORE_SYMPTOMS = frozenset({
+    'fever-high', 'severe-headache', 'retro-orbital-pain', 'myalgia', 'arthralgia', 'rash', 'nausea-vomit'
+})
+WARNING_SYMPTOMS = frozenset({
+    'severe-abdominal-pain', 'persistent-vomiting', 'gingival-bleeding', 'epistaxis',
+    'blood-in-vomit-stool', 'lethargy-restlessness', 'rapid-breathing', 'skin-paleness'
+})
+RESPIRATORY_ABSENCE = frozenset({'no-cough', 'no-sore-throat'})
+
+MAX_TOTAL_WEIGHT = 290.0
+DEVELOPMENT_PREVALENCE = 0.71
+FERNANDEZ_COEFFS = {
+    'intercept': 0.694,
+    'petechiae': 0.718,
+    'retro_ocular_pain': 0.516,
+    'gingival_bleeding': 0.316,
+    'epistaxis': -0.474,
+    'skin_paleness': -0.535,
+}
+FERNANDEZ_MODEL_INFO = {
+    'auc': 0.663,
+    'auc_ci': (0.616, 0.710),
+    'reported_sensitivity': 0.862,
+    'reported_specificity': 0.27,
+    'explored_threshold': 0.60,
+    'notes': (
+        'Equation and AUC from Fernández et al. (2016). The paper reports sensitivity 86.2% and '
+        'specificity 27% for the model and discusses raising the cut-point from 0.5 to 0.6 to improve '
+        'specificity while maintaining sensitivity >85%. We present these values transparently; '
+        'they are not a diagnosis.'
+    ),
+    'source_url': 'https://pmc.ncbi.nlm.nih.gov/articles/PMC5120437/',
+    'cdc_features_url': 'https://www.cdc.gov/dengue/hcp/clinical-signs/index.html',
+}
+TARGET_PREVALENCE_SOURCE_URL = 'https://pmc.ncbi.nlm.nih.gov/articles/PMC2861403/'
+
+
+def logit(p):
+    """Calculate logit function"""
+    return math.log(p / (1.0 - p))
+
+
+def risk_level(percentage):
+    """Checklist risk band for a 0-100 percentage."""
+    if percentage >= 80:
+        return 'very_high'
+    if percentage >= 60:
+        return 'high'
+    if percentage >= 40:
+        return 'moderate'
+    if percentage >= 20:
+        return 'low'
+    if percentage >= 5:
+        return 'very_low'
+    return 'minimal'
+
+
+def enhanced_probability(symptoms_list):
+    """Weighted-checklist percentage, risk band and breakdown for a list of symptom ids."""
+    if not symptoms_list:
+        return {
+            'percentage': 0,
+            'risk_level': 'none',
+            'breakdown': {
+                'core_symptoms': 0,
+                'warning_signs': 0,
+                'additional_features': 0,
+                'total_weight': 0
+            },
+            'selected_symptoms': []
+        }
+
+    core_weight = warning_weight = additional_weight = 0
+    core_count = warning_count = 0
+    selected_symptom_details = []
+    for symptom in symptoms_list:
+        data = ENHANCED_SYMPTOMS_DATA.get(symptom)
+        if data is None:
+            continue
+        selected_symptom_details.append({
+            'name': data['name'],
+            'weight': data['weight'],
+            'category': data['category']
+        })
+        category = data['category']
+        if category == 'core':
+            core_weight += data['weight']
+            core_count += 1
+        elif category == 'warning':
+            warning_weight += data['weight']
+            warning_count += 1
+        elif category == 'additional':
+            additional_weight += data['weight']
+
+    total_weight = core_weight + warning_weight + additional_weight
+    base_percentage = min(100, (total_weight / MAX_TOTAL_WEIGHT) * 100)
+
+    multiplier = 1.0
+    if 'fever-high' in symptoms_list:
+        multiplier += 0.3
+    if warning_count >= 3:
+        multiplier += 0.5
+    elif warning_count >= 2:
+        multiplier += 0.3
+    elif warning_count >= 1:
+        multiplier += 0.2
+    if core_count >= 6:
+        multiplier += 0.4
+    elif core_count >= 4:
+        multiplier += 0.2
+    elif core_count >= 2:
+        multiplier += 0.1
+    respiratory_absence = sum(1 for s in symptoms_list if s in RESPIRATORY_ABSENCE)
+    if respiratory_absence == 2:
+        multiplier += 0.2
+    elif respiratory_absence == 1:
+        multiplier += 0.1
+
+    final_percentage = min(100, base_percentage * multiplier)
+    return {
+        'percentage': round(final_percentage, 1),
+        'risk_level': risk_level(final_percentage),
+        'breakdown': {
+            'core_symptoms': core_weight,
+            'warning_signs': warning_weight,
+            'additional_features': additional_weight,
+            'total_weight': total_weight,
+            'base_percentage': round(base_percentage, 1),
+            'multiplier': round(multiplier, 2),
+            'symptom_counts': {
+                'core': core_count,
+                'warning': warning_count,
+                'additional': respiratory_absence
+            }
+        },
+        'selected_symptoms': selected_symptom_details
+    }
+
+
+def dengue_probability(symptoms_list, target_prevalence=None):
+    """Fernández (2016) model, shifted by a logit offset when target_prevalence is given."""
+    s = set(symptoms_list or [])
+    x = {
+        'petechiae': 1 if 'petechiae' in s else 0,
+        'retro_ocular_pain': 1 if 'retro-orbital-pain' in s else 0,
+        'gingival_bleeding': 1 if 'gingival-bleeding' in s or 'bleeding-gums-nose' in s else 0,
+        'epistaxis': 1 if 'epistaxis' in s or 'bleeding-gums-nose' in s else 0,
+        'skin_paleness': 1 if 'skin-paleness' in s else 0,
+    }
+    coeffs = dict(FERNANDEZ_COEFFS)
+    y_dev = (
+        coeffs['intercept']
+        + coeffs['petechiae'] * x['petechiae']
+        + coeffs['retro_ocular_pain'] * x['retro_ocular_pain']
+        + coeffs['gingival_bleeding'] * x['gingival_bleeding']
+        + coeffs['epistaxis'] * x['epistaxis']
+        + coeffs['skin_paleness'] * x['skin_paleness']
+    )
+    p_dev = 1.0 / (1.0 + math.exp(-y_dev))
+
+    logit_offset = 0.0
+    pi0 = None
+    if isinstance(target_prevalence, (int, float)):
+        pi0 = max(1e-6, min(1.0 - 1e-6, float(target_prevalence)))
+        logit_offset = logit(pi0) - logit(DEVELOPMENT_PREVALENCE)
+
+    y = y_dev + logit_offset
+    p = 1.0 / (1.0 + math.exp(-y))
+
+    model_info = dict(FERNANDEZ_MODEL_INFO)
+    model_info['prevalence'] = {
+        'development_prevalence': DEVELOPMENT_PREVALENCE,
+        'target_prevalence': pi0,
+        'logit_offset_applied': logit_offset,
+        'target_prevalence_source_url': TARGET_PREVALENCE_SOURCE_URL
+    }
+    return {
+        'y_dev': y_dev,
+        'y': y,
+        'p': p,
+        'p_dev': p_dev,
+        'inputs': x,
+        'coeffs': coeffs,
+        'model_info': model_info
+    }
+
+
+def display_risk(prob, symptoms):
+    """low/moderate/high from a model probability, raised by warning signs and core symptoms."""
+    s = set(symptoms or [])
+    if prob >= 0.60:
+        base = 'high'
+    elif prob >= 0.30:
+        base = 'moderate'
+    else:
+        base = 'low'
+
+    wcount = len(s & WARNING_SYMPTOMS)
+    if wcount >= 2:
+        return 'high'
+    if wcount == 1 and base == 'low':
+        return 'moderate'
+
+    ccount = len(s & CORE_SYMPTOMS)
+    if ccount >= 5 and base != 'high':
+        return 'high'
+    if ccount >= 3 and base == 'low':
+        return 'moderate'
+    return base
+
+
+def clinical_probability(symptoms, base_prev):
+    """Count-based logistic model on top of the pretest prevalence."""
+    s = set(symptoms or [])
+    ccount = len(s & CORE_SYMPTOMS)
+    rcnt = len(s & RESPIRATORY_ABSENCE)
+    wcount = len(s & WARNING_SYMPTOMS)
+
+    b0 = logit(max(1e-6, min(1-1e-6, base_prev)))
+    y = b0 + 0.35 * ccount + 0.40 * rcnt + 0.90 * wcount
+    p = 1.0 / (1.0 + math.exp(-y))
+    return {
+        'p': p,
+        'y': y,
+        'counts': {'core': ccount, 'resp_abs': rcnt, 'warning': wcount}
+    }
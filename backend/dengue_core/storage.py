@@ -0,0 +1,222 @@
+"""Upload storage: content-addressed keys on local disk or S3.
+
+put() names a blob after its SHA-256, sharded by hash prefix, e.g.
+
+    bites/3f/a2/3fa2...e9.jpg
+
+so directories stay small and an identical photo is stored once. put_at()
+writes to a caller-chosen key, for records keyed by id (see sharded_key).
+
+STORAGE_BACKEND selects the backend:
+  local  default. Files under STORAGE_LOCAL_ROOT (backend/public/uploads), so
+         keys written before this module, like bites/<uuid>.jpg, still resolve;
+         so do the uploads kept under the static folder (frontend/public/uploads).
+         A write goes to a temp file in the target directory and is renamed
+         into place, so readers never see half a file.
+  s3     STORAGE_S3_BUCKET, under STORAGE_S3_PREFIX. STORAGE_S3_ENDPOINT
+         points it at any S3-compatible server, such as MinIO or `moto_server`
+         locally. Needs boto3.
+
+Other backends plug in with register_backend(name, factory). A backend is
+any object with put, put_at, get, exists, delete and url, plus local_path
+(None when the blob isn't a local file) and download_url for those that
+aren't. set_storage() swaps the process-wide instance, e.g. for a test.
+
+Nothing here needs Flask. The /uploads/<key> route (install_uploads) is in
+the apps' storage.py, which re-exports these names.
+"""
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+import secrets
+
+# boto3 takes ~100 ms to import and only the s3 backend needs it, so it is
+# imported when an S3Storage is created.
+ClientError = None
+
+STORAGE_BACKEND = (os.getenv('STORAGE_BACKEND', 'local') or 'local').lower()
+STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'uploads'))
+STORAGE_FSYNC = (os.getenv('STORAGE_FSYNC', 'true').lower() == 'true')
+STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET')
+STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', '')
+STORAGE_S3_ENDPOINT = os.getenv('STORAGE_S3_ENDPOINT') or None
+STORAGE_PUBLIC_URL = (os.getenv('STORAGE_PUBLIC_URL') or '').rstrip('/') or None
+STORAGE_PRESIGN_SECONDS = int(os.getenv('STORAGE_PRESIGN_SECONDS', '300'))
+
+UPLOADS_URL_PREFIX = '/uploads'
+
+
+def sharded_key(name, namespace=''):
+    """namespace/ab/cd/name for a name that starts with hex (a hash or uuid)."""
+    stem = name.replace('-', '')
+    key = f"{stem[:2]}/{stem[2:4]}/{name}"
+    return f"{namespace}/{key}" if namespace else key
+
+
+def content_key(data, namespace, ext=''):
+    return sharded_key(hashlib.sha256(data).hexdigest() + ext, namespace)
+
+
+def _clean_key(key):
+    key = posixpath.normpath(key or '').lstrip('/')
+    if not key or key == '.' or key.startswith('..') or '\\' in key:
+        raise ValueError(f"invalid storage key: {key!r}")
+    return key
+
+
+def atomic_write(path, data, fsync=STORAGE_FSYNC):
+    """Write bytes to path via a sibling temp file and rename."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class LocalStorage:
+    def __init__(self, root=STORAGE_LOCAL_ROOT, url_prefix=UPLOADS_URL_PREFIX):
+        self.root = os.path.abspath(root)
+        self.url_prefix = url_prefix
+
+    def local_path(self, key):
+        return os.path.join(self.root, *_clean_key(key).split('/'))
+
+    def put(self, data, namespace, ext=''):
+        key = content_key(data, namespace, ext)
+        path = self.local_path(key)
+        if not os.path.exists(path):
+            atomic_write(path, data)
+        return key
+
+    def put_at(self, key, data):
+        atomic_write(self.local_path(key), data)
+        return key
+
+    def get(self, key):
+        try:
+            with open(self.local_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key):
+        return f"{self.url_prefix}/{_clean_key(key)}"
+
+
+class S3Storage:
+    def __init__(self, bucket=STORAGE_S3_BUCKET, prefix=STORAGE_S3_PREFIX, client=None,
+                 endpoint_url=STORAGE_S3_ENDPOINT, public_url=STORAGE_PUBLIC_URL, url_prefix=UPLOADS_URL_PREFIX):
+        global ClientError
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError('boto3 is required for STORAGE_BACKEND=s3')
+        if client is None:
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.public_url = public_url
+        self.url_prefix = url_prefix
+
+    def _object_key(self, key):
+        key = _clean_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def local_path(self, key):
+        return None
+
+    def put(self, data, namespace, ext=''):
+        key = content_key(data, namespace, ext)
+        if not self.exists(key):
+            self.put_at(key, data)
+        return key
+
+    def put_at(self, key, data):
+        # S3 PUTs are atomic: readers see the old object or the new one, never a mix.
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._object_key(key), Body=data,
+            ContentType=mimetypes.guess_type(key)[0] or 'application/octet-stream',
+        )
+        return key
+
+    def get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body'].read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def url(self, key):
+        return f"{self.url_prefix}/{_clean_key(key)}"
+
+    def download_url(self, key):
+        if self.public_url:
+            return f"{self.public_url}/{self._object_key(key)}"
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._object_key(key)},
+            ExpiresIn=STORAGE_PRESIGN_SECONDS,
+        )
+
+
+STORAGE_BACKENDS = {'local': LocalStorage, 's3': S3Storage}
+
+_storage = None
+
+
+def register_backend(name, factory):
+    """Make STORAGE_BACKEND=name build its storage with factory()."""
+    STORAGE_BACKENDS[name.lower()] = factory
+
+
+def set_storage(storage):
+    global _storage
+    _storage = storage
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        factory = STORAGE_BACKENDS.get(STORAGE_BACKEND)
+        if factory is None:
+            raise RuntimeError(f"unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; known: {', '.join(sorted(STORAGE_BACKENDS))}")
+        _storage = factory()
+    return _storage
+
@@ -0,0 +1,155 @@
+"""Precomputed scoring tables, cached as a build artifact.
+
+/api/symptom-combinations scores every symptom alone and every combination
+of up to four (about 2,900 calls). That table only changes when the symptom
+weights or the scoring code change, so it is computed once and written to
+SCORING_CACHE_DIR as symptom-combinations-<digest>.json. The digest covers
+the symptom data, the source of scoring.py, of this file and of the module
+the scorer lives in, and the Python version. An edit to the weights, the
+risk bands or any helper therefore produces a new file, not a stale answer.
+
+The first request in a process computes the digest and loads the file (or
+builds and writes it); after that the table is served from memory, with no
+file reads. The digest is kept per symptoms dict, so pass a new dict rather
+than editing one in place. build.sh prebuilds the file:
+
+    cd backend && python -m dengue_core
+"""
+
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+
+from dengue_core import scoring
+from dengue_core.scoring import ENHANCED_SYMPTOMS_DATA, enhanced_probability
+
+SCORING_CACHE_DIR = os.getenv('SCORING_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
+HIGH_RISK_PERCENTAGE = 60
+MAX_COMBINATION_SIZE = 4
+
+_tables = {}
+_tables_lock = threading.Lock()
+# (id(symptoms_data), score) -> (symptoms_data, digest). Holding symptoms_data
+# keeps its id from being reused by another dict.
+_digests = {}
+
+
+def _digest(symptoms_data, score):
+    h = hashlib.sha256()
+    h.update(json.dumps(symptoms_data, sort_keys=True).encode())
+    sources = {os.path.abspath(__file__), os.path.abspath(scoring.__file__)}
+    module = inspect.getmodule(score)
+    if module is not None and getattr(module, '__file__', None):
+        sources.add(os.path.abspath(module.__file__))
+    for path in sorted(sources):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    h.update(sys.version.encode())
+    return h.hexdigest()[:16]
+
+
+def _digest_for(symptoms_data, score):
+    """_digest() once per (symptoms_data, score) pair; a warm request reads no files."""
+    entry = _digests.get((id(symptoms_data), score))
+    if entry is None:
+        entry = _digests[(id(symptoms_data), score)] = (symptoms_data, _digest(symptoms_data, score))
+    return entry[1]
+
+
+def _named(name, symptoms, result):
+    return {
+        'name': name,
+        'symptoms': symptoms,
+        'percentage': result['percentage'],
+        'risk_level': result['risk_level'],
+    }
+
+
+def build_symptom_combinations(symptoms_data, score):
+    """The /api/symptom-combinations payload, computed from scratch."""
+    single_symptoms = []
+    for symptom, data in symptoms_data.items():
+        result = score([symptom])
+        single_symptoms.append({
+            'symptom': symptom,
+            'name': data['name'],
+            'category': data['category'],
+            'weight': data['weight'],
+            'percentage': result['percentage'],
+            'risk_level': result['risk_level'],
+        })
+    single_symptoms.sort(key=lambda x: x['percentage'], reverse=True)
+
+    all_symptoms = list(symptoms_data.keys())
+    high_risk_combos = []
+    for r in range(1, MAX_COMBINATION_SIZE + 1):
+        for combo in itertools.combinations(all_symptoms, r):
+            result = score(list(combo))
+            if result['percentage'] >= HIGH_RISK_PERCENTAGE:
+                high_risk_combos.append({
+                    'symptoms': list(combo),
+                    'symptom_names': [symptoms_data[s]['name'] for s in combo],
+                    'count': len(combo),
+                    'percentage': result['percentage'],
+                    'risk_level': result['risk_level'],
+                })
+    high_risk_combos.sort(key=lambda x: x['percentage'], reverse=True)
+
+    all_symptoms_result = score(all_symptoms)
+
+    core_symptoms = [s for s, data in symptoms_data.items() if data['category'] == 'core']
+    warning_symptoms = [s for s, data in symptoms_data.items() if data['category'] == 'warning']
+    classic_dengue = ['fever-high', 'severe-headache', 'retro-orbital-pain', 'myalgia', 'nausea-vomit']
+    severe_dengue = ['fever-high', 'severe-abdominal-pain', 'persistent-vomiting', 'gingival-bleeding', 'petechiae']
+    key_combinations = [
+        _named('All Core Symptoms', core_symptoms, score(core_symptoms)),
+        _named('All Warning Signs', warning_symptoms, score(warning_symptoms)),
+        _named('Classic Dengue Presentation', classic_dengue, score(classic_dengue)),
+        _named('Severe Dengue Indicators', severe_dengue, score(severe_dengue)),
+    ]
+
+    return {
+        'ok': True,
+        'single_symptoms': single_symptoms,
+        'high_risk_combinations': high_risk_combos[:50],
+        'all_symptoms_result': {
+            'percentage': all_symptoms_result['percentage'],
+            'risk_level': all_symptoms_result['risk_level'],
+            'breakdown': all_symptoms_result['breakdown'],
+        },
+        'key_combinations': key_combinations,
+        'total_symptoms': len(symptoms_data),
+    }
+
+
+def symptom_combinations(symptoms_data=ENHANCED_SYMPTOMS_DATA, score=enhanced_probability):
+    """The cached payload for these inputs: from memory, else the artifact, else built and written."""
+    digest = _digest_for(symptoms_data, score)
+    table = _tables.get(digest)
+    if table is not None:
+        return table
+    with _tables_lock:
+        table = _tables.get(digest)
+        if table is not None:
+            return table
+        path = os.path.join(SCORING_CACHE_DIR, f"symptom-combinations-{digest}.json")
+        try:
+            with open(path, encoding='utf-8') as f:
+                table = json.load(f)
+        except (OSError, ValueError):
+            table = build_symptom_combinations(symptoms_data, score)
+            try:
+                os.makedirs(SCORING_CACHE_DIR, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(table, f)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"Could not write scoring cache {path}: {e}")
+        _tables[digest] = table
+        return table
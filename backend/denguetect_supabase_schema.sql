@@ -54,10 +54,12 @@ CREATE TABLE symptoms (
 );
 
 -- Risk assessments table - stores user symptom assessments and calculations
+-- Partitioned by month on created_at (see PARTITIONS below); the primary key
+-- has to include the partition key
 CREATE TABLE assessments (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     
     -- Assessment data
     symptoms JSONB NOT NULL DEFAULT '[]'::jsonb, -- Array of symptom IDs
@@ -75,21 +77,25 @@ CREATE TABLE assessments (
     
     -- Risk level determination
     risk_level VARCHAR(20) NOT NULL CHECK (risk_level IN ('low', 'moderate', 'high')),
+    region VARCHAR(50), -- users.region when written; the surveillance rollup bucket
     
     -- Metadata
     pretest_prevalence DECIMAL(5,4), -- Prevalence used in calculation
     target_prevalence DECIMAL(5,4),
-    logit_offset_applied DECIMAL(10,8)
-);
+    logit_offset_applied DECIMAL(10,8),
 
--- Bite analyses table - stores mosquito bite image analyses
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Bite analyses table - stores mosquito bite image analyses (partitioned by month)
 CREATE TABLE bite_analyses (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     user_id UUID REFERENCES users(id) ON DELETE SET NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     
     -- Image data
     image_url TEXT,
+    thumbnail_url TEXT,
     image_filename VARCHAR(255),
     image_size_bytes INTEGER,
     image_width INTEGER,
@@ -117,8 +123,10 @@ CREATE TABLE bite_analyses (
     roi_radius DECIMAL(10,8),
     
     -- Analysis metadata
-    analysis_stats JSONB -- Complete analysis statistics
-);
+    analysis_stats JSONB, -- Complete analysis statistics
+
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 -- User sessions table - for session management
 CREATE TABLE user_sessions (
@@ -132,6 +140,30 @@ CREATE TABLE user_sessions (
     is_active BOOLEAN DEFAULT TRUE
 );
 
+-- Per-user assessment rollup - maintained by triggers on assessments so the
+-- user_assessment_summary view never has to aggregate the assessments table
+CREATE TABLE user_assessment_stats (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_assessments INTEGER NOT NULL DEFAULT 0,
+    last_assessment TIMESTAMP WITH TIME ZONE,
+    highest_probability DECIMAL(10,8),
+    current_risk_level VARCHAR(20), -- risk level of the most recent assessment
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Regional surveillance rollup - assessments per region (the user's region
+-- when the assessment was written), day and risk level. Maintained by a
+-- trigger on assessments; /api/surveillance/summary reads only this table
+CREATE TABLE surveillance_daily (
+    region VARCHAR(50) NOT NULL,
+    day DATE NOT NULL,
+    risk_level VARCHAR(20) NOT NULL,
+    assessments INTEGER NOT NULL DEFAULT 0,
+    probability_sum DOUBLE PRECISION NOT NULL DEFAULT 0, -- mean = probability_sum / assessments
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (region, day, risk_level)
+);
+
 -- ============================================================================
 -- REFERENCE TABLES
 -- ============================================================================
@@ -192,11 +224,16 @@ CREATE INDEX idx_assessments_user_id ON assessments(user_id);
 CREATE INDEX idx_assessments_created_at ON assessments(created_at);
 CREATE INDEX idx_assessments_risk_level ON assessments(risk_level);
 CREATE INDEX idx_assessments_probability ON assessments(probability);
+CREATE INDEX idx_assessments_user_created_at ON assessments(user_id, created_at DESC, id DESC);
 
 -- Bite analyses indexes
 CREATE INDEX idx_bite_analyses_user_id ON bite_analyses(user_id);
 CREATE INDEX idx_bite_analyses_created_at ON bite_analyses(created_at);
 CREATE INDEX idx_bite_analyses_label_class ON bite_analyses(label_class);
+CREATE INDEX idx_bite_analyses_user_created_at ON bite_analyses(user_id, created_at DESC, id DESC);
+
+-- Surveillance rollup indexes (region-first lookups use the primary key)
+CREATE INDEX idx_surveillance_daily_day ON surveillance_daily(day);
 
 -- Sessions indexes
 CREATE INDEX idx_user_sessions_token ON user_sessions(session_token);
@@ -209,6 +246,101 @@ CREATE INDEX idx_health_services_city ON health_services(city);
 CREATE INDEX idx_health_services_is_emergency ON health_services(is_emergency);
 CREATE INDEX idx_health_services_location ON health_services(latitude, longitude);
 
+-- ============================================================================
+-- PARTITIONS
+-- ============================================================================
+
+-- Monthly partitions are named <table>_pYYYY_MM. Queries bounded on created_at
+-- only touch the matching partitions, and old months can be detached and
+-- archived as a whole (backend/partitions.py) instead of being vacuumed forever.
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    parent TEXT,
+    start_month DATE,
+    end_month DATE
+) RETURNS INTEGER AS $$
+DECLARE
+    m DATE := date_trunc('month', start_month)::DATE;
+    next_m DATE;
+    part TEXT;
+    default_part TEXT := parent || '_default';
+    stray BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    WHILE m <= end_month LOOP
+        part := format('%s_p%s', parent, to_char(m, 'YYYY_MM'));
+        next_m := (m + INTERVAL '1 month')::DATE;
+        IF to_regclass(part) IS NULL THEN
+            stray := FALSE;
+            IF to_regclass(default_part) IS NOT NULL THEN
+                EXECUTE format(
+                    'SELECT EXISTS (SELECT 1 FROM %I WHERE created_at >= %L AND created_at < %L)',
+                    default_part, m, next_m
+                ) INTO stray;
+            END IF;
+            IF stray THEN
+                -- Maintenance fell behind and the month's rows are in the default
+                -- partition, which would make a plain CREATE ... PARTITION OF fail.
+                -- Move them into a standalone table and attach that: neither step
+                -- fires the row triggers, so the rollups are not counted twice.
+                EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, default_part);
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    default_part, m, next_m, part
+                );
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    parent, part, m, next_m
+                );
+                EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I DEFAULT', parent, default_part);
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    part, parent, m, next_m
+                );
+            END IF;
+            created := created + 1;
+        END IF;
+        m := next_m;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Creates the current month and the next months_ahead months for both tables,
+-- plus any earlier month that has rows waiting in the default partition.
+-- Schedule daily (pg_cron or `python partitions.py maintain`).
+CREATE OR REPLACE FUNCTION maintain_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    this_month DATE := date_trunc('month', NOW())::DATE;
+    last_month DATE := (date_trunc('month', NOW()) + make_interval(months => months_ahead))::DATE;
+    parent TEXT;
+    first_month DATE;
+    created INTEGER := 0;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['assessments', 'bite_analyses'] LOOP
+        first_month := NULL;
+        IF to_regclass(parent || '_default') IS NOT NULL THEN
+            EXECUTE format('SELECT date_trunc(''month'', MIN(created_at))::DATE FROM %I', parent || '_default')
+                INTO first_month;
+        END IF;
+        created := created + ensure_monthly_partitions(
+            parent, LEAST(this_month, COALESCE(first_month, this_month)), last_month
+        );
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Catch-all partitions so an insert never fails if maintenance falls behind
+CREATE TABLE assessments_default PARTITION OF assessments DEFAULT;
+CREATE TABLE bite_analyses_default PARTITION OF bite_analyses DEFAULT;
+
+SELECT ensure_monthly_partitions('assessments', DATE '2025-09-01', (date_trunc('month', NOW()) + INTERVAL '3 months')::DATE);
+SELECT ensure_monthly_partitions('bite_analyses', DATE '2025-09-01', (date_trunc('month', NOW()) + INTERVAL '3 months')::DATE);
+
 -- ============================================================================
 -- TRIGGERS
 -- ============================================================================
@@ -232,6 +364,113 @@ CREATE TRIGGER update_education_content_updated_at BEFORE UPDATE ON education_co
 CREATE TRIGGER update_health_services_updated_at BEFORE UPDATE ON health_services
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Keep user_assessment_stats in step with assessments. Inserts are folded in
+-- incrementally; deletes and updates (rare) recompute the affected user.
+CREATE OR REPLACE FUNCTION recompute_user_assessment_stats(target_user UUID)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM user_assessment_stats WHERE user_id = target_user;
+    INSERT INTO user_assessment_stats (user_id, total_assessments, last_assessment, highest_probability, current_risk_level)
+    SELECT
+        a.user_id,
+        COUNT(*),
+        MAX(a.created_at),
+        MAX(a.probability),
+        (SELECT l.risk_level FROM assessments l
+          WHERE l.user_id = target_user
+          ORDER BY l.created_at DESC LIMIT 1)
+    FROM assessments a
+    WHERE a.user_id = target_user
+    GROUP BY a.user_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_assessment_to_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO user_assessment_stats AS s (user_id, total_assessments, last_assessment, highest_probability, current_risk_level)
+        VALUES (NEW.user_id, 1, NEW.created_at, NEW.probability, NEW.risk_level)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_assessments = s.total_assessments + 1,
+            last_assessment = GREATEST(s.last_assessment, EXCLUDED.last_assessment),
+            highest_probability = GREATEST(s.highest_probability, EXCLUDED.highest_probability),
+            current_risk_level = CASE
+                WHEN s.last_assessment IS NULL OR EXCLUDED.last_assessment >= s.last_assessment
+                THEN EXCLUDED.current_risk_level
+                ELSE s.current_risk_level
+            END,
+            updated_at = NOW();
+        RETURN NEW;
+    END IF;
+
+    PERFORM recompute_user_assessment_stats(OLD.user_id);
+    IF TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id THEN
+        PERFORM recompute_user_assessment_stats(NEW.user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER assessments_maintain_user_stats
+    AFTER INSERT OR UPDATE OF user_id, created_at, probability, risk_level OR DELETE ON assessments
+    FOR EACH ROW EXECUTE FUNCTION apply_assessment_to_stats();
+
+-- Keep surveillance_daily in step with assessments: one upsert per insert,
+-- a decrement of the old bucket on update or delete. The bucket's region is
+-- stored on the assessment when it is written (fill_assessment_region), so a
+-- later region change or a cascade delete of the user still finds it.
+-- `python surveillance.py rebuild` re-derives recent days from the raw rows
+-- if the two ever drift.
+CREATE OR REPLACE FUNCTION fill_assessment_region()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Moved to another user: take that user's region unless one was given.
+    IF TG_OP = 'UPDATE' AND NEW.region IS NOT DISTINCT FROM OLD.region THEN
+        NEW.region := NULL;
+    END IF;
+    IF NEW.region IS NULL OR NEW.region = '' THEN
+        NEW.region := COALESCE((SELECT NULLIF(region, '') FROM users WHERE id = NEW.user_id), 'unknown');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_assessment_to_surveillance()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE surveillance_daily SET
+            assessments = assessments - 1,
+            probability_sum = probability_sum - OLD.probability,
+            updated_at = NOW()
+        WHERE region = COALESCE(
+                NULLIF(OLD.region, ''),
+                (SELECT NULLIF(region, '') FROM users WHERE id = OLD.user_id),
+                'unknown')
+          AND day = OLD.created_at::date
+          AND risk_level = OLD.risk_level;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO surveillance_daily AS s (region, day, risk_level, assessments, probability_sum, updated_at)
+        VALUES (COALESCE(NULLIF(NEW.region, ''), 'unknown'), NEW.created_at::date, NEW.risk_level, 1, NEW.probability, NOW())
+        ON CONFLICT (region, day, risk_level) DO UPDATE SET
+            assessments = s.assessments + 1,
+            probability_sum = s.probability_sum + EXCLUDED.probability_sum,
+            updated_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER assessments_fill_region
+    BEFORE INSERT OR UPDATE OF user_id ON assessments
+    FOR EACH ROW EXECUTE FUNCTION fill_assessment_region();
+
+CREATE TRIGGER assessments_maintain_surveillance
+    AFTER INSERT OR UPDATE OF user_id, created_at, probability, risk_level, region OR DELETE ON assessments
+    FOR EACH ROW EXECUTE FUNCTION apply_assessment_to_surveillance();
+
 -- ============================================================================
 -- SAMPLE DATA
 -- ============================================================================
@@ -332,6 +571,9 @@ ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE assessments ENABLE ROW LEVEL SECURITY;
 ALTER TABLE bite_analyses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_assessment_stats ENABLE ROW LEVEL SECURITY;
+-- No policies: only the service role (the backend) reads the rollup.
+ALTER TABLE surveillance_daily ENABLE ROW LEVEL SECURITY;
 
 -- Users can only see and modify their own data
 CREATE POLICY "Users can view own profile" ON users
@@ -354,6 +596,9 @@ CREATE POLICY "Users can view own bite analyses" ON bite_analyses
 CREATE POLICY "Users can insert own bite analyses" ON bite_analyses
     FOR INSERT WITH CHECK (auth.uid() = user_id);
 
+CREATE POLICY "Users can view own assessment stats" ON user_assessment_stats
+    FOR SELECT USING (auth.uid() = user_id);
+
 -- Sessions policies
 CREATE POLICY "Users can view own sessions" ON user_sessions
     FOR SELECT USING (auth.uid() = user_id);
@@ -510,19 +755,18 @@ $$ LANGUAGE plpgsql;
 -- VIEWS
 -- ============================================================================
 
--- User assessment summary view
+-- User assessment summary view (one row per user, read from the rollup table)
 CREATE VIEW user_assessment_summary AS
 SELECT 
     u.id as user_id,
     u.email,
     u.username,
-    COUNT(a.id) as total_assessments,
-    MAX(a.created_at) as last_assessment,
-    MAX(a.probability) as highest_probability,
-    a.risk_level as current_risk_level
+    COALESCE(st.total_assessments, 0) as total_assessments,
+    st.last_assessment,
+    st.highest_probability,
+    st.current_risk_level
 FROM users u
-LEFT JOIN assessments a ON u.id = a.user_id
-GROUP BY u.id, u.email, u.username, a.risk_level;
+LEFT JOIN user_assessment_stats st ON st.user_id = u.id;
 
 -- Recent assessments view
 CREATE VIEW recent_assessments AS
@@ -556,6 +800,42 @@ FROM bite_analyses ba
 JOIN users u ON ba.user_id = u.id
 ORDER BY ba.created_at DESC;
 
+-- Dashboard snapshots of the newest rows. Unique indexes allow
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY, so readers are never blocked;
+-- call refresh_summary_views() from a scheduler every minute: pg_cron, or
+-- cron running `python database.py refresh-views`.
+CREATE MATERIALIZED VIEW recent_assessments_mv AS
+SELECT * FROM recent_assessments LIMIT 1000;
+
+CREATE UNIQUE INDEX idx_recent_assessments_mv_id ON recent_assessments_mv(id);
+CREATE INDEX idx_recent_assessments_mv_created_at ON recent_assessments_mv(created_at DESC);
+
+CREATE MATERIALIZED VIEW bite_analysis_summary_mv AS
+SELECT * FROM bite_analysis_summary LIMIT 1000;
+
+CREATE UNIQUE INDEX idx_bite_analysis_summary_mv_id ON bite_analysis_summary_mv(id);
+CREATE INDEX idx_bite_analysis_summary_mv_created_at ON bite_analysis_summary_mv(created_at DESC);
+
+CREATE OR REPLACE FUNCTION refresh_summary_views()
+RETURNS VOID AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY recent_assessments_mv;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY bite_analysis_summary_mv;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Always-fresh "latest N" access paths: a backward scan of the created_at
+-- index that stops after n rows instead of sorting the whole table.
+CREATE OR REPLACE FUNCTION latest_assessments(n INTEGER DEFAULT 20)
+RETURNS SETOF recent_assessments AS $$
+    SELECT * FROM recent_assessments LIMIT n;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION latest_bite_analyses(n INTEGER DEFAULT 20)
+RETURNS SETOF bite_analysis_summary AS $$
+    SELECT * FROM bite_analysis_summary LIMIT n;
+$$ LANGUAGE sql STABLE;
+
 -- ============================================================================
 -- COMMENTS
 -- ============================================================================
@@ -565,12 +845,19 @@ COMMENT ON TABLE symptoms IS 'Predefined symptoms used in dengue risk assessment
 COMMENT ON TABLE assessments IS 'User symptom assessments with dengue probability calculations';
 COMMENT ON TABLE bite_analyses IS 'Mosquito bite image analyses using computer vision';
 COMMENT ON TABLE user_sessions IS 'User session management for authentication';
+COMMENT ON TABLE user_assessment_stats IS 'Trigger-maintained per-user assessment rollup backing user_assessment_summary';
+COMMENT ON TABLE surveillance_daily IS 'Trigger-maintained assessments per region, day and risk level backing /api/surveillance/summary';
 COMMENT ON TABLE education_categories IS 'Categories for educational content';
 COMMENT ON TABLE education_content IS 'Educational articles and resources about dengue';
 COMMENT ON TABLE health_services IS 'Healthcare facilities and emergency contacts';
 
 COMMENT ON FUNCTION calculate_dengue_probability IS 'Calculates dengue probability using Fernández et al. 2016 logistic model';
 COMMENT ON FUNCTION determine_risk_level IS 'Determines risk level based on probability and symptom patterns';
+COMMENT ON FUNCTION ensure_monthly_partitions IS 'Creates missing monthly range partitions of a table between two months, moving rows out of the default partition';
+COMMENT ON FUNCTION maintain_partitions IS 'Creates partitions for the current and upcoming months of assessments and bite_analyses';
+COMMENT ON FUNCTION refresh_summary_views IS 'Concurrently refreshes the recent_assessments_mv and bite_analysis_summary_mv snapshots';
+COMMENT ON FUNCTION latest_assessments IS 'Newest n rows of recent_assessments via the created_at index';
+COMMENT ON FUNCTION latest_bite_analyses IS 'Newest n rows of bite_analysis_summary via the created_at index';
 
 -- ============================================================================
 -- COMPLETION MESSAGE
@@ -0,0 +1,155 @@
+"""gunicorn runtime profile.
+
+    gunicorn -c gunicorn.conf.py app_supabase:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+
+Workers are sized from the container's CPU quota and memory limit, and the
+memory limit is usually the one that binds. One worker idles at ~60 MB. It
+peaks near 200 MB while Pillow decodes a 12 MP phone photo. On a 512 MB
+instance that allows two workers, whatever os.cpu_count() says about the host.
+Threads cover the DB and upload waits; the pixel scorer holds the GIL, so more
+than a few threads per worker only adds queueing.
+
+Every setting can be overridden with the usual gunicorn CLI flags, or with the
+environment variables read below. WEB_CONCURRENCY and GUNICORN_THREADS are
+exported so the app and database.check_connection_budget() see the final
+values.
+"""
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _cpu_limit():
+    """CPUs available to this container (cgroup quota first, then the host)."""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _memory_limit_mb():
+    """Memory available to this container in MB, or None if unknown."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number
+        if raw.isdigit() and int(raw) < (1 << 50):
+            return int(raw) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+WORKER_MEMORY_MB = _env_int('GUNICORN_WORKER_MEMORY_MB', 200)
+# Left for the master (which holds the preloaded app) and the OS.
+RESERVED_MEMORY_MB = _env_int('GUNICORN_RESERVED_MEMORY_MB', 100)
+
+
+def _default_workers():
+    cpu_workers = 2 * _cpu_limit() + 1
+    memory = _memory_limit_mb()
+    if memory is None:
+        return cpu_workers
+    return max(1, min(cpu_workers, (memory - RESERVED_MEMORY_MB) // WORKER_MEMORY_MB))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = _env_int('WEB_CONCURRENCY', 0) or _default_workers()
+threads = _env_int('GUNICORN_THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Load the app (lookup tables, scorer, templates) once in the master so workers
+# share it copy-on-write. post_fork drops the master's DB connections.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers so memory fragmented by large image decodes is returned.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# A worker silent for this long is killed; it must cover a slow mobile upload
+# plus scoring. graceful_timeout bounds draining on deploy and recycle.
+# keepalive stays below the platform proxy's idle timeout.
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Heartbeat files on tmpfs, so a slow disk cannot get workers killed.
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# metrics.py aggregates every worker's samples from this directory. It must be
+# set before the app (and prometheus_client) is imported.
+METRICS_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'denguetect-metrics'),
+)
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+# The budget check needs the final worker count, so it runs in when_ready.
+CHECK_CONNECTION_BUDGET = os.getenv('DB_CHECK_CONNECTION_BUDGET', 'true').lower() == 'true'
+
+
+def on_starting(server):
+    # Samples from a previous run would be summed into this one. This runs after
+    # preload, but the master never serves requests, so its files can go too.
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def when_ready(server):
+    server.log.info(
+        "workers=%s threads=%s worker_class=%s preload=%s memory_limit_mb=%s",
+        server.cfg.workers, server.cfg.threads, server.cfg.worker_class_str, server.cfg.preload_app,
+        _memory_limit_mb(),
+    )
+    if CHECK_CONNECTION_BUDGET:
+        try:
+            import database
+            database.check_connection_budget(server.cfg.workers, server.cfg.threads)
+            database.dispose_engines()
+        except Exception as e:
+            server.log.warning("Connection budget check failed: %s", e)
+
+
+def post_fork(server, worker):
+    # Pooled connections inherited from the master must not be shared between
+    # processes; close=False leaves the master's sockets alone.
+    database = sys.modules.get('database')
+    if database is not None:
+        database.dispose_engines(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (pool in use, queue depth); its counters stay summed.
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
@@ -0,0 +1,66 @@
+"""Per-route HTTP caching policy shared by app.py and app_supabase.py.
+
+Policies are looked up by Flask endpoint name. Anything not listed, and every
+non-200 response, gets no-store, which is what the whole app used to send.
+"""
+
+from flask import request
+
+# Vite emits content-hashed file names under dist/assets, so they never change.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Shared files that may change in place: cache, but revalidate with
+# ETag / Last-Modified (send_file sets both).
+REVALIDATE = 'public, no-cache'
+# Pages rendered from mostly static templates whose header still depends on the
+# session (logged_in / avatar_url): browser-only cache, revalidated by ETag.
+PRIVATE_REVALIDATE = 'private, no-cache'
+# Authenticated, user-specific content.
+NO_STORE = 'no-store, no-cache, must-revalidate, max-age=0'
+
+# endpoint -> (Cache-Control, compute an ETag from the body)
+CACHE_POLICIES = {
+    'landing_assets': (IMMUTABLE, False),
+    'static': (REVALIDATE, False),
+    # New uploads are content-addressed; legacy <uuid>.jpg keys were never rewritten either.
+    'uploaded_file': (IMMUTABLE, False),
+    'landing_page': (PRIVATE_REVALIDATE, True),
+    'index': (PRIVATE_REVALIDATE, True),
+    'login': (PRIVATE_REVALIDATE, True),
+    'register': (PRIVATE_REVALIDATE, True),
+    'dashboard': (PRIVATE_REVALIDATE, True),
+    'education_what_is_dengue': (PRIVATE_REVALIDATE, True),
+    'education_local_services': (PRIVATE_REVALIDATE, True),
+    'report_bite': (PRIVATE_REVALIDATE, True),
+    'bite_analysis_result': (PRIVATE_REVALIDATE, True),
+    'api_symptom_combinations': (REVALIDATE, True),
+}
+
+
+def apply_cache_policy(response, endpoint, policies=CACHE_POLICIES):
+    cache_control, etag = policies.get(endpoint, (NO_STORE, False))
+    if response.status_code not in (200, 304):
+        cache_control, etag = NO_STORE, False
+
+    response.headers['Cache-Control'] = cache_control
+    if cache_control == NO_STORE:
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+        return response
+
+    response.headers.pop('Pragma', None)
+    response.headers.pop('Expires', None)
+    if etag and response.status_code == 200 and not response.direct_passthrough and not response.is_streamed:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+def install_cache_policy(app, policies=CACHE_POLICIES):
+    @app.after_request
+    def add_cache_headers(response):
+        try:
+            apply_cache_policy(response, request.endpoint, policies)
+        except Exception:
+            response.headers['Cache-Control'] = NO_STORE
+        return response
+    return add_cache_headers
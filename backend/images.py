@@ -0,0 +1,7 @@
+"""Moved to dengue_core.images; this module keeps `import images` working."""
+
+import sys
+
+from dengue_core import images
+
+sys.modules[__name__] = images
@@ -0,0 +1,212 @@
+"""Prometheus metrics, served at /metrics.
+
+Exports:
+  http_request_duration_seconds{endpoint,method,status}  histogram, one series per Flask endpoint
+  image_analysis_seconds{stage}                           decode / classify / persist
+  db_request_queries, db_request_query_seconds,
+  db_request_checkout_wait_seconds                        per-request DB histograms
+  db_pool_*, cache_requests_total{cache,result},
+  cache_entries{cache}, password_hash_*, rate_limit_*     mirrored from the modules' own stats()
+
+With several gunicorn workers every process writes its samples to
+PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py points it at /dev/shm), and a
+scrape of any worker aggregates all of them. Without that directory each
+process reports only itself, which is right for a single dev server.
+
+Pool, cache and hash-pool figures are counters kept by the owning modules.
+They are copied into Prometheus at most every METRICS_SYNC_SECONDS per
+process and on every scrape, so the request path only pays for one
+histogram observation.
+
+Off unless METRICS_TOKEN is set and prometheus_client is installed. When
+off, nothing is recorded and /metrics is not registered (404). When on,
+/metrics needs `Authorization: Bearer <METRICS_TOKEN>`.
+"""
+
+import hmac
+import os
+import sys
+import time
+import threading
+
+from flask import g, request
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:
+    multiprocess = None
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+METRICS_ENABLED = (os.getenv('METRICS_ENABLED', 'true').lower() == 'true') and multiprocess is not None and bool(METRICS_TOKEN)
+METRICS_SYNC_SECONDS = float(os.getenv('METRICS_SYNC_SECONDS', '5'))
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir')
+
+if METRICS_ENABLED:
+    REQUEST_SECONDS = Histogram(
+        'http_request_duration_seconds', 'Time to build the response, by endpoint and status',
+        ['endpoint', 'method', 'status'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    IMAGE_SECONDS = Histogram(
+        'image_analysis_seconds', 'Bite image analysis time by stage', ['stage'],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    DB_QUERIES = Histogram(
+        'db_request_queries', 'SQL statements per request',
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+    )
+    DB_QUERY_SECONDS = Histogram(
+        'db_request_query_seconds', 'Time in SQL per request',
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+    DB_CHECKOUT_WAIT = Histogram(
+        'db_request_checkout_wait_seconds', 'Time waiting for a pooled connection per request',
+        buckets=(0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+    )
+    DB_POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Connections checked out of the pool')
+    DB_POOL_WAIT = Counter('db_pool_checkout_wait_seconds_total', 'Time spent waiting for pooled connections')
+    DB_POOL_PING_FAILURES = Counter('db_pool_ping_failures_total', 'Pooled connections found dead on checkout')
+    DB_POOL_IN_USE = Gauge('db_pool_in_use', 'Connections currently checked out', multiprocess_mode='livesum')
+    CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by result', ['cache', 'result'])
+    CACHE_ENTRIES = Gauge('cache_entries', 'Entries held per cache', ['cache'], multiprocess_mode='livesum')
+    HASH_JOBS = Counter('password_hash_jobs_total', 'Password hashes and verifications run')
+    HASH_SECONDS = Counter('password_hash_seconds_total', 'Time spent hashing passwords')
+    HASH_REJECTED = Counter('password_hash_rejected_total', 'Hash requests turned away', ['reason'])
+    HASH_QUEUE = Gauge('password_hash_queue_depth', 'Hash jobs running or queued', multiprocess_mode='livesum')
+    RATE_LIMIT_CHECKS = Counter('rate_limit_checks_total', 'Rate limit checks by result', ['result'])
+
+_sync_lock = threading.Lock()
+_synced_at = 0.0
+_last_totals = {}
+
+
+def observe_image_stage(stage, seconds):
+    if METRICS_ENABLED:
+        IMAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_db_request(stats):
+    if METRICS_ENABLED and stats:
+        DB_QUERIES.observe(stats['queries'])
+        DB_QUERY_SECONDS.observe(stats['query_time'])
+        DB_CHECKOUT_WAIT.observe(stats['checkout_wait'])
+
+
+def _inc_to(counter, total):
+    """Advance counter to a running total kept elsewhere in this process."""
+    last = _last_totals.get(counter, 0)
+    if total > last:
+        counter.inc(total - last)
+    _last_totals[counter] = total
+
+
+def _sync_module_stats(app):
+    database = sys.modules.get('database')
+    if database is not None:
+        pool = database.pool_status()
+        _inc_to(DB_POOL_CHECKOUTS, pool['checkouts'])
+        _inc_to(DB_POOL_WAIT, pool['checkout_wait_total'])
+        _inc_to(DB_POOL_PING_FAILURES, pool['ping_failures'])
+        DB_POOL_IN_USE.set(pool['checked_out'])
+
+    caches = {}
+    render_cache = app.extensions.get('render_cache')
+    if render_cache is not None:
+        caches['render'] = render_cache.stats()
+    session_store = sys.modules.get('session_store')
+    if session_store is not None:
+        caches['session'] = session_store.cache.stats()
+    for name, stats in caches.items():
+        _inc_to(CACHE_REQUESTS.labels(name, 'hit'), stats['hits'])
+        _inc_to(CACHE_REQUESTS.labels(name, 'miss'), stats['misses'])
+        CACHE_ENTRIES.labels(name).set(stats['size'])
+
+    passwords = sys.modules.get('passwords')
+    if passwords is not None:
+        hashing = passwords.password_hash_stats()
+        _inc_to(HASH_JOBS, hashing['jobs'])
+        _inc_to(HASH_SECONDS, hashing['hash_seconds_total'])
+        _inc_to(HASH_REJECTED.labels('queue_full'), hashing['rejected'])
+        _inc_to(HASH_REJECTED.labels('timeout'), hashing['timeouts'])
+        HASH_QUEUE.set(hashing['queue_depth'])
+
+    limiter = app.extensions.get('rate_limit')
+    if limiter is not None:
+        _inc_to(RATE_LIMIT_CHECKS.labels('limited'), limiter.stats['limited'])
+        _inc_to(RATE_LIMIT_CHECKS.labels('allowed'), limiter.stats['checked'] - limiter.stats['limited'])
+
+
+def sync_module_stats(app, force=False):
+    global _synced_at
+    now = time.monotonic()
+    if not force and now - _synced_at < METRICS_SYNC_SECONDS:
+        return
+    with _sync_lock:
+        _synced_at = now
+        try:
+            _sync_module_stats(app)
+        except Exception as e:
+            print(f"Metrics sync failed: {e}")
+
+
+def render_metrics(app):
+    sync_module_stats(app, force=True)
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+class ASGIRouteMetrics:
+    """Per-route ASGI middleware recording the same histogram as the Flask hook."""
+
+    def __init__(self, app, endpoint):
+        self.app = app
+        self.endpoint = endpoint
+
+    async def __call__(self, scope, receive, send):
+        if not METRICS_ENABLED or scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.labels(self.endpoint, scope['method'], str(status[0])).observe(time.perf_counter() - started)
+
+
+def install_metrics(app):
+    if not METRICS_ENABLED:
+        return None
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            REQUEST_SECONDS.labels(
+                request.endpoint or 'unmatched', request.method, str(response.status_code)
+            ).observe(time.perf_counter() - started)
+        sync_module_stats(app)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        supplied = request.headers.get('Authorization') or ''
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {METRICS_TOKEN}'.encode('utf-8')):
+            return 'Unauthorized', 401, {'WWW-Authenticate': 'Bearer'}
+        return render_metrics(app), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+    return metrics
@@ -0,0 +1,410 @@
+"""Outbreak-signal detection over incoming assessments.
+
+    python outbreak.py follow [--poll 5]
+    python outbreak.py backfill [--days 90 | --since YYYY-MM-DD] [--until YYYY-MM-DD] [--quiet]
+
+One series per region and symptom cluster:
+  all            every assessment
+  high_risk      risk_level high or very_high
+  warning_signs  any WHO warning sign (dengue_core.scoring.WARNING_SYMPTOMS)
+  hemorrhagic    petechiae, gum or nose bleeding, blood in vomit or stool
+
+Each series counts assessments per OUTBREAK_BUCKET_SECONDS (a day). An EWMA
+of the closed buckets is the expected count. A one-sided CUSUM adds up how
+far each bucket is above it, in standard deviations (at least Poisson noise,
+so sqrt(expected)). The running bucket is checked on every assessment. Once
+the CUSUM would pass OUTBREAK_CUSUM_H with at least OUTBREAK_MIN_COUNT
+assessments in the bucket, one alert goes to the sink and the CUSUM restarts
+when the bucket closes. No alerts come before OUTBREAK_WARMUP buckets of history.
+A series holds seven numbers, whatever the history behind it.
+
+`follow` is the long-running consumer. It reads assessments in
+(created_at, id) order as they are written. Rows younger than
+OUTBREAK_SETTLE_SECONDS are left for the next poll, so a slow commit is not
+skipped. Every web worker writes assessments, so exactly one `follow`
+should run. State and the read position are checkpointed to
+OUTBREAK_STATE_PATH every OUTBREAK_CHECKPOINT_SECONDS and on exit, and
+`follow` resumes from them. `backfill` starts from an empty state, replays
+historical rows in batches, and checkpoints, so `follow` can take over
+where it stopped.
+
+OUTBREAK_SINK selects where alerts go:
+  file     default; one JSON object per line in OUTBREAK_ALERT_FILE
+  webhook  POST the JSON to OUTBREAK_WEBHOOK_URL
+  log      print it
+Other sinks plug in with register_sink(name, factory). A sink is any object
+with emit(alert). set_sink() swaps the process-wide instance, e.g. for a test.
+"""
+
+import argparse
+import json
+import math
+import os
+import signal
+import tempfile
+import time
+import urllib.request
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, or_, select
+
+import database
+from database import Assessment, User, _env_int
+from dengue_core.scoring import ENHANCED_SYMPTOMS_DATA, WARNING_SYMPTOMS
+from surveillance import UNKNOWN_REGION, _assessment_region
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+OUTBREAK_DIR = os.getenv('OUTBREAK_DIR', os.path.join(os.path.dirname(__file__), 'data', 'outbreak'))
+OUTBREAK_STATE_PATH = os.getenv('OUTBREAK_STATE_PATH', os.path.join(OUTBREAK_DIR, 'state.json'))
+OUTBREAK_ALERT_FILE = os.getenv('OUTBREAK_ALERT_FILE', os.path.join(OUTBREAK_DIR, 'alerts.jsonl'))
+OUTBREAK_SINK = (os.getenv('OUTBREAK_SINK', 'file') or 'file').lower()
+OUTBREAK_WEBHOOK_URL = os.getenv('OUTBREAK_WEBHOOK_URL') or None
+OUTBREAK_BUCKET_SECONDS = _env_int('OUTBREAK_BUCKET_SECONDS', 86400)
+OUTBREAK_ALPHA = _env_float('OUTBREAK_ALPHA', 0.1)
+OUTBREAK_CUSUM_K = _env_float('OUTBREAK_CUSUM_K', 0.5)
+OUTBREAK_CUSUM_H = _env_float('OUTBREAK_CUSUM_H', 5.0)
+OUTBREAK_WARMUP = _env_int('OUTBREAK_WARMUP', 7)
+OUTBREAK_MIN_COUNT = _env_int('OUTBREAK_MIN_COUNT', 5)
+OUTBREAK_MAX_GAP = _env_int('OUTBREAK_MAX_GAP', 60)
+OUTBREAK_SETTLE_SECONDS = _env_int('OUTBREAK_SETTLE_SECONDS', 10)
+OUTBREAK_POLL_SECONDS = _env_float('OUTBREAK_POLL_SECONDS', 5)
+OUTBREAK_CHECKPOINT_SECONDS = _env_int('OUTBREAK_CHECKPOINT_SECONDS', 60)
+OUTBREAK_BACKFILL_DAYS = _env_int('OUTBREAK_BACKFILL_DAYS', 90)
+OUTBREAK_BATCH = _env_int('OUTBREAK_BATCH', 5000)
+
+_EPOCH = datetime(1970, 1, 1)
+
+HIGH_RISK_LEVELS = frozenset({'high', 'very_high'})
+SYMPTOM_CLUSTERS = {
+    'warning_signs': WARNING_SYMPTOMS,
+    'hemorrhagic': frozenset({'petechiae', 'gingival-bleeding', 'epistaxis', 'blood-in-vomit-stool'}),
+}
+# An id the scorer doesn't know would never match; fail at import instead.
+_unknown_symptoms = frozenset().union(*SYMPTOM_CLUSTERS.values()) - ENHANCED_SYMPTOMS_DATA.keys()
+if _unknown_symptoms:
+    raise RuntimeError(f"SYMPTOM_CLUSTERS has ids the scorer doesn't know: {', '.join(sorted(_unknown_symptoms))}")
+
+
+def clusters_for(risk_level, symptoms):
+    """Cluster names an assessment counts towards."""
+    names = ['all']
+    if risk_level in HIGH_RISK_LEVELS:
+        names.append('high_risk')
+    s = set(symptoms or ())
+    names.extend(name for name, members in SYMPTOM_CLUSTERS.items() if s & members)
+    return names
+
+
+class FileSink:
+    """Append each alert as a JSON line."""
+
+    def __init__(self, path=None):
+        self.path = path or OUTBREAK_ALERT_FILE
+
+    def emit(self, alert):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + '\n')
+
+
+class WebhookSink:
+    """POST each alert as JSON; a failed delivery is logged, not retried."""
+
+    def __init__(self, url=None, timeout=5):
+        self.url = url or OUTBREAK_WEBHOOK_URL
+        if not self.url:
+            raise RuntimeError('OUTBREAK_SINK=webhook needs OUTBREAK_WEBHOOK_URL')
+        self.timeout = timeout
+
+    def emit(self, alert):
+        req = urllib.request.Request(self.url, data=json.dumps(alert).encode(), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+        except Exception as e:
+            print(f"Outbreak webhook failed for {alert['region']}/{alert['cluster']}: {e}")
+
+
+class LogSink:
+    def emit(self, alert):
+        print(f"Outbreak signal: {json.dumps(alert)}")
+
+
+SINKS = {'file': FileSink, 'webhook': WebhookSink, 'log': LogSink}
+
+_sink = None
+
+
+def register_sink(name, factory):
+    """Make OUTBREAK_SINK=name build its sink with factory()."""
+    SINKS[name.lower()] = factory
+
+
+def set_sink(sink):
+    global _sink
+    _sink = sink
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        factory = SINKS.get(OUTBREAK_SINK)
+        if factory is None:
+            raise RuntimeError(f"unknown OUTBREAK_SINK {OUTBREAK_SINK!r}; known: {', '.join(sorted(SINKS))}")
+        _sink = factory()
+    return _sink
+
+
+class Series:
+    """Running bucket plus EWMA and CUSUM state for one region and cluster."""
+
+    __slots__ = ('bucket', 'count', 'mean', 'var', 'cusum', 'seen', 'alerted')
+
+    def __init__(self, bucket=None, count=0, mean=0.0, var=0.0, cusum=0.0, seen=0, alerted=None):
+        self.bucket = bucket
+        self.count = count
+        self.mean = mean
+        self.var = var
+        self.cusum = cusum
+        self.seen = seen
+        self.alerted = alerted
+
+    def state(self):
+        return [self.bucket, self.count, self.mean, self.var, self.cusum, self.seen, self.alerted]
+
+
+class Detector:
+    """EWMA baseline and one-sided CUSUM per (region, cluster), fed one assessment at a time."""
+
+    def __init__(self, sink=None, bucket_seconds=OUTBREAK_BUCKET_SECONDS, alpha=OUTBREAK_ALPHA,
+                 k=OUTBREAK_CUSUM_K, h=OUTBREAK_CUSUM_H, warmup=OUTBREAK_WARMUP, min_count=OUTBREAK_MIN_COUNT):
+        self.sink = sink
+        self.bucket_seconds = bucket_seconds
+        self.alpha = alpha
+        self.k = k
+        self.h = h
+        self.warmup = warmup
+        self.min_count = min_count
+        self.series = {}
+        self.position = None  # (created_at, id) of the last assessment consumed
+        self.alerts = 0
+
+    def _sd(self, s):
+        return math.sqrt(max(s.var, s.mean, 1.0))
+
+    def _close(self, s, count):
+        """Fold a finished bucket into the CUSUM and the EWMA baseline."""
+        if s.seen >= self.warmup:
+            s.cusum = max(0.0, s.cusum + (count - s.mean) / self._sd(s) - self.k)
+            if s.cusum > self.h:
+                s.cusum = 0.0
+        if s.seen == 0:
+            s.mean = float(count)
+        else:
+            diff = count - s.mean
+            s.mean += self.alpha * diff
+            s.var = (1 - self.alpha) * (s.var + self.alpha * diff * diff)
+        s.seen += 1
+
+    def _advance(self, s, bucket):
+        if s.bucket is None:
+            s.bucket = bucket
+            return
+        self._close(s, s.count)
+        for _ in range(min(bucket - s.bucket - 1, OUTBREAK_MAX_GAP)):
+            self._close(s, 0)
+        s.bucket = bucket
+        s.count = 0
+
+    def observe(self, region, created_at, risk_level, symptoms, assessment_id=None):
+        """Count one assessment; returns the alerts it raised."""
+        bucket = int((created_at.replace(tzinfo=None) - _EPOCH).total_seconds() // self.bucket_seconds)
+        region = region or UNKNOWN_REGION
+        raised = []
+        for cluster in clusters_for(risk_level, symptoms):
+            s = self.series.get((region, cluster))
+            if s is None:
+                s = self.series[(region, cluster)] = Series()
+            if s.bucket is None or bucket > s.bucket:
+                self._advance(s, bucket)
+            elif bucket < s.bucket:
+                continue  # late row for a bucket already closed
+            s.count += 1
+            if s.seen < self.warmup or s.alerted == bucket or s.count < self.min_count:
+                continue
+            sd = self._sd(s)
+            stat = max(0.0, s.cusum + (s.count - s.mean) / sd - self.k)
+            if stat > self.h:
+                s.alerted = bucket
+                raised.append(self._alert(region, cluster, s, bucket, stat, sd, created_at))
+        if assessment_id is not None:
+            self.position = (created_at, assessment_id)
+        return raised
+
+    def _alert(self, region, cluster, s, bucket, stat, sd, created_at):
+        alert = {
+            'region': region,
+            'cluster': cluster,
+            'bucket_start': (_EPOCH + timedelta(seconds=bucket * self.bucket_seconds)).isoformat(),
+            'bucket_seconds': self.bucket_seconds,
+            'count': s.count,
+            'expected': round(s.mean, 2),
+            'z': round((s.count - s.mean) / sd, 2),
+            'cusum': round(stat, 2),
+            'threshold': self.h,
+            'triggered_by_assessment_at': created_at.isoformat(),
+            'detected_at': datetime.utcnow().isoformat(),
+        }
+        self.alerts += 1
+        if self.sink is not None:
+            try:
+                self.sink.emit(alert)
+            except Exception as e:
+                print(f"Outbreak sink failed: {e}")
+        return alert
+
+    def _params(self):
+        return {'bucket_seconds': self.bucket_seconds, 'alpha': self.alpha, 'k': self.k, 'h': self.h,
+                'warmup': self.warmup, 'min_count': self.min_count}
+
+    def checkpoint(self, path=None):
+        """Write the state atomically: a temp file in the same directory, then a rename."""
+        path = path or OUTBREAK_STATE_PATH
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            'params': self._params(),
+            'position': [self.position[0].isoformat(), str(self.position[1])] if self.position else None,
+            'series': [[region, cluster, *s.state()] for (region, cluster), s in self.series.items()],
+            'written_at': datetime.utcnow().isoformat(),
+        }
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.state-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def load(self, path=None):
+        """Restore a checkpoint; False when there is none or it was made with other parameters."""
+        path = path or OUTBREAK_STATE_PATH
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        if data.get('params') != self._params():
+            print(f"Ignoring outbreak checkpoint {path}: made with {data.get('params')}; run `outbreak.py backfill`")
+            return False
+        self.series = {(region, cluster): Series(*state) for region, cluster, *state in data['series']}
+        position = data.get('position')
+        self.position = (datetime.fromisoformat(position[0]), position[1]) if position else None
+        return True
+
+
+def read_assessments(db, after=None, before=None, limit=OUTBREAK_BATCH):
+    """Up to limit assessments after the (created_at, id) position and before a time, oldest first."""
+    region = _assessment_region().label('region')
+    query = (
+        select(Assessment.id, Assessment.created_at, Assessment.risk_level, Assessment.symptoms, region)
+        .select_from(Assessment)
+        .outerjoin(User, User.id == Assessment.user_id)
+        .order_by(Assessment.created_at, Assessment.id)
+        .limit(limit)
+    )
+    if after is not None:
+        at, last_id = after
+        if last_id is None:
+            query = query.where(Assessment.created_at >= at)
+        else:
+            query = query.where(or_(Assessment.created_at > at,
+                                    and_(Assessment.created_at == at, Assessment.id > last_id)))
+    if before is not None:
+        query = query.where(Assessment.created_at < before)
+    return db.execute(query).all()
+
+
+def consume(detector, db, before=None):
+    """Feed every assessment after the detector's position (and before `before`); returns how many."""
+    total = 0
+    while True:
+        rows = read_assessments(db, detector.position, before)
+        for row in rows:
+            detector.observe(row.region, row.created_at, row.risk_level, row.symptoms, row.id)
+        total += len(rows)
+        if len(rows) < OUTBREAK_BATCH:
+            return total
+
+
+def backfill(since, until=None, sink=None):
+    """A fresh detector replayed over since..until and checkpointed; returns (detector, rows)."""
+    detector = Detector(sink=sink)
+    detector.position = (datetime.combine(since, datetime.min.time()), None)
+    before = datetime.combine(until + timedelta(days=1), datetime.min.time()) if until else None
+    db = database.ReadSessionLocal()
+    try:
+        rows = consume(detector, db, before)
+    finally:
+        db.close()
+    detector.checkpoint()
+    return detector, rows
+
+
+def follow(poll=OUTBREAK_POLL_SECONDS):
+    """Consume new assessments until SIGTERM or Ctrl-C, checkpointing as it goes."""
+    detector = Detector(sink=get_sink())
+    if not detector.load():
+        detector.position = (datetime.utcnow() - timedelta(seconds=OUTBREAK_SETTLE_SECONDS), None)
+        print("No outbreak checkpoint; following new assessments only (run `outbreak.py backfill` for history)")
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+    last_checkpoint = time.monotonic()
+    try:
+        while not stop:
+            db = database.ReadSessionLocal()
+            try:
+                consume(detector, db, datetime.utcnow() - timedelta(seconds=OUTBREAK_SETTLE_SECONDS))
+            except Exception as e:
+                print(f"Outbreak consumer error: {e}")
+            finally:
+                db.close()
+            if time.monotonic() - last_checkpoint >= OUTBREAK_CHECKPOINT_SECONDS:
+                detector.checkpoint()
+                last_checkpoint = time.monotonic()
+            time.sleep(poll)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detector.checkpoint()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_follow = sub.add_parser('follow')
+    p_follow.add_argument('--poll', type=float, default=OUTBREAK_POLL_SECONDS)
+    p_backfill = sub.add_parser('backfill')
+    p_backfill.add_argument('--days', type=int, default=OUTBREAK_BACKFILL_DAYS)
+    p_backfill.add_argument('--since', type=date.fromisoformat)
+    p_backfill.add_argument('--until', type=date.fromisoformat)
+    p_backfill.add_argument('--quiet', action='store_true', help='rebuild state without sending alerts')
+    args = parser.parse_args()
+
+    if args.command == 'follow':
+        follow(args.poll)
+    else:
+        since = args.since or date.today() - timedelta(days=args.days)
+        started = time.perf_counter()
+        detector, rows = backfill(since, args.until, None if args.quiet else get_sink())
+        print(f"Replayed {rows} assessments into {len(detector.series)} series in "
+              f"{time.perf_counter() - started:.1f}s; {detector.alerts} alerts")
@@ -0,0 +1,126 @@
+"""Monthly partition maintenance for assessments and bite_analyses.
+
+    python partitions.py maintain [--months-ahead 3]
+    python partitions.py archive [--retain-months 12] [--archive-dir DIR] [--keep]
+
+`maintain` creates the partitions for the current and upcoming months. If
+maintenance fell behind, it also gives each earlier month with rows in the
+default partition its own partition and moves the rows there.
+`archive` detaches months older than the retention window, exports each one to
+a gzip-compressed CSV and drops it. Rollups such as user_assessment_stats keep
+their lifetime counts; only the raw rows leave the database.
+"""
+
+import argparse
+import gzip
+import os
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+from database import engine, _env_int
+
+PARTITIONED_TABLES = ('assessments', 'bite_analyses')
+PARTITION_MONTHS_AHEAD = _env_int('PARTITION_MONTHS_AHEAD', 3)
+PARTITION_RETAIN_MONTHS = _env_int('PARTITION_RETAIN_MONTHS', 12)
+PARTITION_ARCHIVE_DIR = os.getenv(
+    'PARTITION_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(__file__), 'data', 'archive'),
+)
+
+_PARTITION_NAME = re.compile(r'^(?P<parent>[a-z_]+)_p(?P<year>\d{4})_(?P<month>\d{2})$')
+
+
+def _month_start(months_back, today=None):
+    today = today or date.today()
+    index = today.year * 12 + (today.month - 1) - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_future_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """Create missing partitions up to months_ahead; returns how many were made."""
+    with engine.begin() as conn:
+        return conn.execute(text("SELECT maintain_partitions(:n)"), {'n': months_ahead}).scalar() or 0
+
+
+def list_monthly_partitions(conn, parent):
+    """Monthly partitions of parent, attached or already detached, oldest first."""
+    rows = conn.execute(text(
+        "SELECT c.relname, c.relispartition FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relkind = 'r' AND n.nspname = current_schema() AND c.relname LIKE :pattern"
+    ), {'pattern': f"{parent}\\_p%"}).fetchall()
+    parts = []
+    for name, attached in rows:
+        m = _PARTITION_NAME.match(name)
+        if not m or m.group('parent') != parent:
+            continue
+        parts.append((date(int(m.group('year')), int(m.group('month')), 1), name, attached))
+    return sorted(parts)
+
+
+def _export_partition(name, archive_dir):
+    """Stream a partition to <archive_dir>/<name>.csv.gz; written atomically."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = f"{path}.tmp"
+    copy_sql = f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)"
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        with gzip.open(tmp_path, 'wb') as out:
+            if hasattr(cur, 'copy_expert'):
+                cur.copy_expert(copy_sql, out)
+            else:
+                with cur.copy(copy_sql) as copy:
+                    for chunk in copy:
+                        out.write(chunk)
+        raw.commit()
+    finally:
+        raw.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_old_partitions(retain_months=PARTITION_RETAIN_MONTHS, archive_dir=PARTITION_ARCHIVE_DIR, drop=True):
+    """Detach, export and drop monthly partitions older than retain_months.
+
+    Partitions are detached before export so a failed export leaves the data
+    in a detached table, which the next run picks up again.
+    """
+    cutoff = _month_start(retain_months)
+    archived = []
+    for parent in PARTITIONED_TABLES:
+        with engine.connect() as conn:
+            partitions = list_monthly_partitions(conn, parent)
+        for month, name, attached in partitions:
+            if month >= cutoff:
+                continue
+            if attached:
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name}"))
+            path = _export_partition(name, archive_dir)
+            if drop:
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP TABLE {name}"))
+            print(f"Archived {name} to {path}")
+            archived.append(path)
+    return archived
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_maintain = sub.add_parser('maintain')
+    p_maintain.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    p_archive = sub.add_parser('archive')
+    p_archive.add_argument('--retain-months', type=int, default=PARTITION_RETAIN_MONTHS)
+    p_archive.add_argument('--archive-dir', default=PARTITION_ARCHIVE_DIR)
+    p_archive.add_argument('--keep', action='store_true', help='export and detach but do not drop')
+    args = parser.parse_args()
+
+    if args.command == 'maintain':
+        print(f"Created {ensure_future_partitions(args.months_ahead)} partitions")
+    else:
+        archive_old_partitions(args.retain_months, args.archive_dir, drop=not args.keep)
@@ -0,0 +1,159 @@
+"""Password hashing on a small bounded pool.
+
+scrypt / pbkdf2 are deliberately slow. Running them on the request thread lets a
+burst of logins starve every other route in the worker. Here at most
+PASSWORD_HASH_WORKERS hashes run at once. Up to PASSWORD_HASH_QUEUE_LIMIT
+more may wait, and past that HashPoolBusy is raised, which the login and
+register routes turn into a "try again" page.
+
+PASSWORD_HASH_METHOD takes any werkzeug method string, e.g. "scrypt" or
+"pbkdf2:sha256:600000". Stored hashes made with other parameters are upgraded
+on the next successful login (needs_rehash).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+# hashlib releases the GIL while hashing, so threads give real parallelism.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', '16'))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hash queue is full or a hash waited past the timeout."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# Running + queued jobs; bounded by workers + queue limit.
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+_stats_lock = threading.Lock()
+_stats = {
+    'jobs': 0,
+    'hashes': 0,
+    'verifies': 0,
+    'rehashes': 0,
+    'rejected': 0,
+    'timeouts': 0,
+    'hash_seconds_total': 0.0,
+    'hash_seconds_max': 0.0,
+    'wait_seconds_total': 0.0,
+    'queue_depth': 0,
+    'queue_depth_peak': 0,
+}
+_method_prefix = None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+        return _executor
+
+
+def _timed(fn, args, queued_at):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        with _stats_lock:
+            _stats['jobs'] += 1
+            _stats['queue_depth'] -= 1
+            _stats['hash_seconds_total'] += elapsed
+            _stats['hash_seconds_max'] = max(_stats['hash_seconds_max'], elapsed)
+            _stats['wait_seconds_total'] += started - queued_at
+        _slots.release()
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats['rejected'] += 1
+        raise HashPoolBusy('password hashing queue is full')
+    with _stats_lock:
+        _stats['queue_depth'] += 1
+        _stats['queue_depth_peak'] = max(_stats['queue_depth_peak'], _stats['queue_depth'])
+    try:
+        future = _get_executor().submit(_timed, fn, args, time.perf_counter())
+    except Exception:
+        with _stats_lock:
+            _stats['queue_depth'] -= 1
+        _slots.release()
+        raise
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        cancelled = future.cancel()
+        with _stats_lock:
+            _stats['timeouts'] += 1
+            if cancelled:
+                _stats['queue_depth'] -= 1
+        if cancelled:
+            _slots.release()
+        raise HashPoolBusy('password hashing timed out')
+
+
+def hash_password(password):
+    result = _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+    with _stats_lock:
+        _stats['hashes'] += 1
+    return result
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    result = _run(check_password_hash, password_hash, password)
+    with _stats_lock:
+        _stats['verifies'] += 1
+    return result
+
+
+def _configured_prefix():
+    """The method field werkzeug writes for PASSWORD_HASH_METHOD, defaults filled in.
+
+    Computed once by hashing an empty string, so werkzeug's own defaults apply.
+    """
+    global _method_prefix
+    if _method_prefix is None:
+        _method_prefix = generate_password_hash('', PASSWORD_HASH_METHOD).split('$', 1)[0]
+    return _method_prefix
+
+
+def needs_rehash(password_hash):
+    return bool(password_hash) and password_hash.split('$', 1)[0] != _configured_prefix()
+
+
+def rehash_if_needed(password_hash, password):
+    """New hash for a just-verified password when the parameters changed, else None.
+
+    Skipped when the pool is busy: the upgrade simply happens on a later login.
+    """
+    if not needs_rehash(password_hash):
+        return None
+    try:
+        new_hash = hash_password(password)
+    except HashPoolBusy:
+        return None
+    with _stats_lock:
+        _stats['rehashes'] += 1
+    return new_hash
+
+
+def password_hash_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    jobs = stats['jobs']
+    stats['hash_seconds_avg'] = stats['hash_seconds_total'] / jobs if jobs else 0.0
+    stats['wait_seconds_avg'] = stats['wait_seconds_total'] / jobs if jobs else 0.0
+    stats['workers'] = PASSWORD_HASH_WORKERS
+    stats['queue_limit'] = PASSWORD_HASH_QUEUE_LIMIT
+    return stats
@@ -0,0 +1,295 @@
+"""On-demand request profiling for production.
+
+Off unless PROFILER_TOKEN is set. When off, no hooks are installed at all.
+When on, a request is profiled in either of two cases:
+
+  * It carries `X-Profile: <token>`. Tokens are signed with the app's
+    SECRET_KEY and minted by POST /debug/profiles/token. They expire after
+    PROFILE_TOKEN_MAX_AGE seconds.
+  * Sampling is switched on, and the request is among the sampled fraction
+    of requests to the listed endpoints. Set it with
+    PUT /debug/profiles/sampling {"rate": 0.05, "endpoints": ["api_analyze_bite"], "seconds": 600},
+    or with PROFILE_SAMPLE_RATE / PROFILE_ENDPOINTS. The toggle is a file in
+    PROFILE_DIR, so every worker on the host follows it.
+
+Each profile is a cProfile dump (<name>.prof, open it with pstats or
+snakeviz), plus <name>.json. The JSON holds the request, its status and
+duration, the top functions, and every SQL statement with its time. The
+directory keeps the newest PROFILE_MAX_FILES profiles, up to PROFILE_MAX_MB.
+
+All /debug/profiles endpoints need `Authorization: Bearer <PROFILER_TOKEN>`:
+
+    GET    /debug/profiles                list, newest first
+    GET    /debug/profiles/<name>         download a .prof or .json
+    GET|PUT|DELETE /debug/profiles/sampling
+    POST   /debug/profiles/token          signed X-Profile token
+
+One profile runs per process at a time; Python 3.12+ allows only one active
+profiler. Requests that arrive while one is running are served normally.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+
+from flask import g, request, send_from_directory
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN') or None
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'denguetect-profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+PROFILE_MAX_MB = float(os.getenv('PROFILE_MAX_MB', '100'))
+PROFILE_TOKEN_MAX_AGE = int(os.getenv('PROFILE_TOKEN_MAX_AGE', '3600'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_ENDPOINTS = [e.strip() for e in os.getenv('PROFILE_ENDPOINTS', '').split(',') if e.strip()]
+PROFILE_TOP_FUNCTIONS = 30
+
+PROFILE_HEADER = 'X-Profile'
+_SAMPLING_FILE = 'sampling.json'
+_NAME_RE = re.compile(r'^[\w.-]+\.(prof|json)$')
+
+_profile_lock = threading.Lock()
+_sampling = {'rate': PROFILE_SAMPLE_RATE, 'endpoints': PROFILE_ENDPOINTS, 'until': None}
+_sampling_checked_at = 0.0
+_sampling_mtime = None
+
+
+def _sampling_state():
+    """Current sampling settings; the toggle file is re-read at most once a second."""
+    global _sampling, _sampling_checked_at, _sampling_mtime
+    now = time.monotonic()
+    if now - _sampling_checked_at < 1.0:
+        return _sampling
+    _sampling_checked_at = now
+    path = os.path.join(PROFILE_DIR, _SAMPLING_FILE)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+    if mtime != _sampling_mtime:
+        _sampling_mtime = mtime
+        state = {'rate': PROFILE_SAMPLE_RATE, 'endpoints': PROFILE_ENDPOINTS, 'until': None}
+        if mtime is not None:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    state.update(json.load(f))
+            except Exception as e:
+                print(f"Ignoring unreadable profiler sampling file: {e}")
+        _sampling = state
+    return _sampling
+
+
+def _write_sampling(state):
+    global _sampling_checked_at
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp = os.path.join(PROFILE_DIR, f".{_SAMPLING_FILE}.{os.getpid()}")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(PROFILE_DIR, _SAMPLING_FILE))
+    _sampling_checked_at = 0.0
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.secret_key, salt='request-profile')
+
+
+def _profile_reason(app):
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        try:
+            _serializer(app).loads(token, max_age=PROFILE_TOKEN_MAX_AGE)
+            return 'header'
+        except BadSignature:
+            return None
+    state = _sampling_state()
+    rate = state.get('rate') or 0
+    if rate <= 0:
+        return None
+    if state.get('until') and time.time() > state['until']:
+        return None
+    endpoints = state.get('endpoints')
+    if endpoints and request.endpoint not in endpoints:
+        return None
+    return 'sampled' if random.random() < rate else None
+
+
+def _top_functions(prof):
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def _rotate():
+    try:
+        names = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith('.json') and n != _SAMPLING_FILE)
+    except OSError:
+        return
+    sizes = {}
+    for n in names:
+        for suffix in ('.json', '.prof'):
+            try:
+                sizes[n] = sizes.get(n, 0) + os.path.getsize(os.path.join(PROFILE_DIR, n[:-5] + suffix))
+            except OSError:
+                pass
+    total = sum(sizes.values())
+    max_bytes = PROFILE_MAX_MB * 1024 * 1024
+    while names and (len(names) > PROFILE_MAX_FILES or total > max_bytes):
+        oldest = names.pop(0)
+        total -= sizes.get(oldest, 0)
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, oldest[:-5] + suffix))
+            except OSError:
+                pass
+
+
+def _save_profile(prof, meta):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    now = time.time()
+    # Millisecond timestamp first, so name order is age order for listing and rotation.
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now)) + f"{int(now * 1000) % 1000:03d}"
+    name = f"{stamp}-{meta['endpoint']}-{os.getpid()}-{secrets.token_hex(3)}"
+    prof_path = os.path.join(PROFILE_DIR, name + '.prof')
+    prof.dump_stats(prof_path + '.tmp')
+    os.replace(prof_path + '.tmp', prof_path)
+    meta = dict(meta, name=name, top_functions=_top_functions(prof))
+    json_path = os.path.join(PROFILE_DIR, name + '.json')
+    with open(json_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(json_path + '.tmp', json_path)
+    _rotate()
+    return name
+
+
+def _authorized():
+    supplied = request.headers.get('Authorization') or ''
+    return hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {PROFILER_TOKEN}'.encode('utf-8'))
+
+
+def _unauthorized():
+    return {'ok': False, 'error': 'unauthorized'}, 401, {'WWW-Authenticate': 'Bearer'}
+
+
+def install_profiler(app):
+    """Install the profiling hooks and endpoints.
+
+    In app_supabase this goes after the DB request-stats hooks so SQL can be traced.
+    """
+    if not PROFILER_TOKEN:
+        return None
+
+    @app.before_request
+    def start_profile():
+        reason = _profile_reason(app)
+        if reason is None or not _profile_lock.acquire(blocking=False):
+            return
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) already owns the hook.
+            _profile_lock.release()
+            return
+        database = sys.modules.get('database')
+        statements = database.trace_request_statements() if database is not None else None
+        g.request_profile = (prof, time.time(), time.perf_counter(), reason, statements)
+
+    @app.after_request
+    def record_profile_status(response):
+        if 'request_profile' in g:
+            g.request_profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_profile(exc=None):
+        state = g.pop('request_profile', None)
+        if state is None:
+            return
+        prof, started_at, started, reason, statements = state
+        prof.disable()
+        _profile_lock.release()
+        meta = {
+            'endpoint': request.endpoint or 'unmatched',
+            'method': request.method,
+            'path': request.path,
+            'status': g.pop('request_profile_status', 500),
+            'reason': reason,
+            'pid': os.getpid(),
+            'started_at': started_at,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'error': repr(exc) if exc else None,
+            'sql': [{'statement': s, 'ms': round(t * 1000, 3)} for s, t in (statements or [])],
+        }
+        meta['sql_ms'] = round(sum(q['ms'] for q in meta['sql']), 3)
+        try:
+            _save_profile(prof, meta)
+        except Exception as e:
+            print(f"Could not save request profile: {e}")
+
+    @app.route('/debug/profiles', methods=['GET'])
+    def list_profiles():
+        if not _authorized():
+            return _unauthorized()
+        profiles = []
+        try:
+            names = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith('.json') and n != _SAMPLING_FILE), reverse=True)
+        except OSError:
+            names = []
+        for n in names:
+            try:
+                with open(os.path.join(PROFILE_DIR, n), encoding='utf-8') as f:
+                    meta = json.load(f)
+            except Exception:
+                continue
+            meta.pop('top_functions', None)
+            meta['queries'] = len(meta.pop('sql', []))
+            profiles.append(meta)
+        return {'ok': True, 'profiles': profiles, 'sampling': _sampling_state()}
+
+    @app.route('/debug/profiles/<name>', methods=['GET'])
+    def download_profile(name):
+        if not _authorized():
+            return _unauthorized()
+        if not _NAME_RE.match(name):
+            return {'ok': False, 'error': 'not_found'}, 404
+        return send_from_directory(PROFILE_DIR, name, as_attachment=name.endswith('.prof'))
+
+    @app.route('/debug/profiles/sampling', methods=['GET', 'PUT', 'DELETE'])
+    def profile_sampling():
+        if not _authorized():
+            return _unauthorized()
+        if request.method == 'PUT':
+            body = request.get_json(silent=True) or {}
+            try:
+                rate = min(1.0, max(0.0, float(body.get('rate', 0))))
+                seconds = float(body.get('seconds', 600))
+            except (TypeError, ValueError):
+                return {'ok': False, 'error': 'invalid_sampling'}, 400
+            endpoints = [str(e) for e in (body.get('endpoints') or [])]
+            _write_sampling({'rate': rate, 'endpoints': endpoints, 'until': time.time() + seconds if seconds > 0 else None})
+        elif request.method == 'DELETE':
+            _write_sampling({'rate': 0, 'endpoints': [], 'until': None})
+        return {'ok': True, 'sampling': _sampling_state()}
+
+    @app.route('/debug/profiles/token', methods=['POST'])
+    def profile_token():
+        if not _authorized():
+            return _unauthorized()
+        return {
+            'ok': True,
+            'header': PROFILE_HEADER,
+            'token': _serializer(app).dumps({'nonce': secrets.token_hex(4)}),
+            'expires_in': PROFILE_TOKEN_MAX_AGE,
+        }
+
+    return start_profile
@@ -0,0 +1,268 @@
+"""Token-bucket rate limiting for the expensive endpoints.
+
+Budgets live in RATE_LIMITS, keyed by Flask endpoint. A budget of
+RateLimit(10, 60, ...) allows a burst of 10 requests, refilled at 10 per 60
+seconds. Any budget can be overridden without a deploy:
+
+    RATE_LIMIT_LOGIN=20/60   (capacity/seconds; 0/0 disables that route)
+
+Backends (RATE_LIMIT_BACKEND):
+  shm     default. Fixed-size bucket table in an mmap'd file under /dev/shm,
+          shared by every gunicorn worker on the host and guarded by
+          fcntl range locks. A check costs a few microseconds.
+  sqlite  Same sharing through a SQLite file (RATE_LIMIT_SQLITE_PATH), for
+          hosts without /dev/shm; tens of microseconds per check.
+  memory  Per process; limits are multiplied by the worker count.
+
+Over-budget requests get 429 with Retry-After. Clients are keyed by IP. For
+'user' budgets the key is the logged-in user when there is one. Behind a
+proxy, set RATE_LIMIT_TRUSTED_PROXIES to the number of proxies in front of the
+app so X-Forwarded-For is used.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import request, session
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RateLimit = namedtuple('RateLimit', 'capacity per_seconds key methods')
+
+# endpoint -> RateLimit(burst, refill window in seconds, 'ip' | 'user', methods)
+RATE_LIMITS = {
+    'login': RateLimit(10, 60, 'ip', ('POST',)),
+    'register': RateLimit(5, 600, 'ip', ('POST',)),
+    'api_analyze_bite': RateLimit(6, 60, 'user', ('POST',)),
+    'api_symptom_combinations': RateLimit(10, 60, 'ip', ('GET',)),
+}
+
+RATE_LIMIT_ENABLED = (os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true')
+RATE_LIMIT_BACKEND = (os.getenv('RATE_LIMIT_BACKEND', 'shm') or 'shm').lower()
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+RATE_LIMIT_SLOTS = int(os.getenv('RATE_LIMIT_SLOTS', '65536'))
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+_SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+RATE_LIMIT_SHM_PATH = os.getenv('RATE_LIMIT_SHM_PATH', os.path.join(_SHM_DIR, 'denguetect-ratelimit'))
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'denguetect-ratelimit.db'))
+
+
+def _take(tokens, updated, now, capacity, rate, cost):
+    """Refill and spend; returns (allowed, tokens left, seconds until enough tokens)."""
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class MemoryBackend:
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, rate, cost=1.0):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SharedMemoryBackend:
+    """Open-addressed bucket table in a shared mmap.
+
+    A key hashes to a window of WINDOW slots that is locked as one byte range.
+    When the window is full, the least recently used slot is reused. A bucket
+    untouched for a full refill window is full again anyway, so recycling it
+    loses nothing.
+    """
+
+    SLOT = struct.Struct('<Qdd')  # key hash, tokens, updated
+    WINDOW = 8
+
+    def __init__(self, path=RATE_LIMIT_SHM_PATH, slots=RATE_LIMIT_SLOTS):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._mm = None
+
+    def _open(self):
+        # fcntl locks and file descriptors do not carry over a fork cleanly.
+        if self._pid == os.getpid():
+            return
+        size = (self.slots + self.WINDOW) * self.SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._fd, self._mm, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    def hit(self, key, capacity, rate, cost=1.0):
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') | 1
+        slot = self.SLOT
+        offset = (key_hash % self.slots) * slot.size
+        length = self.WINDOW * slot.size
+        now = time.time()
+        with self._lock:
+            self._open()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset, os.SEEK_SET)
+            try:
+                target, tokens, updated = None, capacity, now
+                victim, victim_updated = offset, None
+                for pos in range(offset, offset + length, slot.size):
+                    h, t, u = slot.unpack_from(self._mm, pos)
+                    if h == key_hash:
+                        target, tokens, updated = pos, t, u
+                        break
+                    if h == 0:
+                        if victim_updated != -1.0:
+                            victim, victim_updated = pos, -1.0
+                    elif victim_updated is None or (victim_updated != -1.0 and u < victim_updated):
+                        victim, victim_updated = pos, u
+                allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate, cost)
+                slot.pack_into(self._mm, target if target is not None else victim, key_hash, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset, os.SEEK_SET)
+        return allowed, retry_after
+
+
+class SQLiteBackend:
+    def __init__(self, path=RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL) WITHOUT ROWID')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def hit(self, key, capacity, rate, cost=1.0):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate, cost)
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            self._calls += 1
+            if self._calls % 10000 == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 86400,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+def make_backend(name=RATE_LIMIT_BACKEND):
+    if name == 'shm' and fcntl is not None:
+        return SharedMemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend()
+    return MemoryBackend()
+
+
+def _configured_limits(limits):
+    configured = {}
+    for endpoint, limit in limits.items():
+        raw = os.getenv(f'RATE_LIMIT_{endpoint.upper()}')
+        if raw:
+            try:
+                capacity, per_seconds = (float(x) for x in raw.split('/', 1))
+                limit = limit._replace(capacity=capacity, per_seconds=per_seconds)
+            except ValueError:
+                print(f"Ignoring malformed RATE_LIMIT_{endpoint.upper()}={raw!r}")
+        if limit.capacity > 0 and limit.per_seconds > 0:
+            configured[endpoint] = limit
+    return configured
+
+
+def client_ip(remote_addr, forwarded_for=None):
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        hops = [h.strip() for h in (forwarded_for or '').split(',') if h.strip()]
+        if len(hops) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return hops[-RATE_LIMIT_TRUSTED_PROXIES]
+    return remote_addr or 'unknown'
+
+
+def client_key(kind, remote_addr, forwarded_for=None, user_id=None):
+    if kind == 'user' and user_id:
+        return f"user:{user_id}"
+    return f"ip:{client_ip(remote_addr, forwarded_for)}"
+
+
+class RateLimiter:
+    """Budgets plus a backend; check() is shared by the Flask hook and the ASGI routes."""
+
+    def __init__(self, limits=RATE_LIMITS, backend=None):
+        self.limits = _configured_limits(limits)
+        self.backend = backend or make_backend()
+        self.stats = {'checked': 0, 'limited': 0, 'errors': 0}
+
+    def limit_for(self, endpoint, method):
+        limit = self.limits.get(endpoint)
+        if not RATE_LIMIT_ENABLED or limit is None or method not in limit.methods:
+            return None
+        return limit
+
+    def check(self, endpoint, limit, key):
+        """Seconds to wait before retrying, or None when the request may proceed."""
+        try:
+            allowed, retry_after = self.backend.hit(
+                f"{endpoint}|{key}", limit.capacity, limit.capacity / limit.per_seconds)
+        except Exception as e:
+            # Admission control must never take the route down with it.
+            self.stats['errors'] += 1
+            print(f"Rate limiter error: {e}")
+            return None
+        self.stats['checked'] += 1
+        if allowed:
+            return None
+        self.stats['limited'] += 1
+        return max(1, math.ceil(retry_after))
+
+
+def install_rate_limits(app, limits=RATE_LIMITS, backend=None):
+    limiter = RateLimiter(limits, backend)
+
+    @app.before_request
+    def enforce_rate_limit():
+        limit = limiter.limit_for(request.endpoint, request.method)
+        if limit is None:
+            return None
+        user_id = session.get('user_id') if limit.key == 'user' and session.get('logged_in') else None
+        key = client_key(limit.key, request.remote_addr, request.headers.get('X-Forwarded-For'), user_id)
+        retry_after = limiter.check(request.endpoint, limit, key)
+        if retry_after is None:
+            return None
+        headers = {'Retry-After': str(retry_after)}
+        if request.path.startswith('/api/'):
+            return {'ok': False, 'error': 'rate_limited', 'retry_after': retry_after}, 429, headers
+        return f"Too many requests. Please try again in {retry_after} seconds.", 429, headers
+
+    app.extensions['rate_limit'] = limiter
+    return limiter
@@ -0,0 +1,103 @@
+"""Render cache for pages whose HTML only depends on a few template globals.
+
+dashboard, the education pages, report_bite and bite_analysis_result render the
+same markup for everyone except the header (logged_in / avatar_url) and the
+footer year. RenderCache keys rendered HTML on the template, its explicit
+context and those globals, so a hit costs neither Jinja nor the DB.
+
+Entries are dropped whenever any file in the template folder changes (checked
+at most every RENDER_CACHE_CHECK_SECONDS, or on every call in debug / with
+TEMPLATES_AUTO_RELOAD).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import render_template
+
+RENDER_CACHE_ENABLED = (os.getenv('RENDER_CACHE_ENABLED', 'true').lower() == 'true')
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '256'))
+RENDER_CACHE_CHECK_SECONDS = float(os.getenv('RENDER_CACHE_CHECK_SECONDS', '2'))
+
+
+class RenderCache:
+    def __init__(self, app, key_globals, maxsize=RENDER_CACHE_SIZE, check_interval=RENDER_CACHE_CHECK_SECONDS):
+        """key_globals() returns the template globals the cached pages vary on."""
+        self.app = app
+        self.key_globals = key_globals
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        app.extensions['render_cache'] = self
+
+    def _template_dir(self):
+        return os.path.join(self.app.root_path, self.app.template_folder or 'templates')
+
+    def _templates_version(self):
+        latest = 0
+        try:
+            for dirpath, _dirs, files in os.walk(self._template_dir()):
+                for name in files:
+                    latest = max(latest, os.stat(os.path.join(dirpath, name)).st_mtime_ns)
+        except OSError:
+            return None
+        return latest
+
+    def _check_templates(self):
+        now = time.monotonic()
+        always = self.app.debug or self.app.config.get('TEMPLATES_AUTO_RELOAD')
+        if not always and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        version = self._templates_version()
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def render(self, template_name, **context):
+        """render_template() with the result cached; falls back to a plain render."""
+        if not RENDER_CACHE_ENABLED or self.maxsize <= 0:
+            return render_template(template_name, **context)
+        try:
+            self._check_templates()
+            key = (template_name, tuple(sorted(context.items())), tuple(sorted(self.key_globals().items())))
+            hash(key)
+        except Exception as e:
+            print(f"Render cache key error for {template_name}: {e}")
+            return render_template(template_name, **context)
+
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = render_template(template_name, **context)
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
@@ -0,0 +1,275 @@
+"""Server-side sessions backed by the user_sessions table.
+
+The session data still lives in Flask's signed cookie. On login, save_session
+also inserts a user_sessions row and stores its token in the cookie as `_sid`.
+The DB keeps only a SHA-256 of the token. Every later request checks that the
+row is still active and unexpired, so a session can be revoked server-side:
+logout, revoke_user_sessions(), or deleting the row.
+
+Validation results are cached per process in an LRU. An entry lives until the
+row's expires_at, capped at SESSION_CACHE_MAX_AGE so a revocation made by
+another worker is seen within that window. A cache hit costs no DB round trip.
+
+A daemon thread in each process deletes expired rows every
+SESSION_SWEEP_INTERVAL seconds, SESSION_SWEEP_BATCH rows per statement, using
+idx_user_sessions_expires_at.
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import text
+
+import database
+from database import SessionLocal, UserSession
+
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_MAX_AGE = float(os.getenv('SESSION_CACHE_MAX_AGE', '60'))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '600'))
+SESSION_SWEEP_BATCH = int(os.getenv('SESSION_SWEEP_BATCH', '1000'))
+
+SID_KEY = '_sid'
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _utc_naive(value):
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class SessionCache:
+    """LRU of token hash -> (user_id or None for invalid, monotonic deadline)."""
+
+    def __init__(self, maxsize=SESSION_CACHE_SIZE, max_age=SESSION_CACHE_MAX_AGE):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """(True, user_id) on a live hit, (False, None) on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, user_id, expires_at=None):
+        ttl = self.max_age
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user_id, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v[0] == user_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses}
+
+
+cache = SessionCache()
+
+
+def create_session(user_id, lifetime, ip_address=None, user_agent=None):
+    """Insert a user_sessions row; returns the raw token for the cookie."""
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.utcnow() + lifetime
+    db = SessionLocal()
+    try:
+        db.add(UserSession(
+            user_id=user_id,
+            session_token=_token_hash(token),
+            expires_at=expires_at,
+            ip_address=ip_address,
+            user_agent=(user_agent or '')[:512] or None,
+        ))
+        db.commit()
+    finally:
+        db.close()
+    cache.put(_token_hash(token), str(user_id), expires_at)
+    return token
+
+
+def peek_session(token):
+    """Cached validation result: (True, user_id or None) on a hit, (False, None) on a miss."""
+    return cache.get(_token_hash(token))
+
+
+def validate_session(token):
+    """user_id of the active, unexpired session for token, else None."""
+    key = _token_hash(token)
+    hit, user_id = cache.get(key)
+    if hit:
+        return user_id
+    db = SessionLocal()
+    try:
+        row = (db.query(UserSession.user_id, UserSession.expires_at)
+                 .filter(UserSession.session_token == key, UserSession.is_active.is_(True))
+                 .first())
+    finally:
+        db.close()
+    expires_at = _utc_naive(row.expires_at) if row else None
+    if row is None or expires_at <= datetime.utcnow():
+        # Negative entries use the short max-age so a fresh login is never blocked long.
+        cache.put(key, None)
+        return None
+    cache.put(key, str(row.user_id), expires_at)
+    return str(row.user_id)
+
+
+def revoke_session(token):
+    key = _token_hash(token)
+    cache.put(key, None)
+    db = SessionLocal()
+    try:
+        db.query(UserSession).filter(UserSession.session_token == key).update(
+            {UserSession.is_active: False}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def revoke_user_sessions(user_id):
+    """Sign a user out everywhere; other workers notice within SESSION_CACHE_MAX_AGE."""
+    cache.discard_user(str(user_id))
+    db = SessionLocal()
+    try:
+        count = db.query(UserSession).filter(
+            UserSession.user_id == user_id, UserSession.is_active.is_(True)
+        ).update({UserSession.is_active: False}, synchronize_session=False)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def sweep_expired_sessions(batch=SESSION_SWEEP_BATCH):
+    """Delete expired rows in batches; returns the number removed."""
+    removed = 0
+    while True:
+        with database.engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                deleted = conn.execute(text(
+                    "DELETE FROM user_sessions WHERE id IN ("
+                    "SELECT id FROM user_sessions WHERE expires_at < NOW() "
+                    "LIMIT :batch FOR UPDATE SKIP LOCKED)"
+                ), {'batch': batch}).rowcount
+            else:
+                deleted = conn.execute(text(
+                    "DELETE FROM user_sessions WHERE id IN ("
+                    "SELECT id FROM user_sessions WHERE expires_at < :now LIMIT :batch)"
+                ), {'batch': batch, 'now': datetime.utcnow()}).rowcount
+        removed += deleted
+        if deleted < batch:
+            return removed
+
+
+_sweeper_lock = threading.Lock()
+_sweeper_pid = None
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            removed = sweep_expired_sessions()
+            if removed:
+                print(f"Removed {removed} expired sessions")
+        except Exception as e:
+            print(f"Session sweep failed: {e}")
+
+
+def start_sweeper():
+    """Start the sweeper thread once per process (again after a fork)."""
+    global _sweeper_pid
+    if SESSION_SWEEP_INTERVAL <= 0 or _sweeper_pid == os.getpid():
+        return
+    with _sweeper_lock:
+        if _sweeper_pid == os.getpid():
+            return
+        _sweeper_pid = os.getpid()
+        threading.Thread(target=_sweep_forever, name='session-sweeper', daemon=True).start()
+
+
+class UserSessionInterface(SecureCookieSessionInterface):
+    """Signed-cookie sessions that are only honoured while their user_sessions row is."""
+
+    def open_session(self, app, request):
+        start_sweeper()
+        sess = super().open_session(app, request)
+        if sess is None or not sess.get('logged_in'):
+            return sess
+        token = sess.get(SID_KEY)
+        try:
+            user_id = validate_session(token) if token else None
+        except Exception as e:
+            # Fail open like every other DB-backed route would; the next request re-checks.
+            print(f"Session validation failed: {e}")
+            user_id = str(sess.get('user_id'))
+        if user_id is None or user_id != str(sess.get('user_id')):
+            # Revoked, expired or never registered: log out and drop the cookie.
+            fresh = self.session_class()
+            fresh.modified = True
+            return fresh
+        sess.opened_sid = token
+        return sess
+
+    def save_session(self, app, sess, response):
+        from flask import request
+        opened = getattr(sess, 'opened_sid', None)
+        token = sess.get(SID_KEY)
+        try:
+            if not sess.get('logged_in'):
+                if opened or token:
+                    revoke_session(opened or token)
+                    sess.pop(SID_KEY, None)
+            elif sess.get('user_id'):
+                if token and sess.modified and validate_session(token) != str(sess['user_id']):
+                    # Signed in as someone else on top of an existing session.
+                    revoke_session(token)
+                    token = None
+                if not token:
+                    sess[SID_KEY] = create_session(
+                        sess['user_id'], app.permanent_session_lifetime,
+                        ip_address=request.remote_addr, user_agent=request.headers.get('User-Agent'),
+                    )
+        except Exception as e:
+            print(f"Session store error: {e}")
+        return super().save_session(app, sess, response)
+
+
+def install_session_store(app):
+    app.session_interface = UserSessionInterface()
+    return app.session_interface
@@ -0,0 +1,64 @@
+"""Serving uploads at /uploads/<key>, for the Flask apps.
+
+Storage itself (the local and S3 backends, content keys, get_storage) lives
+in dengue_core.storage and is re-exported here, so `from storage import ...`
+keeps working.
+
+Local files go out through send_file, which gunicorn hands to sendfile(2).
+With STORAGE_ACCEL_REDIRECT set, e.g. to "/_uploads/", the app returns only
+an X-Accel-Redirect header and nginx sends the file; the location must be
+`internal` and alias STORAGE_LOCAL_ROOT. For S3, the route redirects to
+STORAGE_PUBLIC_URL/<key> or to a short-lived presigned URL.
+"""
+
+import mimetypes
+import os
+
+from flask import Response, abort, redirect, send_file, send_from_directory
+
+from dengue_core.storage import (  # noqa: F401
+    STORAGE_BACKEND, STORAGE_BACKENDS, STORAGE_LOCAL_ROOT, UPLOADS_URL_PREFIX,
+    LocalStorage, S3Storage, _clean_key, atomic_write, content_key, get_storage, register_backend,
+    set_storage, sharded_key,
+)
+
+STORAGE_ACCEL_REDIRECT = os.getenv('STORAGE_ACCEL_REDIRECT') or None
+
+
+def serve_upload(storage, key, legacy_dir=None, on_missing=None):
+    """on_missing(storage, key) may create a missing file; True when it did."""
+    try:
+        key = _clean_key(key)
+    except ValueError:
+        abort(404)
+    # Dot files are temp files and internal blobs, never public.
+    if key.rsplit('/', 1)[-1].startswith('.'):
+        abort(404)
+    path = storage.local_path(key)
+    if path is None:
+        # A derivative whose background build was lost (worker restart or
+        # recycle) would otherwise redirect to a 404 forever.
+        if on_missing and not storage.exists(key) and not on_missing(storage, key):
+            abort(404)
+        return redirect(storage.download_url(key))
+    if not os.path.isfile(path) and not (on_missing and on_missing(storage, key)):
+        # Uploads committed under the static folder used to be served from there.
+        if legacy_dir and os.path.isfile(os.path.join(legacy_dir, *key.split('/'))):
+            return send_from_directory(legacy_dir, key, conditional=True)
+        abort(404)
+    if STORAGE_ACCEL_REDIRECT:
+        response = Response(mimetype=mimetypes.guess_type(key)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = STORAGE_ACCEL_REDIRECT.rstrip('/') + '/' + key
+        return response
+    return send_file(path, conditional=True)
+
+
+def install_uploads(app, storage=None, on_missing=None):
+    storage = storage or get_storage()
+    legacy_dir = os.path.join(app.static_folder, UPLOADS_URL_PREFIX.strip('/')) if app.static_folder else None
+
+    @app.route(f'{UPLOADS_URL_PREFIX}/<path:key>', methods=['GET'])
+    def uploaded_file(key):
+        return serve_upload(storage, key, legacy_dir, on_missing)
+
+    return storage
@@ -0,0 +1,197 @@
+"""Regional surveillance rollup and GET /api/surveillance/summary.
+
+    python surveillance.py rebuild [--days 2 | --since YYYY-MM-DD [--until YYYY-MM-DD]]
+
+surveillance_daily holds one row per region, day and risk level, with the
+assessment count and the sum of probabilities. The region is the user's
+when the assessment is written, and is stored on the assessment, so an
+update or delete takes it out of the bucket it went into. On Postgres
+triggers on assessments keep it current; elsewhere record_assessment() is
+called in the transaction that inserts the assessment. The summary endpoint reads
+only the rollup, so it costs the same however many raw rows there are.
+
+`rebuild` re-derives a range of days from the raw rows, for backfill or to
+repair drift. Do not rebuild months that partitions.py has archived: their
+raw rows are gone, and the rebuilt days would come back empty.
+
+Off unless SURVEILLANCE_TOKEN is set; the endpoint then needs
+`Authorization: Bearer <SURVEILLANCE_TOKEN>`:
+
+    GET /api/surveillance/summary?from=2026-01-01&to=2026-01-31
+        [&region=Manila] [&group_by=region,day,risk_level]
+
+group_by is any subset of region, day and risk_level (all three by
+default); each row has assessments and mean_probability.
+"""
+
+import argparse
+import hmac
+import os
+from datetime import date, datetime, timedelta
+
+from flask import jsonify, request
+from sqlalchemy import Date, cast, delete, func, select
+
+import database
+from database import Assessment, SurveillanceDaily, User, _env_int
+
+SURVEILLANCE_TOKEN = os.getenv('SURVEILLANCE_TOKEN') or None
+SURVEILLANCE_DEFAULT_DAYS = _env_int('SURVEILLANCE_DEFAULT_DAYS', 28)
+SURVEILLANCE_MAX_DAYS = _env_int('SURVEILLANCE_MAX_DAYS', 366)
+UNKNOWN_REGION = 'unknown'
+GROUP_COLUMNS = ('region', 'day', 'risk_level')
+
+
+def _dialect():
+    return database.get_engine().dialect.name
+
+
+def _user_region(user_id):
+    return func.coalesce(
+        select(func.nullif(User.region, '')).where(User.id == user_id).scalar_subquery(), UNKNOWN_REGION
+    )
+
+
+def _assessment_region():
+    # Rows written before assessments.region existed fall back to the user's.
+    return func.coalesce(func.nullif(Assessment.region, ''), func.nullif(User.region, ''), UNKNOWN_REGION)
+
+
+def record_assessment(db, assessment):
+    """Stamp a new assessment with its user's region and add it to that bucket.
+
+    On Postgres the assessments triggers do both, so this is a no-op there.
+    """
+    dialect = _dialect()
+    if dialect == 'postgresql':
+        return
+    if not assessment.region:
+        with db.no_autoflush:
+            assessment.region = db.scalar(select(_user_region(assessment.user_id)))
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        print(f"Surveillance rollup not maintained for dialect {dialect}; run `surveillance.py rebuild`")
+        return
+    stmt = insert(SurveillanceDaily).values(
+        region=assessment.region,
+        day=(assessment.created_at or datetime.utcnow()).date(),
+        risk_level=str(assessment.risk_level),
+        assessments=1,
+        probability_sum=float(assessment.probability or 0.0),
+        updated_at=datetime.utcnow(),
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=['region', 'day', 'risk_level'],
+        set_={
+            'assessments': SurveillanceDaily.assessments + 1,
+            'probability_sum': SurveillanceDaily.probability_sum + stmt.excluded.probability_sum,
+            'updated_at': stmt.excluded.updated_at,
+        },
+    ))
+
+
+def rebuild(db, since, until=None):
+    """Replace the rollup rows for since..until (inclusive) with a fresh aggregate; returns rows written."""
+    until = until or date.today()
+    day = func.date(Assessment.created_at) if _dialect() == 'sqlite' else cast(Assessment.created_at, Date)
+    region = _assessment_region()
+    start = datetime.combine(since, datetime.min.time())
+    end = datetime.combine(until + timedelta(days=1), datetime.min.time())
+    rows = db.execute(
+        select(region, day, Assessment.risk_level, func.count(), func.coalesce(func.sum(Assessment.probability), 0.0))
+        .select_from(Assessment)
+        .outerjoin(User, User.id == Assessment.user_id)
+        .where(Assessment.created_at >= start, Assessment.created_at < end, Assessment.risk_level.isnot(None))
+        .group_by(region, day, Assessment.risk_level)
+    ).all()
+    db.execute(delete(SurveillanceDaily).where(SurveillanceDaily.day >= since, SurveillanceDaily.day <= until))
+    now = datetime.utcnow()
+    db.add_all(SurveillanceDaily(
+        region=r, day=d if isinstance(d, date) else date.fromisoformat(d), risk_level=level,
+        assessments=n, probability_sum=float(total), updated_at=now,
+    ) for r, d, level, n, total in rows)
+    db.commit()
+    return len(rows)
+
+
+def summary(db, start, end, region=None, group_by=GROUP_COLUMNS):
+    """Counts and mean probability from the rollup, grouped by group_by, plus totals."""
+    keys = [getattr(SurveillanceDaily, name) for name in group_by]
+    count = func.sum(SurveillanceDaily.assessments)
+    prob = func.sum(SurveillanceDaily.probability_sum)
+    query = select(*keys, count, prob).where(SurveillanceDaily.day >= start, SurveillanceDaily.day <= end)
+    if region:
+        query = query.where(SurveillanceDaily.region == region)
+    if keys:
+        query = query.group_by(*keys).order_by(*keys)
+    rows, total, total_prob = [], 0, 0.0
+    for row in db.execute(query):
+        n, p = int(row[-2] or 0), float(row[-1] or 0.0)
+        if not n:
+            continue
+        item = {name: value for name, value in zip(group_by, row)}
+        if 'day' in item:
+            item['day'] = item['day'].isoformat()
+        item['assessments'] = n
+        item['mean_probability'] = round(p / n, 4)
+        rows.append(item)
+        total += n
+        total_prob += p
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'region': region,
+        'group_by': list(group_by),
+        'rows': rows,
+        'total': {'assessments': total, 'mean_probability': round(total_prob / total, 4) if total else None},
+    }
+
+
+def _parse_day(value, default):
+    return date.fromisoformat(value) if value else default
+
+
+def install_surveillance(app):
+    """Register /api/surveillance/summary when SURVEILLANCE_TOKEN is set."""
+    if not SURVEILLANCE_TOKEN:
+        return
+
+    @app.route('/api/surveillance/summary')
+    def api_surveillance_summary():
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {SURVEILLANCE_TOKEN}'):
+            return jsonify({'ok': False, 'error': 'unauthorized'}), 401
+        try:
+            end = _parse_day(request.args.get('to'), date.today())
+            start = _parse_day(request.args.get('from'), end - timedelta(days=SURVEILLANCE_DEFAULT_DAYS - 1))
+        except ValueError:
+            return jsonify({'ok': False, 'error': 'from and to must be YYYY-MM-DD'}), 400
+        if start > end or (end - start).days >= SURVEILLANCE_MAX_DAYS:
+            return jsonify({'ok': False, 'error': f'range must be 1 to {SURVEILLANCE_MAX_DAYS} days'}), 400
+        group_by = [g.strip() for g in request.args.get('group_by', ','.join(GROUP_COLUMNS)).split(',') if g.strip()]
+        if any(g not in GROUP_COLUMNS for g in group_by) or len(set(group_by)) != len(group_by):
+            return jsonify({'ok': False, 'error': f"group_by takes {', '.join(GROUP_COLUMNS)}"}), 400
+        db = database.ReadSessionLocal()
+        try:
+            out = summary(db, start, end, request.args.get('region') or None, group_by)
+        finally:
+            db.close()
+        return jsonify({'ok': True, **out})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_rebuild = sub.add_parser('rebuild')
+    p_rebuild.add_argument('--days', type=int, default=2, help='rebuild today and the days before it')
+    p_rebuild.add_argument('--since', type=date.fromisoformat)
+    p_rebuild.add_argument('--until', type=date.fromisoformat)
+    args = parser.parse_args()
+
+    until = args.until or date.today()
+    since = args.since or until - timedelta(days=args.days - 1)
+    session = database.SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild(session, since, until)} rollup rows for {since} to {until}")
+    finally:
+        session.close()